@@ -0,0 +1,68 @@
+"""
+Compares two benchmark result files written by benchmarks/suite.py and fails
+if any case got slower than the threshold.
+
+Usage: python benchmarks/compare.py base.json new.json [--threshold 10] [--min-ms 0.5]
+
+A case regresses when its median grows by more than --threshold percent AND
+by more than --min-ms milliseconds (so sub-millisecond jitter is ignored).
+Exit status: 0 no regressions, 1 regressions, 2 unusable input.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+RESULTS_VERSION = 1
+
+
+def load(path: Path) -> dict:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        sys.exit(f"{path}: {e}")
+    if data.get("version") != RESULTS_VERSION:
+        sys.exit(f"{path}: unsupported results version {data.get('version')!r}")
+    return data
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", type=Path)
+    parser.add_argument("new", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown in percent (default: 10)")
+    parser.add_argument("--min-ms", type=float, default=0.5, help="Ignore changes smaller than this (default: 0.5)")
+    args = parser.parse_args()
+    try:
+        base, new = load(args.base), load(args.new)
+    except SystemExit as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if base["meta"].get("spec") != new["meta"].get("spec"):
+        print("⚠️  The runs used different synthetic homes; timings are not comparable.", file=sys.stderr)
+    print(f"{base['meta'].get('revision') or args.base} -> {new['meta'].get('revision') or args.new}\n")
+    print(f"{'case':<20}{'base':>12}{'new':>12}{'change':>10}")
+
+    regressions = []
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        if name not in base["results"] or name not in new["results"]:
+            print(f"{name:<20}{'(only in ' + ('base' if name in base['results'] else 'new') + ')':>34}")
+            continue
+        before = base["results"][name]["median_ms"]
+        after = new["results"][name]["median_ms"]
+        change = (after - before) / before * 100 if before else 0.0
+        slower = change > args.threshold and after - before > args.min_ms
+        if slower:
+            regressions.append(name)
+        print(f"{name:<20}{before:>9.2f} ms{after:>9.2f} ms{change:>+9.1f}%{'  REGRESSION' if slower else ''}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} case(s) slower than {args.threshold:g}%: {', '.join(regressions)}")
+        return 1
+    print(f"\n✅ No case slower than {args.threshold:g}%.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Git spawn benchmark: commits N freshly imported files either one operation per
+file (what N separate `dotfile-pro add` runs do) or as one GitSession batch
+(what `dotfile-pro scan` does), and reports git processes started and time.
+
+Usage: PYTHONPATH=src python benchmarks/git_session.py [-n 200] [--backend native]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from core.paths import context
+from services.git_local import GitSession, LocalGit
+
+
+def make_repo(root: Path, count: int) -> None:
+    context.reset()
+    context.repo_root = root
+    (root / "misc").mkdir(parents=True)
+    for i in range(count):
+        (root / "misc" / f"rc{i}").write_text(f"{i}\n")
+    (root / "dotfiles.json").write_text("[]")
+    LocalGit.init_repo()
+
+
+def per_file(root: Path, count: int) -> None:
+    for i in range(count):
+        session = GitSession()
+        session.stage(root / "misc" / f"rc{i}", root / "dotfiles.json")
+        session.commit(f"Add rc{i}")
+
+
+def batched(root: Path, count: int) -> None:
+    session = GitSession()
+    session.stage(*(root / "misc" / f"rc{i}" for i in range(count)), root / "dotfiles.json")
+    session.commit(f"Import {count} files")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--files", type=int, default=200)
+    parser.add_argument("--backend", choices=("subprocess", "native"), default="subprocess")
+    args = parser.parse_args()
+    os.environ["DOTFILE_GIT_BACKEND"] = args.backend
+    for var in ("AUTHOR", "COMMITTER"):
+        os.environ.setdefault(f"GIT_{var}_NAME", "bench")
+        os.environ.setdefault(f"GIT_{var}_EMAIL", "bench@localhost")
+
+    print(f"{'mode':<10}{'git spawns':>12}{'time':>12}")
+    for name, run in (("per-file", per_file), ("batched", batched)):
+        with tempfile.TemporaryDirectory(prefix="git-bench-") as tmp:
+            root = Path(tmp).resolve()
+            make_repo(root, args.files)
+            spawns = LocalGit.spawns
+            start = time.perf_counter()
+            run(root, args.files)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<10}{LocalGit.spawns - spawns:>12}{elapsed * 1000:>9.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Scanner filtering benchmark: per-file cost of the compiled scan rules against
+the inline checks SystemScanner used before (suffix set lookup, startswith /
+endswith and substring tests evaluated in Python for every name).
+
+Usage: PYTHONPATH=src python benchmarks/scan_rules.py [-n 100000]
+"""
+import argparse
+import random
+import sys
+import time
+
+from services.scan_rules import ScanRules
+
+# The checks that were hard-coded in SystemScanner, kept here as the baseline
+CONFIG_EXTENSIONS = {".conf", ".ini", ".toml", ".yaml", ".yml", ".json", ".lua", ".cfg", ".rc", ""}
+ROOT_EXCLUDES = {".bash_history", ".zsh_history", ".lesshst", ".viminfo", ".DS_Store"}
+
+
+def _suffix(name: str) -> str:
+    i = name.rfind(".")
+    return name[i:] if 0 < i < len(name) - 1 else ""
+
+
+def inline_files(name: str) -> bool:
+    if _suffix(name) not in CONFIG_EXTENSIONS and not name.startswith("."):
+        return False
+    return not (name.endswith("~") or name.endswith(".bak") or name.endswith(".swp"))
+
+
+def inline_home(name: str) -> bool:
+    if not name.startswith(".") or name in ROOT_EXCLUDES:
+        return False
+    return _suffix(name) in CONFIG_EXTENSIONS or "rc" in name or "config" in name or "profile" in name
+
+
+def make_names(count: int) -> list:
+    """Names shaped like a real ~/.config tree: configs, caches, backups, hidden files."""
+    rng = random.Random(42)
+    stems = ["init", "config", "settings", "kitty", "theme", "keys", "state", "history", "cache", "bookmarks"]
+    suffixes = [".conf", ".lua", ".json", ".toml", ".yml", "", ".bak", ".swp", "~", ".db", ".log", ".sqlite", ".png"]
+    names = []
+    for i in range(count):
+        name = rng.choice(stems) + str(i % 97) + rng.choice(suffixes)
+        names.append("." + name if rng.random() < 0.3 else name)
+    return names
+
+
+def bench(label: str, check, names: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        accepted = [name for name in names if check(name)]
+        best = min(best, time.perf_counter() - start)
+    ns = best / len(names) * 1e9
+    print(f"{label:<24}{ns:>10.0f} ns/file{len(accepted):>10} accepted")
+    return ns
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--files", type=int, default=100_000)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    names = make_names(args.files)
+    rules = ScanRules(ScanRules.defaults())
+    for label, inline, compiled in (
+        ("roots", inline_files, rules.files.match),
+        ("home", inline_home, rules.home.match),
+    ):
+        assert [n for n in names if inline(n)] == [n for n in names if compiled(n)], label
+        before = bench(f"{label}: inline checks", inline, names, args.repeat)
+        after = bench(f"{label}: compiled rules", compiled, names, args.repeat)
+        print(f"{'':<24}{before / after:>10.1f}x\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
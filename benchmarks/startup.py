@@ -0,0 +1,60 @@
+"""
+Startup benchmark for zipapp builds of dotfile-pro.
+
+Runs `<app> --help` for each build in two modes:
+
+    cold   fresh SHIV_ROOT every run: extraction (and pyc compilation) included
+    warm   SHIV_ROOT extracted once beforehand: the steady-state cost
+
+Usage: python benchmarks/startup.py dist/bench/compressed dist/bench/fast [-n 10]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def run_once(app: Path, shiv_root: Path) -> float:
+    env = dict(os.environ, SHIV_ROOT=str(shiv_root))
+    start = time.perf_counter()
+    subprocess.run([sys.executable, str(app), "--help"], env=env, stdout=subprocess.DEVNULL, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def bench(app: Path, runs: int):
+    cold, warm = [], []
+    with tempfile.TemporaryDirectory(prefix="shiv-bench-") as tmp:
+        tmp = Path(tmp)
+        for i in range(runs):
+            root = tmp / f"cold-{i}"
+            cold.append(run_once(app, root))
+            shutil.rmtree(root, ignore_errors=True)
+
+        root = tmp / "warm"
+        run_once(app, root)
+        warm = [run_once(app, root) for _ in range(runs)]
+    return cold, warm
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("apps", nargs="+", type=Path, help="zipapp builds to compare")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="runs per build and mode")
+    args = parser.parse_args()
+
+    print(f"{'build':<24}{'size':>10}{'cold median':>14}{'warm median':>14}{'warm min':>11}")
+    for app in args.apps:
+        cold, warm = bench(app, args.runs)
+        size = f"{app.stat().st_size / 1e6:.1f} MB"
+        print(f"{app.name:<24}{size:>10}{statistics.median(cold):>11.0f} ms"
+              f"{statistics.median(warm):>11.0f} ms{min(warm):>8.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
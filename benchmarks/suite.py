@@ -0,0 +1,206 @@
+"""
+Benchmark suite: times the core operations against a synthetic home and repo
+(see benchmarks/synthetic.py) and writes the results as JSON, so two commits
+can be compared with benchmarks/compare.py.
+
+Usage: PYTHONPATH=src python benchmarks/suite.py [-o results.json] [-r 5] [-k scan,check_status]
+                                                 [--dotfiles 2000 --apps 300 --depth 3 ...]
+"""
+import argparse
+import asyncio
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from synthetic import HomeSpec, Synthetic, add_spec_arguments, build, spec_from_args
+
+from core.models import Dotfile
+from services.config_service import ConfigService
+from services.drift import DriftChecker
+from services.file_service import FileService
+from services.hash_index import HashIndex
+from services.scan_cache import ScanCache
+from services.scanner import SystemScanner
+
+# Version of the results file layout (checked by compare.py)
+RESULTS_VERSION = 1
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[], object]
+    # Runs untimed before every repetition (e.g. to undo what `run` changed)
+    setup: Optional[Callable[[], None]] = None
+
+
+def cases(env: Synthetic) -> List[Case]:
+    service = ConfigService()
+    loaded = service.load_config()
+    unlinked = [df for df in env.dotfiles if not df.expanded_target.is_symlink()]
+    counter = iter(range(1_000_000))
+    imports = env.home / ".config" / "imports"
+
+    def status() -> None:
+        # Freshly loaded entries, so no expanded target is cached from a previous run
+        for df in service.load_config():
+            FileService.check_status(df)
+
+    def unlink_targets() -> None:
+        for df in unlinked:
+            df.expanded_target.unlink(missing_ok=True)
+        Dotfile.refresh_all(unlinked)
+
+    def link_targets() -> None:
+        for df in unlinked:
+            FileService.create_symlink(df)
+
+    state = {}
+
+    def new_import_file() -> None:
+        state["file"] = imports / f"imported{next(counter)}.conf"
+        state["file"].parent.mkdir(parents=True, exist_ok=True)
+        state["file"].write_text("x = 1\n" * 64)
+
+    def new_import_dir() -> None:
+        state["dir"] = env.home / ".local" / "share" / f"import{next(counter)}"
+        shutil.copytree(env.large_dir, state["dir"])
+
+    def add_dotfile() -> None:
+        n = next(counter)
+        service.add_dotfile(Dotfile(source=f"bench/added{n}", target=f"~/.added{n}"))
+
+    def copy_targets() -> None:
+        # Real files at the unlinked targets, so diff has content to compare
+        for df in unlinked:
+            if not df.expanded_target.exists():
+                df.expanded_target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(env.repo / df.source, df.expanded_target)
+
+    def diff() -> None:
+        index = HashIndex(env.root / "cache" / "hash-index.json").load()
+        DriftChecker(index).check(service.load_config())
+        index.save(prune=True)
+
+    def scan_cached() -> None:
+        SystemScanner(service, cache=ScanCache(env.root / "cache" / "scan-index.json")).scan()
+
+    return [
+        Case("scan", lambda: SystemScanner(service).scan()),
+        Case("scan_cached", scan_cached),
+        Case("config_load", service.load_config),
+        Case("config_save", lambda: service.save_config(loaded)),
+        Case("config_add", add_dotfile),
+        Case("check_status", status),
+        Case("diff", diff, setup=copy_targets),
+        Case("create_symlink", link_targets, setup=unlink_targets),
+        Case("safe_import_file", lambda: FileService.safe_import(state["file"], Path("imports") / state["file"].name, "default"), setup=new_import_file),
+        Case("safe_import_dir", lambda: FileService.safe_import(state["dir"], Path("imports") / state["dir"].name, "default"), setup=new_import_dir),
+    ]
+
+
+def measure(case: Case, repeat: int) -> List[float]:
+    times = []
+    for i in range(repeat + 1):
+        if case.setup:
+            case.setup()
+        start = time.perf_counter()
+        case.run()
+        elapsed = (time.perf_counter() - start) * 1000
+        if i:  # The first run warms caches and is discarded
+            times.append(elapsed)
+    return times
+
+
+def measure_tui(repeat: int) -> Optional[List[float]]:
+    """DotfileTUI.load_files() in a headless app, including the repaint that follows."""
+    try:
+        from interface.tui import DotfileTUI
+    except ImportError:
+        return None
+    times: List[float] = []
+
+    async def run() -> None:
+        app = DotfileTUI()
+        async with app.run_test() as pilot:
+            for i in range(repeat + 1):
+                start = time.perf_counter()
+                app.load_files()
+                await pilot.pause()
+                if i:
+                    times.append((time.perf_counter() - start) * 1000)
+
+    asyncio.run(run())
+    return times
+
+
+def git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def summarize(times: List[float]) -> Dict[str, object]:
+    return {
+        "median_ms": round(statistics.median(times), 3),
+        "min_ms": round(min(times), 3),
+        "max_ms": round(max(times), 3),
+        "runs_ms": [round(t, 3) for t in times],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", type=Path, help="Write the results to this JSON file")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("-k", "--cases", help="Comma-separated case names to run (default: all)")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    spec: HomeSpec = spec_from_args(args)
+    selected = set(args.cases.split(",")) if args.cases else None
+
+    results: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix="dotfile-bench-") as tmp:
+        env = build(Path(tmp), spec)
+        print(f"{'case':<20}{'median':>12}{'min':>12}")
+        for case in cases(env):
+            if selected is None or case.name in selected:
+                results[case.name] = summarize(measure(case, args.repeat))
+                print(f"{case.name:<20}{results[case.name]['median_ms']:>9.2f} ms{results[case.name]['min_ms']:>9.2f} ms")
+        if selected is None or "tui_load" in selected:
+            times = measure_tui(args.repeat)
+            if times:
+                results["tui_load"] = summarize(times)
+                print(f"{'tui_load':<20}{results['tui_load']['median_ms']:>9.2f} ms{results['tui_load']['min_ms']:>9.2f} ms")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps({
+            "version": RESULTS_VERSION,
+            "meta": {
+                "revision": git_revision(),
+                "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "repeat": args.repeat,
+                "spec": asdict(spec),
+            },
+            "results": results,
+        }, indent=2))
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Synthetic home directories and dotfile repos for the benchmark suite.
+
+build(root, HomeSpec(...)) creates, under `root`:
+
+    home/   ~/.config with `apps` app directories nested `depth` levels deep,
+            `files_per_dir` files per directory (configs and noise), a few
+            root dotfiles and one large directory to import
+    repo/   dotfiles.json with `dotfiles` entries and their source files;
+            `symlink_ratio` of the targets are already linked into home
+
+and points core.paths.context and $HOME at them. Usable on its own:
+
+    PYTHONPATH=src python benchmarks/synthetic.py /tmp/synthetic --dotfiles 2000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List
+
+from core.models import Dotfile
+from core.paths import context
+
+# Noise that the scanner must skip, next to the configs it must find
+CONFIG_SUFFIXES = (".conf", ".toml", ".json", ".lua", ".yml")
+NOISE_SUFFIXES = (".dat", ".log", ".bak", ".png", "~")
+
+
+@dataclass
+class HomeSpec:
+    dotfiles: int = 500  # Entries in dotfiles.json
+    apps: int = 100  # Directories in ~/.config
+    depth: int = 2  # Nesting below each app directory
+    files_per_dir: int = 10
+    symlink_ratio: float = 0.5  # Managed targets already linked into home
+    large_dir_files: int = 1000  # Files in the directory imported by safe_import_dir
+    seed: int = 0
+
+
+@dataclass
+class Synthetic:
+    root: Path
+    home: Path
+    repo: Path
+    dotfiles: List[Dotfile]
+    large_dir: Path
+
+    def activate(self) -> None:
+        """Points $HOME and the global context at this home and repo."""
+        os.environ["HOME"] = str(self.home)
+        context.reset()
+        context.repo_root = self.repo
+        context.cache_dir = self.root / "cache"
+
+
+def _write(path: Path, text: str = "x\n") -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def build(root: Path, spec: HomeSpec) -> Synthetic:
+    rng = random.Random(spec.seed)
+    root = root.resolve()
+    home, repo = root / "home", root / "repo"
+    home.mkdir(parents=True)
+    repo.mkdir(parents=True)
+
+    # ~/.config/appN/sub0/sub1/... with a mix of configs and noise at every level
+    for app in range(spec.apps):
+        directory = home / ".config" / f"app{app}"
+        for level in range(spec.depth + 1):
+            for i in range(spec.files_per_dir):
+                suffix = rng.choice(CONFIG_SUFFIXES if i % 2 == 0 else NOISE_SUFFIXES)
+                _write(directory / f"file{i}{suffix}")
+            directory = directory / f"sub{level}"
+    for name in (".bashrc", ".profile", ".gitconfig", ".bash_history", ".vimrc"):
+        _write(home / name)
+
+    large_dir = home / ".local" / "share" / "large"
+    for i in range(spec.large_dir_files):
+        _write(large_dir / f"part{i // 100}" / f"item{i}.dat", f"{i}\n" * 8)
+
+    dotfiles = []
+    for i in range(spec.dotfiles):
+        app = f"app{i % max(spec.apps, 1)}"
+        source = Path(app) / f"managed{i}.conf"
+        _write(repo / source, f"# managed {i}\n")
+        dotfile = Dotfile(source=source, target=Path("~/.config") / app / f"managed{i}.conf")
+        if rng.random() < spec.symlink_ratio:
+            target = home / ".config" / app / f"managed{i}.conf"
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.symlink_to(repo / source)
+        dotfiles.append(dotfile)
+    (repo / "dotfiles.json").write_text(json.dumps(
+        [{"source": str(df.source), "target": str(df.target), "profile": df.profile} for df in dotfiles], indent=4
+    ))
+
+    synthetic = Synthetic(root, home, repo, dotfiles, large_dir)
+    synthetic.activate()
+    return synthetic
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = HomeSpec()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+
+
+def spec_from_args(args: argparse.Namespace) -> HomeSpec:
+    return HomeSpec(**{name: getattr(args, name) for name in asdict(HomeSpec())})
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", type=Path)
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    synthetic = build(args.root, spec_from_args(args))
+    print(f"HOME={synthetic.home} DOTFILE_REPO={synthetic.repo}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+
+def load(path: Path, version: int) -> Optional[dict]:
+    """
+    Reads a versioned JSON cache. Missing, corrupt or outdated files give None:
+    a cache bumps its version when its on-disk layout changes.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != version:
+        return None
+    return data
+
+
+def save(path: Path, version: int, data: dict) -> None:
+    """Atomically writes a versioned JSON cache."""
+    tmp_path = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", delete=False, dir=path.parent, encoding="utf-8") as tmp:
+            json.dump({"version": version, **data}, tmp, separators=(",", ":"))
+            tmp_path = Path(tmp.name)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Caches are only accelerators; failing to persist one is not an error.
+        if tmp_path is not None and tmp_path.exists():
+            os.unlink(tmp_path)
@@ -13,3 +13,15 @@ class FileOperationError(DotfileError):
 class BackupError(DotfileError):
     """Backup creation failure."""
     pass
+
+class GitError(DotfileError):
+    """A git command failed (or git is not available)."""
+    pass
+
+class TemplateError(DotfileError):
+    """A template could not be rendered (e.g. it uses an undefined variable)."""
+    pass
+
+class ConflictError(FileOperationError):
+    """The file changed on disk after it was opened for editing."""
+    pass
@@ -0,0 +1,39 @@
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import List, Optional
+
+CHUNK_SIZE = 1024 * 1024
+
+# Files modified this recently have "racy" stats: a change within the same mtime
+# tick (2 s on the coarsest filesystems) would leave their stat key unchanged.
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def hash_file(path: Path) -> str:
+    """SHA-256 of a file, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def stat_key(st: os.stat_result) -> List[int]:
+    """(inode, size, mtime) of a file: while it matches, a stored hash of it is still valid."""
+    return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def is_racy(mtime_ns: int) -> bool:
+    """True if a change within the same mtime tick could still go unnoticed."""
+    return time.time_ns() - mtime_ns <= RACY_WINDOW_NS
+
+
+def stable_stat_key(st: os.stat_result) -> Optional[List[int]]:
+    """The stat key to store in a cache; None (matches nothing) while the stat is racy."""
+    return None if is_racy(st.st_mtime_ns) else stat_key(st)
@@ -1,20 +1,133 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from enum import Enum
 from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
 
-@dataclass
+
+def _resolve(path: Path) -> Path:
+    # Single indirection point for filesystem resolution (counted in tests)
+    return path.resolve()
+
+
+@dataclass(frozen=True, slots=True)
 class Dotfile:
     source: Path  # Path relative to the repo (e.g., "zsh/.zshrc")
     target: Path  # Path on the host system (e.g., "~/.zshrc")
     profile: str = "default"
+    template: bool = False  # Rendered per host into .build/<host> and linked from there
+    deploy: str = "link"  # "link" (symlink) or "copy" (real files, see services.copy_deploy)
+    _expanded: Optional[Path] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         # Ensure paths are Path objects
         if isinstance(self.source, str):
-            self.source = Path(self.source)
+            object.__setattr__(self, "source", Path(self.source))
         if isinstance(self.target, str):
-            self.target = Path(self.target)
+            object.__setattr__(self, "target", Path(self.target))
 
     @property
     def expanded_target(self) -> Path:
-        """Returns the fully resolved target path (expands ~)."""
-        return self.target.expanduser().resolve()
+        """
+        Returns the absolute target path (expands ~ and resolves parent directories).
+        The last component is not followed, so a symlink at the target can be inspected.
+        Resolved once per instance; call refresh() after the filesystem layout changes.
+        """
+        if self._expanded is None:
+            object.__setattr__(self, "_expanded", self.expand_target(self.target))
+        return self._expanded
+
+    def refresh(self) -> None:
+        """Drops the cached expanded target so the next access resolves it again."""
+        object.__setattr__(self, "_expanded", None)
+
+    @staticmethod
+    def expand_target(target: Path) -> Path:
+        target = Path(target).expanduser()
+        return _resolve(target.parent) / target.name
+
+    @staticmethod
+    def resolve_all(dotfiles: Iterable["Dotfile"]) -> None:
+        """Bulk-resolves expanded targets, resolving each distinct parent directory only once."""
+        parents: Dict[Path, Path] = {}
+        for df in dotfiles:
+            if df._expanded is not None:
+                continue
+            target = df.target.expanduser()
+            parent = parents.get(target.parent)
+            if parent is None:
+                parent = parents[target.parent] = _resolve(target.parent)
+            object.__setattr__(df, "_expanded", parent / target.name)
+
+    @staticmethod
+    def refresh_all(dotfiles: Iterable["Dotfile"]) -> None:
+        for df in dotfiles:
+            df.refresh()
+
+
+class LinkAction(str, Enum):
+    CREATE = "create"      # Target missing: create the symlink
+    SKIP = "skip"          # Already linked to the repo
+    CONFLICT = "conflict"  # Something else is in the way and --force was not given
+    BACKUP = "backup"      # Something else is in the way: backup, remove, then link
+    BROKEN = "broken"      # Source missing in the repo
+    UPDATE = "update"      # Copy deploy: copy the files that changed in the repo
+
+
+@dataclass
+class LinkStep:
+    """One entry of a link plan, computed before anything is touched on disk."""
+    dotfile: Dotfile
+    action: LinkAction
+    source: Path
+    target: Path
+    detail: str = ""
+    error: Optional[str] = None
+    copy: Optional[Any] = None  # Copy deploys: the files to transfer (services.copy_deploy.CopyPlan)
+
+
+class LinkStatus(str, Enum):
+    ACTIVE = "active"                  # Target is a symlink to the repo source
+    NOT_INSTALLED = "not_installed"    # Nothing at the target path
+    MISSING_SOURCE = "missing_source"  # Source missing in the repo
+    WRONG_TARGET = "wrong_target"      # Target is a symlink to something else
+    FILE_EXISTS = "file_exists"        # Target is a regular file or directory
+    COPIED = "copied"                  # Copy deploy matching the repo
+    OUTDATED = "outdated"              # Copy deploy older than the repo source
+    MODIFIED = "modified"              # Copy deploy edited on the host since it was installed
+
+
+@dataclass
+class StatusReport:
+    dotfile: Dotfile
+    status: LinkStatus
+    source: Path
+    target: Path
+
+
+@dataclass
+class DriftReport:
+    """Content comparison of an entry's repo source (or rendering) and its host target."""
+    dotfile: Dotfile
+    source: Path
+    target: Path
+    linked: bool = False  # The target is a symlink to the source: it cannot drift
+    changed: List[str] = field(default_factory=list)  # Relative paths ("" for a file) whose content differs
+    only_source: List[str] = field(default_factory=list)  # Missing on the host
+    only_target: List[str] = field(default_factory=list)  # Not in the repo
+    error: Optional[str] = None
+
+    @property
+    def drifted(self) -> bool:
+        return bool(self.changed or self.only_source or self.only_target or self.error)
+
+
+@dataclass
+class BackupRecord:
+    """Manifest entry of the backup store: what was saved, from where and when."""
+    id: str
+    path: Path
+    time: float
+    kind: str  # "file", "tree" or "link"
+    hash: str  # Blob hash (file), tree-listing hash (tree) or link target (link)
+    mode: int
+    size: int
@@ -1,34 +1,73 @@
+from functools import cached_property
 from pathlib import Path
 import os
+import platform
 import sys
 
 class AppContext:
-    def __init__(self):
+    """
+    Repo and cache locations. Everything is resolved on first access (not at
+    import time), so commands that never touch the repo do not pay for the
+    discovery; call reset() to rediscover after a chdir or env change.
+    """
+
+    _LAZY = ("repo_root", "config_path", "backup_dir", "profiles_dir", "cache_dir", "build_dir")
+
+    def reset(self) -> None:
+        for name in self._LAZY:
+            self.__dict__.pop(name, None)
+
+    @cached_property
+    def repo_root(self) -> Path:
         # 1. Environment Variable (Explicit override)
         env_repo = os.getenv("DOTFILE_REPO")
-        
+        if env_repo:
+            return Path(env_repo).resolve()
+
         # 2. Current Working Directory (Standard behavior)
         cwd = Path(os.getcwd()).resolve()
-        
+        if self._is_repo(cwd):
+            return cwd
+
         # 3. Convention fallback
         home_repo = Path.home() / "dotfiles"
+        if self._is_repo(home_repo):
+            return home_repo
 
-        if env_repo:
-            self.repo_root = Path(env_repo).resolve()
-        elif (cwd / "dotfiles.json").exists():
-            self.repo_root = cwd
-        elif (home_repo / "dotfiles.json").exists():
-            self.repo_root = home_repo
-        else:
-            # Fallback: Assume CWD is where we want to initialize or operate
-            self.repo_root = cwd
-
-        self.config_path = self.repo_root / "dotfiles.json"
-        self.backup_dir = self.repo_root / ".backups"
+        # Fallback: Assume CWD is where we want to initialize or operate
+        return cwd
+
+    @cached_property
+    def config_path(self) -> Path:
+        return self.repo_root / "dotfiles.json"
+
+    @cached_property
+    def backup_dir(self) -> Path:
+        return self.repo_root / ".backups"
+
+    @cached_property
+    def profiles_dir(self) -> Path:
+        # Optional per-profile config store (see services.profile_store)
+        return self.repo_root / ".dotfile-pro" / "profiles"
+
+    @cached_property
+    def build_dir(self) -> Path:
+        # Rendered templates of this host (see services.template_renderer)
+        return self.repo_root / ".build" / (platform.node() or "localhost")
+
+    @cached_property
+    def cache_dir(self) -> Path:
+        # Host-local caches (scan index, etc.): $XDG_CACHE_HOME/dotfile-pro
+        cache_home = os.getenv("XDG_CACHE_HOME")
+        return (Path(cache_home) if cache_home else Path.home() / ".cache") / "dotfile-pro"
+
+    @staticmethod
+    def _is_repo(path: Path) -> bool:
+        return (path / "dotfiles.json").exists() or (path / ".dotfile-pro" / "profiles").is_dir()
 
     def verify_repo(self) -> bool:
         """Returns True if a valid repo structure is found."""
-        return self.config_path.exists()
+        return self._is_repo(self.repo_root)
 
     def get_absolute_source(self, relative_source: Path) -> Path:
         return (self.repo_root / relative_source).resolve()
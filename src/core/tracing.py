@@ -0,0 +1,200 @@
+import builtins
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Functions counted as "syscalls" while tracing is on. They are wrapped only
+# between start() and stop(); callers look them up as os.<name> at call time.
+SYSCALLS = (
+    "stat", "lstat", "scandir", "listdir", "readlink", "symlink", "link", "unlink",
+    "rename", "replace", "mkdir", "rmdir", "chmod", "utime", "fsync", "copy_file_range",
+)
+
+_tracer: Optional["Tracer"] = None
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start", "children", "counters")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: dict):
+        self.tracer, self.name, self.cat, self.args = tracer, name, cat, args
+
+    def __enter__(self):
+        self.children = 0.0
+        self.counters: Counter = Counter()
+        self.tracer._stack().append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.tracer._finish(self, end)
+        return False
+
+
+class Tracer:
+    """
+    Records spans (name, category, start, duration), counters (syscalls,
+    bytes...) attributed to the innermost open span of each thread, and
+    writes them as a Chrome trace (chrome://tracing or ui.perfetto.dev).
+    """
+
+    def __init__(self):
+        self.events: List[dict] = []
+        self.origin = time.perf_counter_ns()
+        self.pid = os.getpid()
+        self._local = threading.local()
+        self._totals: List[Counter] = []  # One per thread, merged on read
+        self._originals: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+
+    def _stack(self) -> List[_Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+            self._local.totals = Counter()
+            with self._lock:
+                self._totals.append(self._local.totals)
+        return stack
+
+    def span(self, name: str, cat: str, args: dict) -> _Span:
+        return _Span(self, name, cat, args)
+
+    def add(self, counter: str, n: int = 1) -> None:
+        stack = self._stack()
+        self._local.totals[counter] += n
+        if stack:
+            stack[-1].counters[counter] += n
+
+    def _finish(self, span: _Span, end: int) -> None:
+        stack = self._stack()
+        stack.pop()
+        duration = end - span.start
+        if stack:
+            stack[-1].children += duration
+        args = dict(span.args)
+        args.update(span.counters)
+        self.events.append({
+            "name": span.name, "cat": span.cat, "ph": "X", "pid": self.pid, "tid": threading.get_ident(),
+            "ts": (span.start - self.origin) / 1000, "dur": duration / 1000,
+            # Time not covered by child spans; the summary adds these up per phase
+            "self_us": (duration - span.children) / 1000, "args": args,
+        })
+
+    def totals(self) -> Counter:
+        merged: Counter = Counter()
+        with self._lock:
+            for counts in self._totals:
+                merged.update(counts)
+        return merged
+
+    def install(self) -> None:
+        """Wraps the os functions in SYSCALLS (and open) with counters."""
+        def counted(name: str, fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                self.add(f"sys.{name}")
+                return fn(*args, **kwargs)
+            return wrapper
+
+        for name in SYSCALLS:
+            fn = getattr(os, name, None)
+            if fn is not None:
+                self._originals[name] = fn
+                setattr(os, name, counted(name, fn))
+        self._originals["open"] = builtins.open
+        builtins.open = counted("open", builtins.open)
+
+    def uninstall(self) -> None:
+        for name, fn in self._originals.items():
+            setattr(builtins if name == "open" else os, name, fn)
+        self._originals.clear()
+
+    def summary(self) -> List[dict]:
+        """Per-phase (span category) totals, slowest first."""
+        phases: Dict[str, dict] = {}
+        for event in self.events:
+            phase = phases.setdefault(event["cat"], {"phase": event["cat"], "spans": 0, "self_ms": 0.0, "syscalls": 0, "bytes": 0})
+            phase["spans"] += 1
+            phase["self_ms"] += event["self_us"] / 1000
+            for key, value in event["args"].items():
+                if key.startswith("sys."):
+                    phase["syscalls"] += value
+                elif key.startswith("bytes"):
+                    phase["bytes"] += value
+        return sorted(phases.values(), key=lambda p: p["self_ms"], reverse=True)
+
+    def write(self, path: Path) -> None:
+        data = {
+            "traceEvents": [{k: v for k, v in e.items() if k != "self_us"} for e in self.events],
+            "displayTimeUnit": "ms",
+            "otherData": {"counters": dict(self.totals()), "summary": self.summary()},
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def start() -> Tracer:
+    """Turns tracing on for the whole process."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+        _tracer.install()
+    return _tracer
+
+
+def stop() -> Optional[Tracer]:
+    """Turns tracing off and returns what was recorded."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.uninstall()
+    return tracer
+
+
+def span(name: str, cat: str = "app", **args):
+    """Times a block: `with tracing.span("git add", "git"):`. A shared no-op when tracing is off."""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, cat, args)
+
+
+def add(counter: str, n: int = 1) -> None:
+    """Adds to a counter (e.g. "bytes_copied") of the current span."""
+    if _tracer is not None:
+        _tracer.add(counter, n)
+
+
+def traced(cat: str, name: Optional[str] = None) -> Callable:
+    """Decorator: each call of the function is a span of phase `cat`."""
+    def decorate(fn: Callable) -> Callable:
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with _tracer.span(label, cat, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
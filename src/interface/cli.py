@@ -1,64 +1,184 @@
 import typer
-from rich.console import Console
-from rich.table import Table
-from rich.prompt import Confirm
+from enum import Enum
+from functools import lru_cache
 from pathlib import Path
-from core.models import Dotfile
-from services.config_service import ConfigService
-from services.file_service import FileService
-from services.git_local import LocalGit
-from services.scanner import SystemScanner
+from typing import Optional
+
+# Startup matters (shell prompts, hooks, the zipapp on Termux): only typer is
+# imported eagerly. Rich, the services and the repo context are loaded by the
+# commands that need them, so `--help` never touches them.
 
 app = typer.Typer(name="dotfile-pro", add_completion=False)
-console = Console()
-config_service = ConfigService()
+
+class _LazyConsole:
+    """Stands in for the Rich console until the first command actually prints."""
+    def __getattr__(self, name):
+        global console
+        from rich.console import Console
+        console = Console()
+        return getattr(console, name)
+
+console = _LazyConsole()
+
+@lru_cache(maxsize=None)
+def _config_service():
+    from services.config_service import ConfigService
+    return ConfigService()
+
+@app.callback()
+def main(
+    ctx: typer.Context,
+    trace: bool = typer.Option(False, "--trace", help="Record timed spans to a Chrome trace file and print a per-phase summary (or set DOTFILE_TRACE)"),
+):
+    """Dotfile Manager Pro: manage dotfiles with symlinks and local git."""
+    import os
+
+    path = _trace_path(trace, os.getenv("DOTFILE_TRACE", ""))
+    if path is None:
+        return
+    from core import tracing
+
+    tracing.start()
+    ctx.call_on_close(lambda: _finish_trace(path))
+    ctx.with_resource(tracing.span(f"dotfile-pro {ctx.invoked_subcommand}", "cli"))
+
+def _trace_path(trace: bool, env: str) -> Optional[Path]:
+    """
+    Where to write the trace, or None if tracing is off. DOTFILE_TRACE=1/true/yes/on
+    traces to the default file, 0/false/no/off (or unset) does not trace, and any
+    other value is the file to write.
+    """
+    value = env.strip()
+    if value.lower() in ("", "0", "false", "no", "off"):
+        return Path("dotfile-pro-trace.json") if trace else None
+    if value.lower() in ("1", "true", "yes", "on"):
+        return Path("dotfile-pro-trace.json")
+    return Path(value)
+
+def _finish_trace(path: Path) -> None:
+    from rich.console import Console
+    from rich.table import Table
+    from core import tracing
+
+    tracer = tracing.stop()
+    tracer.write(path)
+    table = Table(title="Trace summary (self time per phase)", show_header=True)
+    for column in ("Phase", "Spans", "Time", "Syscalls", "Bytes copied"):
+        table.add_column(column, justify="left" if column == "Phase" else "right")
+    for phase in tracer.summary():
+        table.add_row(phase["phase"], str(phase["spans"]), f"{phase['self_ms']:.1f} ms", str(phase["syscalls"]), str(phase["bytes"]))
+    # stderr, so traced runs can still be piped
+    err = Console(stderr=True)
+    err.print(table)
+    err.print(f"[dim]Chrome trace written to {path} (open it in chrome://tracing or ui.perfetto.dev)[/dim]")
+
+cache_app = typer.Typer(help="Manage the persistent scan index.")
+app.add_typer(cache_app, name="cache")
+config_app = typer.Typer(help="Convert between dotfiles.json and the per-profile store.")
+app.add_typer(config_app, name="config")
+backups_app = typer.Typer(help="Inspect, restore and prune backups in .backups/.")
+app.add_typer(backups_app, name="backups")
+
+def _scan_cache():
+    from core.paths import context
+    from services.scan_cache import ScanCache
+    return ScanCache(context.cache_dir / "scan-index.json")
 
 @app.command()
-def scan():
+def scan(
+    rebuild: bool = typer.Option(False, "--rebuild", help="Discard the scan index and rebuild it from scratch"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Walk every directory without using the scan index"),
+    limit: int = typer.Option(None, "--limit", min=1, help="Stop after this many candidates"),
+    timeout: float = typer.Option(None, "--timeout", min=0, help="Stop scanning after this many seconds"),
+):
     """Scan system for unmanaged dotfiles."""
-    scanner = SystemScanner(config_service)
+    from rich.prompt import Confirm
+    from core.exceptions import ConfigError
+    from services.config_service import DotfileRegistry
+    from services.copy_engine import CopyReport
+    from services.git_local import GitSession
+    from services.scan_rules import ScanRules
+    from services.scanner import SystemScanner
+
+    try:
+        rules = ScanRules.load()
+    except ConfigError as e:
+        console.print(f"[bold red]❌ {e}[/bold red]")
+        raise typer.Exit(code=1)
+    cache = None if no_cache else _scan_cache()
+    if cache and rebuild:
+        cache.clear()
+    # No registry: the managed targets come from the scan index while dotfiles.json is unchanged
+    scanner = SystemScanner(_config_service(), cache=cache, rules=rules)
     console.print("\n[bold cyan]🔍 Scanning system...[/bold cyan]")
-    
-    candidates = scanner.scan()
-    
+
+    # Results are shown as they are found instead of after the whole walk
+    candidates = []
+    found = scanner.iter_scan(limit=limit, timeout=timeout)
+    try:
+        for app_name, path in found:
+            candidates.append((app_name, path))
+            console.print(f"  [bold cyan]{app_name}[/bold cyan]  {path}", highlight=False)
+    finally:
+        found.close()
+
+    if scanner.truncated:
+        console.print(f"[yellow]⏱ Scan stopped early: showing the first {len(candidates)} candidates.[/yellow]")
     if not candidates:
-        console.print("[green]✨ System clean! No unmanaged files found.[/green]")
+        if not scanner.truncated:
+            console.print("[green]✨ System clean! No unmanaged files found.[/green]")
         return
-
-    table = Table(show_header=True)
-    table.add_column("App", style="bold cyan")
-    table.add_column("Path detected")
-    
-    for app_name, path in candidates:
-        table.add_row(app_name, str(path))
-    
-    console.print(table)
     console.print("")
 
     if Confirm.ask("Do you want to import detected files?"):
-        imported_files = False
-        for app_name, path in candidates:
-            if Confirm.ask(f"Add [cyan]{app_name}[/cyan] ({path.name})?"):
-                # Preguntar por el perfil
-                profile = Confirm.ask(f"Assign to 'default' profile?", default=True)
-                if not profile:
-                    profile_name = console.input("[bold yellow]Enter profile name: [/bold yellow]")
-                else:
-                    profile_name = "default"
-
-                try:
-                    # Fix: Use app_name as subfolder to avoid collisions (e.g. nvim/init.lua vs emacs/init.el)
-                    safe_app_name = "".join(c for c in app_name if c.isalnum() or c in ('-', '_')).strip()
-                    rel_path = Path("auto-scan") / safe_app_name / path.name
-                    new_dotfile = FileService.safe_import(path, rel_path, profile_name)
-                    config_service.add_dotfile(new_dotfile)
-                    console.print(f"[green]✅ Imported {app_name} to profile '{profile_name}'[/green]")
-                    imported_files = True
-                except Exception as e:
-                    console.print(f"[red]❌ Failed to import {app_name}: {e}[/red]")
-        
+        report = CopyReport()
+        session = GitSession()
+        registry = DotfileRegistry(_config_service()).load()
+        try:
+            _import_candidates(candidates, registry, report, session)
+        finally:
+            # Single atomic save for the whole batch, even if the loop was interrupted
+            imported_files = registry.commit()
+
         if imported_files:
-            LocalGit.commit_changes("Imported files via scan")
+            console.print(f"[dim]Copy: {report.summary()}[/dim]")
+            session.stage(_config_service().storage_path())
+            _git_commit(session, "Imported files via scan")
+
+def _git_commit(session, message: str) -> bool:
+    """One commit for the whole operation; git problems are reported, not fatal."""
+    from core.exceptions import GitError
+
+    try:
+        return session.commit(message)
+    except GitError as e:
+        console.print(f"[yellow]⚠️ {e}[/yellow]")
+        return False
+
+def _import_candidates(candidates, registry, report, session) -> None:
+    """Interactive import loop; accepted files are staged in the registry and the git session."""
+    from rich.prompt import Confirm
+    from services.file_service import FileService
+
+    for app_name, path in candidates:
+        if Confirm.ask(f"Add [cyan]{app_name}[/cyan] ({path.name})?"):
+            # Preguntar por el perfil
+            profile = Confirm.ask(f"Assign to 'default' profile?", default=True)
+            if not profile:
+                profile_name = console.input("[bold yellow]Enter profile name: [/bold yellow]")
+            else:
+                profile_name = "default"
+
+            try:
+                # Fix: Use app_name as subfolder to avoid collisions (e.g. nvim/init.lua vs emacs/init.el)
+                safe_app_name = "".join(c for c in app_name if c.isalnum() or c in ('-', '_')).strip()
+                rel_path = Path("auto-scan") / safe_app_name / path.name
+                new_dotfile = FileService.safe_import(path, rel_path, profile_name, report)
+                registry.add(new_dotfile)
+                session.stage(rel_path)
+                console.print(f"[green]✅ Imported {app_name} to profile '{profile_name}'[/green]")
+            except Exception as e:
+                console.print(f"[red]❌ Failed to import {app_name}: {e}[/red]")
 
 @app.command()
 def ui():
@@ -73,9 +193,16 @@ def ui():
 def add(
     file: Path = typer.Argument(..., exists=True, help="Archivo a gestionar"), 
     profile: str = typer.Option("default", "-p", help="Perfil de configuración"), 
-    folder: str = typer.Option("misc", "-f", help="Subcarpeta dentro del repositorio")
+    folder: str = typer.Option("misc", "-f", help="Subcarpeta dentro del repositorio"),
+    template: bool = typer.Option(False, "--template", help="Gestionar como plantilla ({{ host }}, {{ env.VAR }}...) renderizada por host"),
+    copy: bool = typer.Option(False, "--copy", help="Instalar una copia real en lugar de un enlace simbólico"),
 ):
     """Añade de forma segura un archivo al repositorio de dotfiles."""
+    from services.config_service import DotfileRegistry
+    from services.copy_engine import CopyReport
+    from services.file_service import FileService
+    from services.git_local import GitSession
+
     try:
         # Sanitización de la carpeta para evitar directory traversal
         clean_folder = "".join(c for c in folder if c.isalnum() or c in ('-', '_')).strip()
@@ -83,57 +210,361 @@ def add(
         
         rel_path = Path(clean_folder) / file.name
         
-        with console.status(f"[bold yellow]Importando {file.name}...[/bold yellow]"):
-            new_dotfile = FileService.safe_import(file, rel_path, profile)
-            config_service.add_dotfile(new_dotfile)
+        with console.status(f"[bold yellow]Importando {file.name}...[/bold yellow]") as spinner:
+            def show_progress(p):
+                percent = 100 * p.bytes_done // p.bytes_total if p.bytes_total else 100
+                spinner.update(f"[bold yellow]Importando {file.name}... {percent}% ({p.files_done}/{p.files_total}) {p.current}[/bold yellow]")
+
+            report = CopyReport()
+            new_dotfile = FileService.safe_import(file, rel_path, profile, report, show_progress, template, "copy" if copy else "link")
+            registry = DotfileRegistry(_config_service()).load()
+            registry.add(new_dotfile)
+            registry.commit()
             
         console.print(f"[bold green]✨ ¡Éxito![/bold green] {file.name} añadido al perfil [bold cyan]{profile}[/bold cyan]")
+        console.print(f"[dim]Copia: {report.summary()}[/dim]")
         
-        # Auto-commit local
-        if LocalGit.commit_changes(f"Add: {file.name} (profile: {profile})"):
+        # Auto-commit local: the imported file and the config, in one commit
+        session = GitSession()
+        session.stage(rel_path, _config_service().storage_path())
+        if _git_commit(session, f"Add: {file.name} (profile: {profile})"):
             console.print("[dim]Punto de restauración creado en Git local.[/dim]")
         
     except Exception as e:
         console.print(f"[bold red]❌ Error crítico:[/bold red] {str(e)}")
         raise typer.Exit(code=1)
 
+class OutputFormat(str, Enum):
+    TABLE = "table"
+    JSON = "json"
+    TSV = "tsv"
+
+# Keyed on LinkStatus / LinkAction values (str enums) so core.models is not needed at import time
+STATUS_STYLES = {
+    "active": "[green]ACTIVE[/green]",
+    "not_installed": "[dim]NOT INSTALLED[/dim]",
+    "missing_source": "[red]MISSING SOURCE[/red]",
+    "wrong_target": "[yellow]WRONG TARGET[/yellow]",
+    "file_exists": "[red]FILE EXISTS[/red]",
+    "copied": "[green]COPIED[/green]",
+    "outdated": "[yellow]OUTDATED COPY[/yellow]",
+    "modified": "[red]MODIFIED COPY[/red]",
+}
+
 @app.command()
-def status(profile: str = "all"):
+def status(
+    profile: str = "all",
+    output_format: OutputFormat = typer.Option(OutputFormat.TABLE, "--format", help="Output format: table, json or tsv"),
+    workers: int = typer.Option(8, "--workers", "-j", min=1, help="Parallel workers used to stat targets"),
+):
     """Check status of managed files."""
-    dotfiles = config_service.load_config()
-    if profile != "all":
-        dotfiles = [d for d in dotfiles if d.profile == profile]
-        
+    import json
+    import sys
+    from services.config_service import DotfileRegistry
+    from services.file_service import FileService
+
+    dotfiles = DotfileRegistry(_config_service()).load(profile).all()
+    reports = FileService.collect_status(dotfiles, workers)
+
+    # Machine-readable formats bypass Rich entirely
+    if output_format == OutputFormat.JSON:
+        sys.stdout.write(json.dumps([
+            {"profile": r.dotfile.profile, "source": str(r.dotfile.source), "target": str(r.dotfile.target), "status": r.status.value}
+            for r in reports
+        ]) + "\n")
+        return
+    if output_format == OutputFormat.TSV:
+        sys.stdout.write("".join(
+            f"{r.dotfile.profile}\t{r.dotfile.source}\t{r.dotfile.target}\t{r.status.value}\n" for r in reports
+        ))
+        return
+
+    from rich.table import Table
     table = Table(show_header=True)
     table.add_column("Profile", style="cyan")
     table.add_column("Source")
     table.add_column("Target")
     table.add_column("Status")
     
-    for df in dotfiles:
-        status_msg = FileService.check_status(df)
-        table.add_row(df.profile, str(df.source), str(df.target), status_msg)
+    for r in reports:
+        table.add_row(r.dotfile.profile, str(r.dotfile.source), str(r.dotfile.target), STATUS_STYLES[r.status])
         
     console.print(table)
 
+LINK_ACTION_STYLES = {
+    "create": "[green]CREATE[/green]",
+    "skip": "[dim]SKIP[/dim]",
+    "conflict": "[yellow]CONFLICT[/yellow]",
+    "backup": "[magenta]BACKUP + REPLACE[/magenta]",
+    "broken": "[red]BROKEN[/red]",
+    "update": "[cyan]UPDATE COPY[/cyan]",
+}
+
 @app.command()
-def link(profile: str = "all", force: bool = False):
-    """Re-link dotfiles."""
-    dotfiles = config_service.load_config()
-    if profile != "all":
-        dotfiles = [d for d in dotfiles if d.profile == profile]
-    
-    for df in dotfiles:
-        msg = FileService.create_symlink(df, force)
-        console.print(f"{df.source.name}: {msg}")
+def link(
+    profile: str = "all",
+    force: bool = False,
+    dry_run: bool = typer.Option(False, "--dry-run", help="Print the plan without touching the filesystem"),
+    copy: bool = typer.Option(False, "--copy", help="Switch the entries to copy deploys: real copies instead of symlinks (only changed files are copied)"),
+    workers: int = typer.Option(8, "--workers", "-j", min=1, help="Parallel workers used to apply the plan"),
+):
+    """Re-link dotfiles (rendering template entries first)."""
+    from collections import Counter
+    from core.exceptions import ConfigError
+    from core.models import LinkAction
+    from services.config_service import DotfileRegistry
+    from services.file_service import FileService
+
+    registry = DotfileRegistry(_config_service()).load(profile)
+    dotfiles = registry.all()
+    if copy:
+        from dataclasses import replace
+        dotfiles = [replace(df, deploy="copy") for df in dotfiles]
+        if not dry_run:
+            # Recorded on the entries, so later runs keep deploying copies
+            for df in dotfiles:
+                registry.update(df)
+            registry.commit()
+
+    renders = []
+    if any(df.template for df in dotfiles):
+        from services.template_renderer import TemplateRenderer
+        try:
+            renders = TemplateRenderer.load().render(dotfiles, dry_run)
+        except ConfigError as e:
+            console.print(f"[red]{e}[/red]")
+            raise typer.Exit(code=1)
+        for render in renders:
+            if render.error:
+                console.print(f"[red]TEMPLATE FAILED[/red] {render.dotfile.source}: {render.error}")
+            elif dry_run and render.rendered:
+                console.print(f"[cyan]RENDER[/cyan] {render.dotfile.source} -> {render.output}")
+        # Entries whose rendering failed are not linked
+        failed_renders = {render.dotfile for render in renders if render.error}
+        dotfiles = [df for df in dotfiles if df not in failed_renders]
+
+    plan = FileService.plan_links(dotfiles, force, workers)
+
+    if dry_run:
+        from rich.table import Table
+        table = Table(show_header=True, title="Link plan (dry run)")
+        table.add_column("Action")
+        table.add_column("Source")
+        table.add_column("Target")
+        table.add_column("Detail", style="dim")
+        for step in plan:
+            table.add_row(LINK_ACTION_STYLES[step.action], str(step.dotfile.source), str(step.dotfile.target), step.detail)
+        console.print(table)
+        return
+
+    results = FileService.apply_link_plan(plan, workers)
+
+    failed = [step for step in results if step.error] + [render for render in renders if render.error]
+    for step in results:
+        if step.error:
+            console.print(f"[red]FAILED[/red] {step.dotfile.source.name}: {step.error}")
+        elif step.action in (LinkAction.CONFLICT, LinkAction.BROKEN):
+            console.print(f"{LINK_ACTION_STYLES[step.action]} {step.dotfile.source.name}: {step.detail}")
+
+    counts = Counter(step.action for step in results if not step.error)
+    rendered = f"{sum(render.rendered for render in renders)} rendered, " if renders else ""
+    console.print(
+        f"[bold]Summary:[/bold] {rendered}{counts[LinkAction.CREATE]} linked, {counts[LinkAction.BACKUP]} replaced, "
+        f"{counts[LinkAction.UPDATE]} updated, "
+        f"{counts[LinkAction.SKIP]} ok, {counts[LinkAction.CONFLICT]} conflicts, "
+        f"{counts[LinkAction.BROKEN]} broken, {len(failed)} failed"
+    )
+    if failed:
+        raise typer.Exit(code=1)
+
+@app.command()
+def watch(
+    profile: str = "all",
+    force: bool = False,
+    debounce: float = typer.Option(0.3, "--debounce", min=0, help="Seconds to let a burst of events settle"),
+    poll: bool = typer.Option(False, "--poll", help="Poll instead of using inotify"),
+    interval: float = typer.Option(2.0, "--interval", min=0.1, help="Polling interval in seconds (with --poll or without inotify)"),
+):
+    """Keep links in place: repair entries as soon as their link breaks."""
+    from services.watcher import InotifyBackend, LinkWatcher, PollingBackend
+
+    def report(steps):
+        for step in steps:
+            if step.error:
+                console.print(f"[red]FAILED[/red] {step.dotfile.source.name}: {step.error}")
+            else:
+                console.print(f"{LINK_ACTION_STYLES[step.action]} {step.dotfile.target} {step.detail}".rstrip())
+
+    use_inotify = not poll and InotifyBackend.available()
+    backend = InotifyBackend() if use_inotify else PollingBackend(interval)
+    watcher = LinkWatcher(_config_service(), profile, force, debounce, backend, on_repair=report)
+    console.print(f"[bold cyan]👀 Watching links ({'inotify' if use_inotify else f'polling every {interval}s'}). Ctrl+C to stop.[/bold cyan]")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        console.print("[dim]Stopped.[/dim]")
+
+@app.command()
+def diff(
+    profile: str = "all",
+    name_only: bool = typer.Option(False, "--name-only", help="Only list the entries and files that differ"),
+    workers: int = typer.Option(8, "--workers", "-j", min=1, help="Parallel workers used to stat and hash files"),
+):
+    """Show how host files differ from the repo (exit code 1 if any differ)."""
+    from rich.text import Text
+    from core.paths import context
+    from services.config_service import DotfileRegistry
+    from services.drift import DriftChecker
+    from services.hash_index import HashIndex
+
+    dotfiles = DotfileRegistry(_config_service()).load(profile).all()
+    index = HashIndex(context.cache_dir / "hash-index.json").load()
+    reports = DriftChecker(index, workers).check(dotfiles)
+    # A full check looked up every indexed file: forget the rest
+    index.save(prune=profile == "all")
+
+    line_styles = {"+": "green", "-": "red", "@": "cyan"}
+    drifted = [r for r in reports if r.drifted]
+    for r in drifted:
+        console.print(f"[bold]{r.dotfile.source}[/bold] → {r.dotfile.target}")
+        if r.error:
+            console.print(f"  [red]{r.error}[/red]")
+        for rel in r.only_source:
+            console.print(f"  [red]missing on host:[/red] {rel or r.dotfile.target}")
+        for rel in r.only_target:
+            console.print(f"  [yellow]only on host:[/yellow] {rel}")
+        for rel in r.changed:
+            if name_only:
+                console.print(f"  [magenta]changed:[/magenta] {rel or r.dotfile.target}")
+                continue
+            for line in DriftChecker.unified_diff(r, rel):
+                style = "bold" if line.startswith(("+++", "---")) else line_styles.get(line[:1])
+                console.print(Text(line.rstrip("\n"), style=style or ""), soft_wrap=True)
+
+    linked = sum(r.linked for r in reports)
+    console.print(
+        f"[bold]Summary:[/bold] {len(drifted)} differ, {len(reports) - len(drifted) - linked} identical, "
+        f"{linked} linked [dim]({index.misses} files hashed, {index.hits} from the index)[/dim]"
+    )
+    if drifted:
+        raise typer.Exit(code=1)
+
+@cache_app.command("clear")
+def cache_clear():
+    """Invalidate the scan index so the next scan walks everything."""
+    if _scan_cache().clear():
+        console.print("[green]Scan index cleared.[/green]")
+    else:
+        console.print("[dim]No scan index to clear.[/dim]")
+
+@config_app.command("import")
+def config_import(path: Path = typer.Argument(None, help="JSON file to import (default: dotfiles.json)")):
+    """Load a dotfiles.json-format file into the per-profile store (enables it)."""
+    from core.exceptions import ConfigError
+    from core.paths import context
+
+    config_service = _config_service()
+    source = path or config_service.config_path
+    had_json = config_service.config_path.exists()
+    try:
+        count = config_service.import_json(source)
+    except ConfigError as e:
+        console.print(f"[bold red]❌ {e}[/bold red]")
+        raise typer.Exit(code=1)
+    console.print(f"[green]Imported {count} entries into {context.profiles_dir}.[/green]")
+    if had_json:
+        console.print(f"[yellow]{config_service.config_path.name} is no longer read; it was moved to {config_service.retired_path.name}.[/yellow]")
+
+@config_app.command("export")
+def config_export(path: Path = typer.Argument(None, help="Destination file (default: dotfiles.json)")):
+    """Write every entry to a dotfiles.json-format file."""
+    from core.exceptions import ConfigError
+
+    config_service = _config_service()
+    dest = path or config_service.config_path
+    try:
+        count = config_service.export_json(dest)
+    except ConfigError as e:
+        console.print(f"[bold red]❌ {e}[/bold red]")
+        raise typer.Exit(code=1)
+    console.print(f"[green]Exported {count} entries to {dest}.[/green]")
+
+@backups_app.command("list")
+def backups_list(path: Path = typer.Option(None, "--path", help="Only show backups of this path")):
+    """List backups, newest first."""
+    import os
+    from datetime import datetime
+    from rich.table import Table
+    from core.paths import context
+    from services.backup_store import BackupStore
+
+    records = BackupStore(context.backup_dir).records()
+    if path:
+        wanted = Path(os.path.abspath(path.expanduser()))
+        records = [r for r in records if r.path == wanted]
+    if not records:
+        console.print("[dim]No backups found.[/dim]")
+        return
+
+    table = Table(show_header=True)
+    table.add_column("ID", style="cyan")
+    table.add_column("Date")
+    table.add_column("Kind")
+    table.add_column("Size", justify="right")
+    table.add_column("Original path")
+    for r in reversed(records):
+        date = datetime.fromtimestamp(r.time).strftime("%Y-%m-%d %H:%M:%S")
+        table.add_row(r.id, date, r.kind, str(r.size), str(r.path))
+    console.print(table)
+
+@backups_app.command("restore")
+def backups_restore(
+    backup_id: str = typer.Argument(..., help="Backup ID (a unique prefix is enough)"),
+    to: Path = typer.Option(None, "--to", help="Restore here instead of the original path"),
+    force: bool = typer.Option(False, "--force", help="Replace what is at the destination (it is backed up first)"),
+):
+    """Restore a backup."""
+    from core.exceptions import BackupError
+    from core.paths import context
+    from services.backup_store import BackupStore
+
+    try:
+        dest = BackupStore(context.backup_dir).restore(backup_id, to, overwrite=force)
+    except BackupError as e:
+        console.print(f"[bold red]❌ {e}[/bold red]")
+        raise typer.Exit(code=1)
+    console.print(f"[green]Restored to {dest}[/green]")
+
+@backups_app.command("prune")
+def backups_prune(
+    keep_last: int = typer.Option(None, "--keep-last", min=0, help="Keep only the N newest backups of each path"),
+    older_than: float = typer.Option(None, "--older-than", min=0, help="Remove backups older than this many days"),
+):
+    """Apply a retention policy and delete unreferenced backup data."""
+    if keep_last is None and older_than is None:
+        console.print("[yellow]Give --keep-last and/or --older-than.[/yellow]")
+        raise typer.Exit(code=1)
+
+    from core.paths import context
+    from services.backup_store import BackupStore
+    removed, blobs = BackupStore(context.backup_dir).prune(keep_last, older_than)
+    console.print(f"[green]Removed {removed} backups and {blobs} unreferenced objects.[/green]")
 
 @app.command()
 def commit(message: str):
     """Create a local git commit."""
-    if LocalGit.commit_changes(message):
+    from core.exceptions import GitError
+    from services.git_local import LocalGit
+
+    try:
+        committed = LocalGit.commit_changes(message)
+    except GitError as e:
+        console.print(f"[bold red]❌ {e}[/bold red]")
+        raise typer.Exit(code=1)
+    if committed:
         console.print("[green]Changes committed locally.[/green]")
     else:
-        console.print("[yellow]Nothing to commit or git error.[/yellow]")
+        console.print("[yellow]Nothing to commit.[/yellow]")
 
 if __name__ == "__main__":
     app()
@@ -0,0 +1,103 @@
+from typing import List, Optional, Sequence
+from rich.segment import Segment
+from textual import events
+from textual.binding import Binding
+from textual.geometry import Region, Size
+from textual.message import Message
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+
+class FileList(ScrollView, can_focus=True):
+    """
+    Virtual list of labels. The labels are fixed; what is shown is an array of
+    indices into them, so filtering swaps one list instead of rebuilding
+    widgets, and only the visible rows are ever rendered.
+    """
+
+    DEFAULT_CSS = """
+    FileList { height: 1fr; background: $surface; overflow-x: hidden; }
+    FileList > .file-list--cursor { background: $block-cursor-background; color: $block-cursor-foreground; text-style: bold; }
+    FileList:blur > .file-list--cursor { background: $block-cursor-blurred-background; text-style: none; }
+    """
+
+    COMPONENT_CLASSES = {"file-list--cursor"}
+
+    BINDINGS = [
+        Binding("up", "cursor(-1)", show=False),
+        Binding("down", "cursor(1)", show=False),
+        Binding("pageup", "page(-1)", show=False),
+        Binding("pagedown", "page(1)", show=False),
+        Binding("home", "jump(0)", show=False),
+        Binding("end", "jump(-1)", show=False),
+        Binding("enter", "select", show=False),
+    ]
+
+    class Selected(Message):
+        """Posted when a row is chosen; `index` is the position in the labels."""
+
+        def __init__(self, index: int):
+            super().__init__()
+            self.index = index
+
+    def __init__(self, labels: Sequence[str] = (), **kwargs):
+        super().__init__(**kwargs)
+        self.labels: Sequence[str] = labels
+        self.rows: List[int] = list(range(len(labels)))
+        self.cursor = 0
+
+    def set_labels(self, labels: Sequence[str]) -> None:
+        self.labels = labels
+        self.show(range(len(labels)))
+
+    def show(self, rows: Sequence[int]) -> None:
+        """Displays the given label indices, in order."""
+        self.rows = list(rows)
+        self.cursor = 0
+        self.virtual_size = Size(self.size.width, len(self.rows))
+        self.scroll_to(y=0, animate=False, immediate=True)
+        self.refresh()
+
+    @property
+    def highlighted(self) -> Optional[int]:
+        """Label index under the cursor, or None when nothing is shown."""
+        return self.rows[self.cursor] if self.rows else None
+
+    def render_line(self, y: int) -> Strip:
+        row = self.scroll_offset.y + y
+        width = self.size.width
+        style = self.rich_style
+        if row >= len(self.rows):
+            return Strip.blank(width, style)
+        if row == self.cursor:
+            style += self.get_component_rich_style("file-list--cursor")
+        label = self.labels[self.rows[row]]
+        return Strip([Segment(label, style)]).crop_extend(0, width, style)
+
+    def _move_to(self, row: int) -> None:
+        if not self.rows:
+            return
+        old, self.cursor = self.cursor, max(0, min(row, len(self.rows) - 1))
+        # Only the two rows that changed are repainted
+        self.refresh_line(old)
+        self.refresh_line(self.cursor)
+        self.scroll_to_region(Region(0, self.cursor, self.size.width, 1), animate=False, immediate=True)
+
+    def action_cursor(self, delta: int) -> None:
+        self._move_to(self.cursor + delta)
+
+    def action_page(self, direction: int) -> None:
+        self._move_to(self.cursor + direction * max(1, self.scrollable_content_region.height - 1))
+
+    def action_jump(self, row: int) -> None:
+        self._move_to(row if row >= 0 else len(self.rows) - 1)
+
+    def action_select(self) -> None:
+        if self.rows:
+            self.post_message(self.Selected(self.rows[self.cursor]))
+
+    def on_click(self, event: events.Click) -> None:
+        row = self.scroll_offset.y + event.y
+        if row < len(self.rows):
+            self._move_to(row)
+            self.action_select()
@@ -1,38 +1,118 @@
+import difflib
+from typing import Optional
+from rich.text import Text
+from textual import work
 from textual.app import App, ComposeResult
-from textual.widgets import Header, Footer, ListView, ListItem, Label, TextArea, Button
-from textual.containers import Horizontal, Vertical, Container
-from services.config_service import ConfigService
-from services.file_service import FileService
+from textual.screen import ModalScreen
+from textual.widgets import Header, Footer, Input, Label, Static, TextArea, Button
+from textual.containers import Horizontal, Vertical, VerticalScroll, Container
+from textual.worker import get_current_worker
+from core.exceptions import ConflictError, GitError
+from services.buffer_cache import Buffer, BufferCache
+from services.config_service import ConfigService, DotfileRegistry
+from services.git_local import GitSession
+from services.search_index import SearchIndex
 from core.paths import context
+from interface.file_list import FileList
+
+LANGUAGES = {
+    ".py": "python", ".pyw": "python",
+    ".json": "json", ".js": "json",
+    ".md": "markdown", ".markdown": "markdown",
+    ".yml": "yaml", ".yaml": "yaml", ".toml": "yaml", ".conf": "yaml", ".ini": "yaml",
+    ".lua": "python",  # Textual might not have lua, python is close enough
+    ".css": "css",
+}
+
+
+def friendly_label(df) -> str:
+    """Friendly "App Name: file" label, e.g. "Nvim: init.lua"."""
+    parts = df.source.parts
+    if len(parts) > 1:
+        # Use parent folder as category (e.g. "nvim" from "nvim/init.lua")
+        category = parts[-2]
+        # Cleanup if it's directly in auto-scan without subfolder (legacy)
+        if category == "auto-scan":
+            category = "Misc"
+    else:
+        category = "Root"
+    return f"{category.replace('-', ' ').title()}: {df.source.name}"
+
+
+def unified_diff(old: str, new: str, name: str) -> Text:
+    """Colored unified diff from `old` (on disk) to `new` (editor)."""
+    text = Text()
+    lines = difflib.unified_diff(old.splitlines(keepends=True), new.splitlines(keepends=True), f"{name} (on disk)", f"{name} (editor)")
+    for line in lines:
+        style = {"+": "green", "-": "red", "@": "cyan"}.get(line[0], "")
+        text.append(line if line.endswith("\n") else line + "\n", style=style)
+    return text
+
+
+class ConflictScreen(ModalScreen[str]):
+    """Asks what to do when the file changed on disk: "overwrite", "reload" or "cancel"."""
+
+    CSS = """
+    ConflictScreen { align: center middle; }
+    #dialog { width: 90%; height: 80%; border: thick $warning; background: $surface; padding: 0 1; }
+    #diff { height: 1fr; }
+    #choices { height: 3; align: center middle; }
+    """
+
+    BINDINGS = [("escape", "dismiss('cancel')", "Cancel")]
+
+    def __init__(self, name: str, diff: Text):
+        super().__init__()
+        self.file_name = name
+        self.diff = diff
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="dialog"):
+            yield Label(f"{self.file_name} changed on disk after it was opened. Your edits vs. the file:")
+            with VerticalScroll(id="diff"):
+                yield Static(self.diff)
+            with Horizontal(id="choices"):
+                yield Button("Overwrite", id="overwrite", variant="error")
+                yield Button("Reload from disk", id="reload", variant="warning")
+                yield Button("Cancel", id="cancel")
+
+    def on_button_pressed(self, event: Button.Pressed):
+        self.dismiss(event.button.id)
 
-class DotfileItem(ListItem):
-    def __init__(self, label: str, dotfile) -> None:
-        super().__init__(Label(label))
-        self.dotfile = dotfile
 
 class DotfileTUI(App):
     CSS = """
     Screen { layout: vertical; }
     #sidebar { width: 30; background: $panel; border-right: solid $accent; }
+    #search { margin: 0 0 1 0; }
     #editor-area { height: 1fr; border: solid $success; }
     #buttons { height: 3; dock: bottom; layout: horizontal; align: center middle; }
     Button { margin: 0 1; }
     """
-    
-    BINDINGS = [("q", "quit", "Quit"), ("s", "save", "Save")]
+
+    BINDINGS = [("q", "quit", "Quit"), ("s", "save", "Save"), ("c", "commit", "Commit"), ("m", "more", "More")]
 
     def __init__(self):
         super().__init__()
-        self.config_service = ConfigService()
+        self.registry = DotfileRegistry(ConfigService())
+        self.buffers = BufferCache()
+        self.dotfiles = []
+        self.index = SearchIndex([])
         self.current_dotfile = None
+        self.current_buffer = None
+        # Saves since the last commit; they all go into one commit (on "c" or on quit)
+        self.git = GitSession()
 
     def compose(self) -> ComposeResult:
         yield Header()
         with Horizontal():
             with Vertical(id="sidebar"):
                 yield Label(" Managed Files")
-                self.list_view = ListView()
-                yield self.list_view
+                self.search = Input(placeholder="Search…", id="search")
+                yield self.search
+                # Renders only the visible rows; filtering swaps an index array, no widgets are rebuilt
+                self.file_list = FileList()
+                yield self.file_list
             with Vertical():
                 self.editor = TextArea(language="bash", id="editor-area")
                 yield self.editor
@@ -44,57 +124,152 @@ class DotfileTUI(App):
         self.load_files()
 
     def load_files(self):
-        self.list_view.clear()
-        for df in self.config_service.load_config():
-            # Logic to extract a friendly "App Name" from the path
-            parts = df.source.parts
-            filename = df.source.name
-            
-            if len(parts) > 1:
-                # Use parent folder as category (e.g. "nvim" from "nvim/init.lua")
-                category = parts[-2]
-                # Cleanup if it's directly in auto-scan without subfolder (legacy)
-                if category == "auto-scan":
-                    category = "Misc"
-            else:
-                category = "Root"
-            
-            # Formatting: "Neovim: init.lua"
-            category_display = category.replace("-", " ").title()
-            label = f"{category_display}: {filename}"
-            
-            self.list_view.append(DotfileItem(label, df))
-
-    def on_list_view_selected(self, event: ListView.Selected):
-        self.current_dotfile = event.item.dotfile
-        path = context.get_absolute_source(self.current_dotfile.source)
-        if path.exists():
-            content = path.read_text(encoding="utf-8")
-            self.editor.text = content
-            
-            # Dynamic Syntax Highlighting
-            ext = path.suffix.lower()
-            if ext in [".py", ".pyw"]: self.editor.language = "python"
-            elif ext in [".json", ".js"]: self.editor.language = "json"
-            elif ext in [".md", ".markdown"]: self.editor.language = "markdown"
-            elif ext in [".yml", ".yaml", ".toml", ".conf", ".ini"]: self.editor.language = "yaml"
-            elif ext in [".lua"]: self.editor.language = "python" # Textual might not have lua, python is close enough
-            elif ext in [".css"]: self.editor.language = "css"
-            else: self.editor.language = "bash"
+        self.dotfiles = self.registry.load().all()
+        labels = [friendly_label(df) for df in self.dotfiles]
+        # Searchable text per entry: label (category and file name), source, target and profile
+        self.index = SearchIndex([f"{label}\t{df.source}\t{df.target}\t{df.profile}" for label, df in zip(labels, self.dotfiles)])
+        self.file_list.set_labels(labels)
+        if self.search.value:
+            self.file_list.show(self.index.search(self.search.value))
+
+    def check_action(self, action: str, parameters):
+        if action == "more":
+            return self.current_buffer is not None and self.current_buffer.partial
+        if action == "commit":
+            return bool(self.git.paths)
+        return True
+
+    def on_input_changed(self, event: Input.Changed):
+        if event.input is self.search:
+            self.file_list.show(self.index.search(event.value))
+
+    def on_input_submitted(self, event: Input.Submitted):
+        if event.input is self.search and self.file_list.highlighted is not None:
+            self.file_list.focus()
+            self.file_list.action_select()
+
+    def on_file_list_selected(self, event: FileList.Selected):
+        self.current_dotfile = self.dotfiles[event.index]
+        self.current_buffer = None
+        self.editor.loading = True
+        self.load_buffer(self.current_dotfile)
+
+    @work(thread=True, exclusive=True, group="buffer")
+    def load_buffer(self, dotfile) -> None:
+        """Reads the file off the UI thread; only the latest selection is shown."""
+        path = context.get_absolute_source(dotfile.source)
+        try:
+            buffer = self.buffers.get(path)
+        except OSError as e:
+            buffer = e
+        if not get_current_worker().is_cancelled:
+            self.call_from_thread(self.show_buffer, dotfile, buffer)
+
+    def show_buffer(self, dotfile, buffer) -> None:
+        if dotfile is not self.current_dotfile:
+            return
+        self.editor.loading = False
+        if isinstance(buffer, OSError):
+            self.editor.text = ""
+            self.notify(f"Cannot open {dotfile.source}: {buffer.strerror}", severity="error")
+            return
+
+        self.current_buffer = buffer
+        self.editor.language = LANGUAGES.get(buffer.path.suffix.lower(), "bash")
+        self.editor.read_only = buffer.read_only
+        self.editor.text = buffer.text
+        if buffer.partial:
+            self.notify(f"Large file: read-only preview of {buffer.loaded // 1024} of {buffer.size // 1024} KiB (m: load more)")
+        elif buffer.read_only:
+            self.notify("Not valid UTF-8: opened read-only", severity="warning")
+        self.refresh_bindings()
+
+    def action_more(self) -> None:
+        if self.current_buffer is not None and self.current_buffer.partial:
+            self.load_more(self.current_dotfile, self.current_buffer)
+
+    @work(thread=True, exclusive=True, group="buffer")
+    def load_more(self, dotfile, buffer: Buffer) -> None:
+        extended, text = self.buffers.more(buffer)
+        if not get_current_worker().is_cancelled:
+            self.call_from_thread(self.append_chunk, dotfile, extended, text)
+
+    def append_chunk(self, dotfile, buffer: Buffer, text: Optional[str]) -> None:
+        if dotfile is not self.current_dotfile:
+            return
+        if text is None:
+            # Changed on disk since the preview was opened: start over
+            self.show_buffer(dotfile, buffer)
+            return
+        self.current_buffer = buffer
+        self.editor.insert(text, self.editor.document.end, maintain_selection_offset=False)
+        self.refresh_bindings()
+
+    def action_save(self) -> None:
+        self.save_current()
 
     def on_button_pressed(self, event: Button.Pressed):
-        if event.button.id == "btn-save" and self.current_dotfile:
-            path = context.get_absolute_source(self.current_dotfile.source)
-            try:
-                # Atomic Write
-                import tempfile
-                import os
-                dir_name = path.parent
-                with tempfile.NamedTemporaryFile("w", delete=False, dir=dir_name, encoding="utf-8") as tmp:
-                    tmp.write(self.editor.text)
-                    tmp_path = Path(tmp.name)
-                
-                os.replace(tmp_path, path)
-                self.notify(f"File saved: {path.name}")
-            except Exception as e:
-                self.notify(f"Error: {e}", severity="error")
+        if event.button.id == "btn-save":
+            self.save_current()
+
+    def save_current(self, force: bool = False) -> None:
+        if not self.current_dotfile or self.current_buffer is None:
+            return
+        if self.current_buffer.read_only:
+            self.notify("This file is open as a read-only preview", severity="warning")
+            return
+        dotfile, buffer = self.current_dotfile, self.current_buffer
+        try:
+            saved = self.buffers.save(buffer, self.editor.text, force=force)
+        except ConflictError:
+            self.confirm_overwrite(dotfile, buffer)
+            return
+        except Exception as e:
+            self.notify(f"Error: {e}", severity="error")
+            return
+
+        if saved is None:
+            self.notify("No changes to save")
+            return
+        self.current_buffer = saved
+        self.git.stage(saved.path)
+        self.notify(f"File saved: {saved.path.name}")
+        self.refresh_bindings()
+
+    def confirm_overwrite(self, dotfile, buffer: Buffer) -> None:
+        try:
+            on_disk = self.buffers.get(buffer.path)
+        except OSError as e:
+            self.notify(f"Error: {e}", severity="error")
+            return
+
+        def resolve(choice: str) -> None:
+            if dotfile is not self.current_dotfile:
+                return
+            if choice == "overwrite":
+                self.save_current(force=True)
+            elif choice == "reload":
+                self.show_buffer(dotfile, on_disk)
+
+        diff = unified_diff(on_disk.text, self.editor.text, str(dotfile.source))
+        self.push_screen(ConflictScreen(str(dotfile.source), diff), resolve)
+
+    def action_commit(self) -> None:
+        self.commit_saves()
+
+    def commit_saves(self) -> None:
+        """Commits every file saved since the last commit, as a single commit."""
+        names = sorted(set(self.git.paths))
+        if not names:
+            return
+        message = f"Edit {names[0]}" if len(names) == 1 else f"Edit {len(names)} files"
+        try:
+            if self.git.commit(message):
+                self.notify(f"Committed: {message}")
+        except GitError as e:
+            self.notify(f"Git: {e}", severity="warning")
+        self.refresh_bindings()
+
+    async def action_quit(self) -> None:
+        self.commit_saves()
+        self.exit()
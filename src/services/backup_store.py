@@ -0,0 +1,315 @@
+import json
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from core.exceptions import BackupError
+from core.hashing import hash_bytes, hash_file
+from core.models import BackupRecord
+from core import tracing
+from services.copy_engine import CopyEngine
+
+
+class BackupStore:
+    """
+    Content-addressed backup store inside .backups/:
+
+        objects/ab/cdef...   one blob per distinct content (SHA-256)
+        manifest.jsonl       one line per backup: (id, original path, time, hash, ...)
+
+    Identical content is stored once. Directories are stored as a tree listing
+    (itself a blob) whose files are deduplicated individually. Symlinks are
+    recorded as links, not followed. New blobs are written through the
+    CopyEngine (reflink when possible), or hardlinked when the caller is about
+    to delete the original anyway.
+    """
+
+    _manifest_lock = threading.Lock()
+
+    def __init__(self, root: Path, engine: Optional[CopyEngine] = None):
+        self.root = root
+        self.engine = engine or CopyEngine()
+        self.objects_dir = root / "objects"
+        self.manifest_path = root / "manifest.jsonl"
+
+    # --- Writing -----------------------------------------------------------
+
+    @tracing.traced("backup")
+    def backup(self, path: Path, consume: bool = False) -> Optional[BackupRecord]:
+        """
+        Saves `path` (file, directory or symlink). Returns None if nothing exists there.
+        `consume` promises that the caller removes `path` right after, which allows
+        storing single-link files as hardlinks instead of copies.
+        """
+        path = Path(os.path.abspath(path))
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            raise BackupError(f"Could not backup {path}: {e}")
+
+        try:
+            if stat.S_ISLNK(st.st_mode):
+                kind, digest, size = "link", os.readlink(path), 0
+            elif stat.S_ISDIR(st.st_mode):
+                kind, (digest, size) = "tree", self._store_tree(path, consume)
+            else:
+                kind, digest, size = "file", self._store_blob(path, consume), st.st_size
+        except OSError as e:
+            raise BackupError(f"Could not backup {path}: {e}")
+
+        record = BackupRecord(
+            id=uuid.uuid4().hex[:12],
+            path=path,
+            time=time.time(),
+            kind=kind,
+            hash=digest,
+            mode=stat.S_IMODE(st.st_mode),
+            size=size,
+        )
+        self._append(record)
+        return record
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    def _store_blob(self, path: Path, consume: bool = False) -> str:
+        """Stores a file's content unless an identical blob already exists. Returns its hash."""
+        digest = hash_file(path)
+        if self._blob_path(digest).exists():
+            return digest
+        # The file may change between hashing and copying: the new blob is named
+        # after the content that was actually stored, not after `digest`
+        if consume:
+            return self._write_blob(lambda tmp: self.engine.link_or_copy(path, tmp))
+        return self._write_blob(lambda tmp: self.engine.copy_file(path, tmp, preserve_metadata=False))
+
+    def _store_bytes(self, data: bytes) -> str:
+        digest = hash_bytes(data)
+        if not self._blob_path(digest).exists():
+            self._write_blob(lambda tmp: Path(tmp).write_bytes(data), digest)
+        return digest
+
+    def _write_blob(self, fill, digest: Optional[str] = None) -> str:
+        """Writes a blob with `fill(tmp)` and renames it to its hash (read back from the temp file unless given)."""
+        # Write inside the store, then rename: concurrent writers of the same blob are harmless
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.objects_dir / f".tmp-{uuid.uuid4().hex}"
+        try:
+            # A hardlinked blob shares the original's inode: leave its mode alone
+            hardlinked = fill(tmp) == "hardlink"
+            digest = digest or hash_file(tmp)
+            if not hardlinked:
+                os.chmod(tmp, 0o444)
+            blob = self._blob_path(digest)
+            blob.parent.mkdir(exist_ok=True)
+            os.replace(tmp, blob)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return digest
+
+    def _store_tree(self, root: Path, consume: bool = False) -> Tuple[str, int]:
+        """Stores every file of a directory and a listing [relpath, kind, hash/target, mode]."""
+        entries = []
+        total = 0
+        for dirpath, dirnames, filenames in os.walk(root):
+            rel_dir = os.path.relpath(dirpath, root)
+            for name in dirnames + filenames:
+                full = os.path.join(dirpath, name)
+                rel = os.path.normpath(os.path.join(rel_dir, name))
+                st = os.lstat(full)
+                mode = stat.S_IMODE(st.st_mode)
+                if stat.S_ISLNK(st.st_mode):
+                    entries.append([rel, "link", os.readlink(full), mode])
+                elif stat.S_ISDIR(st.st_mode):
+                    entries.append([rel, "dir", "", mode])
+                elif stat.S_ISREG(st.st_mode):
+                    entries.append([rel, "file", self._store_blob(Path(full), consume), mode])
+                    total += st.st_size
+        entries.sort()
+        listing = json.dumps({"entries": entries}, separators=(",", ":")).encode("utf-8")
+        return self._store_bytes(listing), total
+
+    @staticmethod
+    def _serialize(record: BackupRecord) -> str:
+        return json.dumps({
+            "id": record.id,
+            "path": str(record.path),
+            "time": record.time,
+            "kind": record.kind,
+            "hash": record.hash,
+            "mode": record.mode,
+            "size": record.size,
+        }, separators=(",", ":")) + "\n"
+
+    def _append(self, record: BackupRecord) -> None:
+        line = self._serialize(record)
+        with self._manifest_lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.manifest_path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    # --- Reading -----------------------------------------------------------
+
+    def records(self) -> List[BackupRecord]:
+        """All backups, oldest first."""
+        records = []
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        continue
+                    records.append(BackupRecord(
+                        id=item["id"],
+                        path=Path(item["path"]),
+                        time=item["time"],
+                        kind=item["kind"],
+                        hash=item["hash"],
+                        mode=item["mode"],
+                        size=item["size"],
+                    ))
+        except FileNotFoundError:
+            return []
+        except OSError as e:
+            raise BackupError(f"Could not read backup manifest: {e}")
+        return records
+
+    def get(self, backup_id: str) -> BackupRecord:
+        """Looks up a backup by id (a unique prefix is enough)."""
+        matches = [r for r in self.records() if r.id.startswith(backup_id)]
+        if len(matches) != 1:
+            raise BackupError(f"{'No' if not matches else 'Ambiguous'} backup matching '{backup_id}'")
+        return matches[0]
+
+    def _tree_entries(self, digest: str) -> List[list]:
+        return json.loads(self._blob_path(digest).read_bytes())["entries"]
+
+    # --- Restore -----------------------------------------------------------
+
+    @tracing.traced("backup")
+    def restore(self, backup_id: str, dest: Optional[Path] = None, overwrite: bool = False) -> Path:
+        """
+        Restores a backup to its original path (or `dest`). Whatever is in the way
+        is backed up first when `overwrite` is set; a symlink is simply replaced.
+        """
+        record = self.get(backup_id)
+        dest = Path(dest) if dest else record.path
+
+        if dest.exists() or dest.is_symlink():
+            if not overwrite:
+                raise BackupError(f"{dest} already exists (restore with --force to replace it)")
+            if not dest.is_symlink():
+                self.backup(dest, consume=True)
+            if dest.is_symlink() or not dest.is_dir():
+                dest.unlink()
+            else:
+                shutil.rmtree(dest)
+
+        try:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            if record.kind == "link":
+                os.symlink(record.hash, dest)
+            elif record.kind == "file":
+                self._restore_blob(record.hash, dest, record.mode)
+            else:
+                dest.mkdir()
+                for rel, kind, value, mode in self._tree_entries(record.hash):
+                    target = dest / rel
+                    if kind == "dir":
+                        target.mkdir(exist_ok=True)
+                    elif kind == "link":
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        os.symlink(value, target)
+                    else:
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        self._restore_blob(value, target, mode)
+                # Directory modes last, so read-only dirs do not block their own contents
+                for rel, kind, value, mode in self._tree_entries(record.hash):
+                    if kind == "dir":
+                        os.chmod(dest / rel, mode)
+                os.chmod(dest, record.mode)
+        except OSError as e:
+            raise BackupError(f"Could not restore {record.id} to {dest}: {e}")
+        return dest
+
+    def _restore_blob(self, digest: str, dest: Path, mode: int) -> None:
+        blob = self._blob_path(digest)
+        if not blob.exists():
+            raise BackupError(f"Backup object {digest} is missing from the store")
+        shutil.copyfile(blob, dest)
+        os.chmod(dest, mode)
+
+    # --- Retention ---------------------------------------------------------
+
+    @tracing.traced("backup")
+    def prune(self, keep_last: Optional[int] = None, older_than_days: Optional[float] = None) -> Tuple[int, int]:
+        """
+        Drops backups outside the retention policy and deletes unreferenced blobs.
+        A backup is removed if it is not among the `keep_last` newest of its path,
+        or if it is older than `older_than_days`. Returns (backups removed, blobs removed).
+        """
+        records = self.records()
+        cutoff = time.time() - older_than_days * 86400 if older_than_days is not None else None
+
+        newest_first: Dict[Path, List[BackupRecord]] = {}
+        for record in reversed(records):
+            newest_first.setdefault(record.path, []).append(record)
+
+        drop: Set[str] = set()
+        for history in newest_first.values():
+            for rank, record in enumerate(history):
+                if keep_last is not None and rank >= keep_last:
+                    drop.add(record.id)
+                elif cutoff is not None and record.time < cutoff:
+                    drop.add(record.id)
+
+        kept = [r for r in records if r.id not in drop]
+        with self._manifest_lock:
+            if drop:
+                self._rewrite_manifest(kept)
+            blobs_removed = self._collect_garbage(kept)
+        return len(drop), blobs_removed
+
+    def _rewrite_manifest(self, records: List[BackupRecord]) -> None:
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile("w", delete=False, dir=self.root, encoding="utf-8") as tmp:
+                tmp.writelines(self._serialize(r) for r in records)
+                tmp_path = Path(tmp.name)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            if tmp_path is not None and tmp_path.exists():
+                os.unlink(tmp_path)
+            raise BackupError(f"Could not rewrite backup manifest: {e}")
+
+    def _collect_garbage(self, records: List[BackupRecord]) -> int:
+        referenced: Set[str] = set()
+        for record in records:
+            if record.kind == "file":
+                referenced.add(record.hash)
+            elif record.kind == "tree":
+                referenced.add(record.hash)
+                referenced.update(value for _, kind, value, _ in self._tree_entries(record.hash) if kind == "file")
+
+        removed = 0
+        if not self.objects_dir.is_dir():
+            return removed
+        for bucket in self.objects_dir.iterdir():
+            # Skip blobs still being written by a concurrent backup
+            if bucket.name.startswith(".tmp-"):
+                continue
+            for blob in bucket.iterdir():
+                if bucket.name + blob.name not in referenced:
+                    blob.unlink()
+                    removed += 1
+        return removed
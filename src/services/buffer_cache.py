@@ -0,0 +1,157 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+from core.exceptions import ConflictError
+from core.hashing import hash_bytes
+from core import tracing
+
+# Files above this size open as a read-only preview, loaded one chunk at a time
+PREVIEW_THRESHOLD = 1024 * 1024
+PREVIEW_CHUNK = 256 * 1024
+
+
+@dataclass(frozen=True)
+class Buffer:
+    """Contents of a file as loaded for the editor."""
+    path: Path
+    text: str
+    size: int
+    mtime_ns: int
+    # Bytes of the file covered by `text`; less than `size` for a partial preview
+    loaded: int
+    # Previews (large or undecodable files) cannot be saved back
+    read_only: bool
+    # SHA-256 of the file as loaded; empty for partial previews
+    digest: str = ""
+
+    @property
+    def partial(self) -> bool:
+        return self.loaded < self.size
+
+
+class BufferCache:
+    """
+    Small LRU cache of recently opened files, safe to use from worker threads.
+    An entry is reused only while the file's (size, mtime) is unchanged.
+    Saves go through the cache too, so they can detect edits made by others.
+    """
+
+    def __init__(self, max_entries: int = 32, preview_threshold: int = PREVIEW_THRESHOLD, chunk_size: int = PREVIEW_CHUNK):
+        self.max_entries = max_entries
+        self.preview_threshold = preview_threshold
+        self.chunk_size = chunk_size
+        self._buffers: "OrderedDict[Path, Buffer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @tracing.traced("editor")
+    def get(self, path: Path) -> Buffer:
+        """Returns the cached buffer for `path`, reading the file (or its first chunk) if needed."""
+        st = os.stat(path)
+        with self._lock:
+            cached = self._buffers.get(path)
+            if cached is not None and (cached.size, cached.mtime_ns) == (st.st_size, st.st_mtime_ns):
+                self._buffers.move_to_end(path)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        if st.st_size > self.preview_threshold:
+            buffer = self._read(path, st, 0, self.chunk_size, read_only=True)
+        else:
+            buffer = self._read(path, st, 0, st.st_size, read_only=False)
+        self._store(buffer)
+        return buffer
+
+    def more(self, buffer: Buffer) -> Tuple[Buffer, Optional[str]]:
+        """
+        Loads the next preview chunk. Returns the extended buffer and the newly read
+        text, or a buffer loaded again from the start and None if the file changed
+        since `buffer` was read (its chunks would not belong to the same contents).
+        """
+        st = os.stat(buffer.path)
+        if (st.st_size, st.st_mtime_ns) != (buffer.size, buffer.mtime_ns):
+            return self.get(buffer.path), None
+        chunk = self._read(buffer.path, st, buffer.loaded, self.chunk_size, read_only=True)
+        extended = Buffer(buffer.path, buffer.text + chunk.text, st.st_size, st.st_mtime_ns, chunk.loaded, True)
+        self._store(extended)
+        return extended, chunk.text
+
+    @tracing.traced("editor")
+    def save(self, buffer: Buffer, text: str, force: bool = False) -> Optional[Buffer]:
+        """
+        Atomically writes `text` over the file `buffer` was loaded from and returns
+        the new buffer, or None if `text` is unchanged. If the file already holds
+        `text` (written elsewhere) it is left alone and a refreshed buffer is returned.
+        Raises ConflictError if the file changed on disk since it was loaded, unless
+        `force` is set.
+        """
+        if text == buffer.text:
+            return None
+        data = text.encode("utf-8")
+        st = os.stat(buffer.path)
+        if (st.st_size, st.st_mtime_ns) != (buffer.size, buffer.mtime_ns):
+            # A bare touch is not a conflict: compare the contents
+            with open(buffer.path, "rb") as f:
+                current = f.read()
+            if current == data:
+                # Keep the new stat, or the next save would see a conflict
+                refreshed = Buffer(buffer.path, text, st.st_size, st.st_mtime_ns, st.st_size, False, hash_bytes(data))
+                self._store(refreshed)
+                return refreshed
+            if hash_bytes(current) != buffer.digest and not force:
+                raise ConflictError(f"{buffer.path} changed on disk since it was opened")
+
+        # Atomic Write
+        with tempfile.NamedTemporaryFile("wb", delete=False, dir=buffer.path.parent) as tmp:
+            tmp.write(data)
+            tmp_path = Path(tmp.name)
+        try:
+            os.chmod(tmp_path, st.st_mode & 0o7777)
+            os.replace(tmp_path, buffer.path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        st = os.stat(buffer.path)
+        saved = Buffer(buffer.path, text, st.st_size, st.st_mtime_ns, st.st_size, False, hash_bytes(data))
+        self._store(saved)
+        return saved
+
+    def invalidate(self, path: Path) -> None:
+        with self._lock:
+            self._buffers.pop(path, None)
+
+    def _store(self, buffer: Buffer) -> None:
+        with self._lock:
+            self._buffers[buffer.path] = buffer
+            self._buffers.move_to_end(buffer.path)
+            while len(self._buffers) > self.max_entries:
+                self._buffers.popitem(last=False)
+
+    @staticmethod
+    def _read(path: Path, st: os.stat_result, offset: int, length: int, read_only: bool) -> Buffer:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        end = offset + len(data)
+        if end < st.st_size:
+            # Do not split a UTF-8 sequence across chunks: leave the partial tail for the next one
+            cut = len(data)
+            while cut > 0 and cut > len(data) - 4 and data[cut - 1] & 0xC0 == 0x80:
+                cut -= 1
+            if cut > 0 and data[cut - 1] >= 0xC0:
+                cut -= 1
+            if cut > 0:
+                data, end = data[:cut], offset + cut
+        try:
+            text = data.decode("utf-8")
+        except UnicodeDecodeError:
+            # Binary or another encoding: show it, but never write the lossy text back
+            text, read_only = data.decode("utf-8", errors="replace"), True
+        digest = hash_bytes(data) if offset == 0 and end == st.st_size else ""
+        return Buffer(path, text, st.st_size, st.st_mtime_ns, end, read_only, digest)
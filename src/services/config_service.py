@@ -1,66 +1,268 @@
 import json
 import os
 import tempfile
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple
 from pathlib import Path
 from core.models import Dotfile
 from core.paths import context
 from core.exceptions import ConfigError
+from core import tracing
+from services.profile_store import ProfileStore
 
 class ConfigService:
     def __init__(self):
         self.config_path = context.config_path
+        self.store = ProfileStore(context.profiles_dir)
 
-    def load_config(self) -> List[Dotfile]:
-        if not self.config_path.exists():
+    @property
+    def append_only(self) -> bool:
+        """True when the per-profile store is the active backend (changes are appended, not rewritten)."""
+        return self.store.exists()
+
+    def storage_path(self) -> Path:
+        """Where the active backend keeps the config (what a git commit of config changes must stage)."""
+        return self.store.root if self.append_only else self.config_path
+
+    @tracing.traced("config")
+    def load_config(self, profile: Optional[str] = None) -> List[Dotfile]:
+        """Loads every entry, or only those of `profile` (lazily, when the profile store is active)."""
+        if self.append_only:
+            return self.store.load(profile)
+        return self.load_json(self.config_path, profile)
+
+    def load_json(self, path: Path, profile: Optional[str] = None) -> List[Dotfile]:
+        if not path.exists():
             return []
         
         try:
-            with open(self.config_path, "r", encoding="utf-8") as f:
+            with open(path, "r", encoding="utf-8") as f:
                 data = json.load(f)
                 return [
                     Dotfile(
                         source=Path(item["source"]),
                         target=Path(item["target"]),
-                        profile=item.get("profile", "default")
+                        profile=item.get("profile", "default"),
+                        template=bool(item.get("template", False)),
+                        deploy=item.get("deploy", "link"),
                     )
                     for item in data
+                    if profile is None or item.get("profile", "default") == profile
                 ]
         except json.JSONDecodeError as e:
             raise ConfigError(f"Invalid JSON in config file: {e}")
         except Exception as e:
             raise ConfigError(f"Failed to load config: {e}")
 
+    @tracing.traced("config")
     def save_config(self, dotfiles: List[Dotfile]) -> None:
+        if self.append_only:
+            self.store.save(dotfiles)
+        else:
+            self.save_json(self.config_path, dotfiles)
+
+    def save_json(self, path: Path, dotfiles: List[Dotfile]) -> None:
         data = [
             {
                 "source": str(df.source),
                 "target": str(df.target),
-                "profile": df.profile
+                "profile": df.profile,
+                # Only written when set, so plain configs keep their layout
+                **({"template": True} if df.template else {}),
+                **({"deploy": df.deploy} if df.deploy != "link" else {}),
             }
             for df in dotfiles
         ]
         
         # Atomic write: Write to temp file then rename
         try:
-            dir_name = self.config_path.parent
+            dir_name = path.parent
             with tempfile.NamedTemporaryFile("w", delete=False, dir=dir_name, encoding="utf-8") as tmp:
                 json.dump(data, tmp, indent=4)
                 tmp_path = Path(tmp.name)
             
             # Atomic replacement
-            os.replace(tmp_path, self.config_path)
+            os.replace(tmp_path, path)
         except Exception as e:
             if 'tmp_path' in locals() and tmp_path.exists():
                 os.unlink(tmp_path)
             raise ConfigError(f"Failed to save config atomically: {e}")
 
+    @tracing.traced("config")
+    def apply_changes(self, changes: List[Tuple[str, Dotfile]]) -> None:
+        """
+        Persists ("+" | "-", dotfile) changes without needing the full entry list:
+        appended to the profile store, or merged into dotfiles.json.
+        """
+        if self.append_only:
+            self.store.append(changes)
+            return
+
+        current = {(df.source, df.target): df for df in self.load_json(self.config_path)}
+        for op, df in changes:
+            if op == "+":
+                current.setdefault((df.source, df.target), df)
+            else:
+                current.pop((df.source, df.target), None)
+        self.save_json(self.config_path, list(current.values()))
+
+    @property
+    def retired_path(self) -> Path:
+        """Where import_json moves dotfiles.json once the profile store replaces it."""
+        return self.config_path.with_name(self.config_path.name + ".imported")
+
+    def import_json(self, path: Path) -> int:
+        """
+        Replaces the profile store contents with a dotfiles.json-format file.
+        dotfiles.json is no longer read afterwards, so it is moved to retired_path
+        (edits to a file that is silently ignored would be lost).
+        """
+        dotfiles = self.load_json(path)
+        self.store.save(dotfiles)
+        try:
+            os.replace(self.config_path, self.retired_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            raise ConfigError(f"Imported, but failed to move {self.config_path.name} aside: {e}")
+        return len(dotfiles)
+
+    def export_json(self, path: Path) -> int:
+        """Writes every entry to `path` in the dotfiles.json format."""
+        dotfiles = self.load_config()
+        self.save_json(path, dotfiles)
+        return len(dotfiles)
+
     def add_dotfile(self, dotfile: Dotfile) -> None:
-        current_list = self.load_config()
+        """Adds a single entry. For bulk changes use a DotfileRegistry and commit once."""
+        registry = DotfileRegistry(self).load()
         # Avoid duplicates based on source AND target
-        for existing in current_list:
-            if existing.source == dotfile.source and existing.target == dotfile.target:
-                return # Already exists
-        
-        current_list.append(dotfile)
-        self.save_config(current_list)
+        if registry.add(dotfile):
+            registry.commit()
+
+
+class DotfileRegistry:
+    """
+    In-memory view of the config: loaded once and indexed by (source, target),
+    by profile and by expanded target. Adds and removes are staged in memory
+    and written with a single atomic save on commit().
+    """
+
+    def __init__(self, config_service: ConfigService):
+        self.config_service = config_service
+        self._entries: Dict[Tuple[Path, Path], Dotfile] = {}
+        self._by_profile: Dict[str, Dict[Tuple[Path, Path], Dotfile]] = {}
+        self._by_target: Optional[Dict[Path, List[Dotfile]]] = None
+        self._changes: List[Tuple[str, Dotfile]] = []
+        self._profile: Optional[str] = None
+
+    @staticmethod
+    def _key(dotfile: Dotfile) -> Tuple[Path, Path]:
+        return (dotfile.source, dotfile.target)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._changes)
+
+    @tracing.traced("config")
+    def load(self, profile: str = "all") -> "DotfileRegistry":
+        """Loads every entry, or only one profile (only that profile is deserialized)."""
+        self._entries.clear()
+        self._by_profile.clear()
+        self._by_target = None
+        self._changes.clear()
+        self._profile = None if profile == "all" else profile
+        for dotfile in self.config_service.load_config(self._profile):
+            self._index(dotfile)
+        return self
+
+    def _index(self, dotfile: Dotfile) -> bool:
+        key = self._key(dotfile)
+        if key in self._entries:
+            return False
+        self._entries[key] = dotfile
+        self._by_profile.setdefault(dotfile.profile, {})[key] = dotfile
+        if self._by_target is not None:
+            self._by_target.setdefault(dotfile.expanded_target, []).append(dotfile)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Dotfile]:
+        return iter(self._entries.values())
+
+    def __contains__(self, dotfile: Dotfile) -> bool:
+        return self._key(dotfile) in self._entries
+
+    def all(self) -> List[Dotfile]:
+        return list(self._entries.values())
+
+    def profiles(self) -> List[str]:
+        return list(self._by_profile)
+
+    def select(self, profile: str = "all") -> List[Dotfile]:
+        """Entries of one profile ("all" returns every entry)."""
+        if profile == "all":
+            return self.all()
+        return list(self._by_profile.get(profile, {}).values())
+
+    def find_by_target(self, target: Path) -> List[Dotfile]:
+        """Entries whose expanded target is `target`. The index is built on first use."""
+        if self._by_target is None:
+            self._by_target = {}
+            Dotfile.resolve_all(self._entries.values())
+            for dotfile in self._entries.values():
+                self._by_target.setdefault(dotfile.expanded_target, []).append(dotfile)
+        return list(self._by_target.get(Dotfile.expand_target(target), []))
+
+    def add(self, dotfile: Dotfile) -> bool:
+        """Stages a new entry. Returns False if the same (source, target) already exists."""
+        if not self._index(dotfile):
+            return False
+        self._changes.append(("+", dotfile))
+        return True
+
+    def remove(self, dotfile: Dotfile) -> bool:
+        """Stages the removal of an entry. Returns False if it was not registered."""
+        key = self._key(dotfile)
+        existing = self._entries.pop(key, None)
+        if existing is None:
+            return False
+        profile_entries = self._by_profile[existing.profile]
+        del profile_entries[key]
+        if not profile_entries:
+            del self._by_profile[existing.profile]
+        if self._by_target is not None:
+            self._by_target[existing.expanded_target].remove(existing)
+        self._changes.append(("-", existing))
+        return True
+
+    def update(self, dotfile: Dotfile) -> bool:
+        """Stages new options (template, deploy...) for a registered entry of the same profile. Returns False if it was not registered."""
+        key = self._key(dotfile)
+        existing = self._entries.get(key)
+        if existing is None or existing.profile != dotfile.profile:
+            return False
+        if existing == dotfile:
+            return True
+        # Replaced in place, so a full save keeps the entry order
+        self._entries[key] = dotfile
+        self._by_profile[dotfile.profile][key] = dotfile
+        if self._by_target is not None:
+            entries = self._by_target[existing.expanded_target]
+            entries[entries.index(existing)] = dotfile
+        self._changes += [("-", existing), ("+", dotfile)]
+        return True
+
+    @tracing.traced("config")
+    def commit(self) -> bool:
+        """Writes staged changes with one atomic save. Returns True if anything was written."""
+        if not self.dirty:
+            return False
+        if self._profile is None and not self.config_service.append_only:
+            self.config_service.save_config(self.all())
+        else:
+            # Partial view or append-only backend: persist only the delta
+            self.config_service.apply_changes(self._changes)
+        self._changes.clear()
+        return True
@@ -0,0 +1,229 @@
+import os
+import stat
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from core.models import LinkAction, LinkStatus
+from core.paths import context
+from core.hashing import hash_file, stable_stat_key, stat_key
+from core import cache_file, tracing
+from services.copy_engine import CopyEngine
+
+DEPLOY_MANIFEST_VERSION = 1
+
+
+class DeployManifest:
+    """
+    What copy-mode deploys installed on this host, keyed on the target path:
+    the repo source and, for every deployed file (relative path, "" for a
+    single file), the hash and the (inode, size, mtime) of both the source
+    and the installed copy. Files whose stat still matches are not hashed again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "DeployManifest":
+        """Missing, corrupt or outdated manifests start empty."""
+        manifest = cls(path or context.cache_dir / "deploy-manifest.json")
+        data = cache_file.load(manifest.path, DEPLOY_MANIFEST_VERSION)
+        if data is not None:
+            manifest.entries = data.get("entries", {})
+        return manifest
+
+    def files(self, target: Path, source: Path) -> Optional[Dict[str, dict]]:
+        """The files deployed at `target` from `source`, or None if it was not deployed from there."""
+        entry = self.entries.get(str(target))
+        if entry is None or entry["source"] != str(source):
+            return None
+        return entry["files"]
+
+    def record(self, target: Path, source: Path, files: Dict[str, dict]) -> None:
+        with self._lock:
+            self.entries[str(target)] = {"source": str(source), "files": files}
+            self._dirty = True
+
+    def forget(self, target: Path) -> None:
+        with self._lock:
+            if self.entries.pop(str(target), None) is not None:
+                self._dirty = True
+
+    def save(self) -> None:
+        """Atomically writes the manifest, if anything was recorded."""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = dict(self.entries)
+            self._dirty = False
+        cache_file.save(self.path, DEPLOY_MANIFEST_VERSION, {"entries": entries})
+
+
+@dataclass
+class CopyPlan:
+    """Files of one copy deploy: what to transfer, and their manifest records."""
+    changes: List[str] = field(default_factory=list)  # Relative paths to (re)copy
+    files: Dict[str, dict] = field(default_factory=dict)
+    dirty: bool = False  # The manifest records differ from the stored ones
+
+
+class CopyDeployer:
+    """
+    Copy deploy mode: installs real files at the target instead of a symlink,
+    rsync-style. Only files whose content differs from the repo are copied,
+    and a file is only hashed when its stat no longer matches the manifest.
+    """
+
+    def __init__(self, manifest: DeployManifest, engine: Optional[CopyEngine] = None):
+        self.manifest = manifest
+        self.engine = engine or CopyEngine()
+
+    @staticmethod
+    def _source_files(source: Path) -> List[Tuple[str, os.stat_result]]:
+        """("", stat) for a file; (relative path, stat) of every file below a directory."""
+        st = os.stat(source)
+        if not stat.S_ISDIR(st.st_mode):
+            return [("", st)]
+        files = []
+        for root, dirs, names in os.walk(source):
+            dirs.sort()
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                files.append((os.path.relpath(path, source), os.stat(path)))
+        return files
+
+    @staticmethod
+    def _join(base: Path, rel: str) -> Path:
+        return base / rel if rel else base
+
+    @staticmethod
+    def _hash(path: Path, st: os.stat_result, known: Optional[dict], side: str) -> str:
+        """Hash of `path`, reused from the manifest when its stat is unchanged."""
+        if known is not None and known[side] == stat_key(st):
+            return known["hash"]
+        return hash_file(path)
+
+    def plan(self, source: Path, target: Path, force: bool) -> Tuple[LinkAction, str, Optional[CopyPlan]]:
+        """Decides what a copy deploy of `source` to `target` has to do (reads only)."""
+        known = self.manifest.files(target, source)
+        plan = CopyPlan()
+        try:
+            target_st = os.lstat(target)
+        except FileNotFoundError:
+            target_st = None
+
+        if target_st is not None and stat.S_ISLNK(target_st.st_mode):
+            if os.path.realpath(target) == str(source):
+                # Previously deployed as a link: replacing it loses nothing
+                return LinkAction.BACKUP, "Replacing link with copy", self._full(source)
+            return (LinkAction.BACKUP if force else LinkAction.CONFLICT), "Wrong link target", self._full(source)
+        if target_st is not None and stat.S_ISDIR(target_st.st_mode) != source.is_dir():
+            return (LinkAction.BACKUP if force else LinkAction.CONFLICT), "File exists", self._full(source)
+
+        modified = []
+        for rel, src_st in self._source_files(source):
+            entry = (known or {}).get(rel)
+            digest = self._hash(self._join(source, rel), src_st, entry, "source")
+            record = {"source": stable_stat_key(src_st), "target": None, "hash": digest}
+            plan.files[rel] = record
+            dst = self._join(target, rel)
+            try:
+                dst_st = os.lstat(dst)
+            except (FileNotFoundError, NotADirectoryError):
+                plan.changes.append(rel)
+                continue
+            if not stat.S_ISREG(dst_st.st_mode):
+                modified.append(rel)
+                continue
+            installed = self._hash(dst, dst_st, entry, "target")
+            if installed == digest:
+                record["target"] = stable_stat_key(dst_st)
+            elif entry is not None and installed == entry["hash"]:
+                plan.changes.append(rel)  # Only the repo side changed since the last deploy
+            else:
+                modified.append(rel)
+        plan.dirty = plan.files != known
+
+        if target_st is None:
+            return LinkAction.CREATE, "", plan
+        if modified:
+            what = "Modified since deploy" if known is not None else "File exists"
+            detail = f"{what}: {', '.join(rel or target.name for rel in modified[:3])}{'...' if len(modified) > 3 else ''}"
+            if not force:
+                return LinkAction.CONFLICT, detail, plan
+            return LinkAction.BACKUP, detail, self._full(source)
+        if plan.changes:
+            return LinkAction.UPDATE, f"{len(plan.changes)} changed", plan
+        return LinkAction.SKIP, "Up to date", plan
+
+    def _full(self, source: Path) -> CopyPlan:
+        """A plan that copies every file (the target is backed up and removed first)."""
+        plan = CopyPlan(dirty=True)
+        for rel, src_st in self._source_files(source):
+            plan.files[rel] = {"source": stable_stat_key(src_st), "target": None, "hash": None}
+            plan.changes.append(rel)
+        return plan
+
+    @tracing.traced("link", "copy deploy")
+    def apply(self, source: Path, target: Path, plan: CopyPlan) -> None:
+        """Copies the changed files (each one atomically) and records the deploy."""
+        if "" not in plan.files:
+            target.mkdir(parents=True, exist_ok=True)  # A directory source, possibly empty
+        for rel in plan.changes:
+            src, dst = self._join(source, rel), self._join(target, rel)
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=dst.parent, prefix=f".{dst.name}.")
+            os.close(fd)
+            try:
+                self.engine.copy_file(src, tmp)
+                os.replace(tmp, dst)
+            except BaseException:
+                if os.path.lexists(tmp):
+                    os.unlink(tmp)
+                raise
+            record = plan.files[rel]
+            record["target"] = stable_stat_key(os.stat(dst))
+            if record["hash"] is None:
+                record["hash"] = hash_file(dst)
+        if plan.changes or plan.dirty:
+            self.manifest.record(target, source, plan.files)
+
+    def status(self, source: Path, target: Path) -> LinkStatus:
+        """
+        Drift of a copy deploy, from the manifest: only files whose stat changed
+        are hashed. Files found unchanged get their stat recorded again (right
+        after a deploy it is still racy), so save the manifest afterwards.
+        """
+        known = self.manifest.files(target, source)
+        if known is None:
+            return LinkStatus.FILE_EXISTS
+        outdated = False
+        refreshed = {}
+        for rel, src_st in self._source_files(source):
+            entry = known.get(rel)
+            if entry is None:
+                outdated = True  # New file in the repo
+                continue
+            try:
+                dst_st = os.lstat(self._join(target, rel))
+            except OSError:
+                return LinkStatus.MODIFIED
+            record = dict(entry)
+            if entry["target"] != stat_key(dst_st):
+                if not stat.S_ISREG(dst_st.st_mode) or hash_file(self._join(target, rel)) != entry["hash"]:
+                    return LinkStatus.MODIFIED
+                record["target"] = stable_stat_key(dst_st)
+            if not outdated and entry["source"] != stat_key(src_st):
+                outdated = hash_file(self._join(source, rel)) != entry["hash"]
+                if not outdated:
+                    record["source"] = stable_stat_key(src_st)
+            if record != entry:
+                refreshed[rel] = record
+        if refreshed:
+            self.manifest.record(target, source, {**known, **refreshed})
+        return LinkStatus.OUTDATED if outdated else LinkStatus.COPIED
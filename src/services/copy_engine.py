@@ -0,0 +1,154 @@
+import errno
+import os
+import shutil
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+from core import tracing
+
+try:
+    import fcntl
+except ImportError:  # Non-POSIX platforms: no reflink support
+    fcntl = None
+
+# ioctl(dest_fd, FICLONE, src_fd): share extents copy-on-write (btrfs, XFS, bcachefs...)
+FICLONE = 0x40049409
+
+# Errors meaning "this filesystem/kernel cannot do that", as opposed to real I/O failures
+_UNSUPPORTED = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EBADF, errno.EPERM}
+
+
+@dataclass
+class CopyReport:
+    """What the copy layer did: files per strategy and how many bytes were physically written."""
+    strategies: Counter = field(default_factory=Counter)
+    files: int = 0
+    bytes_total: int = 0
+    bytes_copied: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, strategy: str, size: int, copied: int) -> None:
+        with self._lock:
+            self.strategies[strategy] += 1
+            self.files += 1
+            self.bytes_total += size
+            self.bytes_copied += copied
+        tracing.add("bytes_copied", copied)
+
+    def summary(self) -> str:
+        used = ", ".join(f"{name} ×{count}" for name, count in self.strategies.most_common()) or "none"
+        return f"{self.files} files via {used}; {self.bytes_copied} of {self.bytes_total} bytes physically copied"
+
+
+class CopyEngine:
+    """
+    File copy layer that uses the cheapest mechanism the filesystem offers:
+
+        reflink          FICLONE ioctl, a copy-on-write clone (no data copied)
+        hardlink         only when the caller guarantees the source is about to be removed
+        copy_file_range  in-kernel copy (no user-space buffers; may be offloaded by the fs)
+        copy             plain read/write fallback (shutil)
+
+    Strategies that fail with "unsupported" errors are remembered per device.
+    """
+
+    def __init__(self, report: CopyReport = None):
+        self.report = report if report is not None else CopyReport()
+        # Keyed on (source device, destination device)
+        self._no_reflink: Dict[Tuple[int, int], bool] = {}
+        self._no_copy_range: Dict[Tuple[int, int], bool] = {}
+
+    def copy_file(self, src, dst, preserve_metadata: bool = True) -> str:
+        """Copies one file (like shutil.copy2 by default). Returns the strategy used."""
+        src, dst = os.fspath(src), os.fspath(dst)
+        st = os.stat(src)
+        size = st.st_size
+        dev = (st.st_dev, os.stat(os.path.dirname(os.path.abspath(dst))).st_dev)
+
+        strategy, copied = None, size
+        if fcntl is not None and not self._no_reflink.get(dev):
+            if self._reflink(src, dst):
+                strategy, copied = "reflink", 0
+            else:
+                self._no_reflink[dev] = True
+        if strategy is None and hasattr(os, "copy_file_range") and not self._no_copy_range.get(dev):
+            if self._copy_range(src, dst, size):
+                strategy = "copy_file_range"
+            else:
+                self._no_copy_range[dev] = True
+        if strategy is None:
+            shutil.copyfile(src, dst)
+            strategy = "copy"
+
+        if preserve_metadata:
+            shutil.copystat(src, dst)
+        self.report.record(strategy, size, copied)
+        return strategy
+
+    def clone(self, src, dst) -> bool:
+        """Attempts only a copy-on-write clone of src to dst. Returns False if unsupported."""
+        if fcntl is None:
+            return False
+        src, dst = os.fspath(src), os.fspath(dst)
+        st = os.stat(src)
+        size = st.st_size
+        dev = (st.st_dev, os.stat(os.path.dirname(os.path.abspath(dst))).st_dev)
+        if self._no_reflink.get(dev):
+            return False
+        if not self._reflink(src, dst):
+            self._no_reflink[dev] = True
+            return False
+        self.report.record("reflink", size, 0)
+        return True
+
+    def link_or_copy(self, src, dst) -> str:
+        """
+        Hardlinks src to dst, falling back to copy_file. Only safe when src is about
+        to be unlinked (not edited in place) and has no other links.
+        """
+        src, dst = os.fspath(src), os.fspath(dst)
+        st = os.lstat(src)
+        if st.st_nlink == 1:
+            try:
+                os.link(src, dst)
+                self.report.record("hardlink", st.st_size, 0)
+                return "hardlink"
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED and e.errno not in (errno.EMLINK, errno.EACCES):
+                    raise
+        return self.copy_file(src, dst, preserve_metadata=False)
+
+    def copy_tree(self, src, dst) -> None:
+        """shutil.copytree with this engine as the per-file copy function."""
+        shutil.copytree(src, dst, copy_function=self.copy_file)
+
+    @staticmethod
+    def _reflink(src: str, dst: str) -> bool:
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            return True
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            return False
+
+    @staticmethod
+    def _copy_range(src: str, dst: str, size: int) -> bool:
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = size
+                while remaining > 0:
+                    sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if sent == 0:
+                        break
+                    remaining -= sent
+                if remaining:
+                    # File grew or the kernel stopped early: finish in user space
+                    shutil.copyfileobj(fsrc, fdst)
+            return True
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            return False
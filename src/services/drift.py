@@ -0,0 +1,129 @@
+import difflib
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from core.models import Dotfile, DriftReport
+from core import tracing
+from services.file_service import FileService
+from services.hash_index import HashIndex
+
+# Bytes sniffed for NUL bytes to tell binary files from text
+_SNIFF_SIZE = 8192
+
+# (relative path, source path, source stat, target path, target stat)
+Pair = Tuple[str, Path, os.stat_result, Path, os.stat_result]
+
+
+def _files(root: Path, st: os.stat_result) -> Dict[str, Tuple[Path, os.stat_result]]:
+    """{"": (root, stat)} for a file; {relative path: (path, stat)} of every file below a directory."""
+    if not stat.S_ISDIR(st.st_mode):
+        return {"": (root, st)}
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = Path(directory) / name
+            try:
+                files[os.path.relpath(path, root)] = (path, os.stat(path))
+            except OSError:
+                continue  # Dangling link or vanished file: nothing to compare
+    return files
+
+
+class DriftChecker:
+    """
+    Compares repo sources (renderings for templates) with host targets.
+    Both sides are listed and stat'ed per entry over a thread pool; files of
+    different sizes differ without being read, and the rest are hashed in
+    parallel through the HashIndex, so unchanged files are not read at all.
+    """
+
+    def __init__(self, index: HashIndex, workers: Optional[int] = None):
+        self.index = index
+        self.workers = workers
+
+    @tracing.traced("diff")
+    def check(self, dotfiles: List[Dotfile]) -> List[DriftReport]:
+        Dotfile.resolve_all(dotfiles)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            listed = list(pool.map(self._list, dotfiles))
+
+            pending: List[Tuple[DriftReport, Pair]] = []
+            stats: Dict[Path, os.stat_result] = {}
+            for report, pairs in listed:
+                for pair in pairs:
+                    rel, source, source_st, target, target_st = pair
+                    if source_st.st_size != target_st.st_size:
+                        report.changed.append(rel)
+                        continue
+                    pending.append((report, pair))
+                    stats[source], stats[target] = source_st, target_st
+
+            paths = list(stats)
+            digests = dict(zip(paths, pool.map(lambda p: self.index.digest(p, stats[p]), paths)))
+
+        for report, (rel, source, _, target, _) in pending:
+            if digests[source] != digests[target]:
+                report.changed.append(rel)
+        for report, _ in listed:
+            report.changed.sort()
+        return [report for report, _ in listed]
+
+    @staticmethod
+    def _list(dotfile: Dotfile) -> Tuple[DriftReport, List[Pair]]:
+        source = FileService.link_source(dotfile)
+        target = dotfile.expanded_target
+        report = DriftReport(dotfile, source, target)
+        try:
+            source_st = os.stat(source)
+        except OSError:
+            report.error = "Template not rendered" if dotfile.template else "Source missing"
+            return report, []
+        try:
+            target_st = os.stat(target)
+        except FileNotFoundError:
+            if os.path.islink(target):
+                report.error = "Broken link on the host"
+                return report, []
+            report.only_source = sorted(_files(source, source_st))
+            return report, []
+        except OSError as e:
+            report.error = f"Cannot stat target: {e}"
+            return report, []
+
+        if (target_st.st_dev, target_st.st_ino) == (source_st.st_dev, source_st.st_ino):
+            # Linked (or hardlinked) to the source: same file, nothing to compare
+            report.linked = True
+            return report, []
+        if stat.S_ISDIR(source_st.st_mode) != stat.S_ISDIR(target_st.st_mode):
+            report.error = "Target is a directory" if stat.S_ISDIR(target_st.st_mode) else "Target is not a directory"
+            return report, []
+
+        source_files, target_files = _files(source, source_st), _files(target, target_st)
+        report.only_source = sorted(source_files.keys() - target_files.keys())
+        report.only_target = sorted(target_files.keys() - source_files.keys())
+        pairs = [
+            (rel, *source_files[rel], *target_files[rel])
+            for rel in sorted(source_files.keys() & target_files.keys())
+        ]
+        return report, pairs
+
+    @staticmethod
+    def unified_diff(report: DriftReport, rel: str, context_lines: int = 3) -> List[str]:
+        """Unified diff of one changed file, from the repo version to the host version."""
+        source = report.source / rel if rel else report.source
+        target = report.target / rel if rel else report.target
+        label = f"{report.dotfile.source / rel if rel else report.dotfile.source}"
+        try:
+            texts = []
+            for path in (source, target):
+                data = path.read_bytes()
+                if b"\0" in data[:_SNIFF_SIZE]:
+                    return [f"Binary files repo/{label} and host/{label} differ"]
+                texts.append(data.decode("utf-8", errors="replace").splitlines(keepends=True))
+        except OSError as e:
+            return [f"Cannot read {label}: {e}"]
+        lines = difflib.unified_diff(texts[0], texts[1], f"repo/{label}", f"host/{label}", n=context_lines)
+        # Last lines without a newline would run into the next header
+        return [line if line.endswith("\n") else line + "\n\\ No newline at end of file\n" for line in lines]
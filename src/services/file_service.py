@@ -1,17 +1,37 @@
 import shutil
 import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from pathlib import Path
-from datetime import datetime
-from core.models import Dotfile
+from typing import Callable, List, Optional
+from core.models import Dotfile, LinkAction, LinkStep, LinkStatus, StatusReport
 from core.paths import context
-from core.exceptions import FileOperationError, BackupError
+from core.exceptions import FileOperationError
+from core import tracing
+from services.backup_store import BackupStore
+from services.copy_deploy import CopyDeployer, DeployManifest
+from services.copy_engine import CopyEngine, CopyReport
+from services.import_pipeline import ImportPipeline, ImportProgress
+from services.template_renderer import TemplateRenderer
 
 class FileService:
     @staticmethod
-    def safe_import(original_path: Path, relative_repo_path: Path, profile: str) -> Dotfile:
+    @tracing.traced("import")
+    def safe_import(
+        original_path: Path,
+        relative_repo_path: Path,
+        profile: str,
+        report: Optional[CopyReport] = None,
+        progress: Optional[Callable[[ImportProgress], None]] = None,
+        template: bool = False,
+        deploy: str = "link",
+    ) -> Dotfile:
         """
         Safely moves a file into the repo: Copy -> Verify -> Link -> Delete Original.
-        Returns the new Dotfile object.
+        Returns the new Dotfile object. Copy strategies and bytes are added to `report`.
+        With `template`, the entry is linked to its per-host rendering instead;
+        with deploy="copy", a copy of the repo file replaces the original.
         """
         original_path = original_path.expanduser().resolve()
         repo_dest = context.get_absolute_source(relative_repo_path)
@@ -25,25 +45,27 @@ class FileService:
         except OSError as e:
             raise FileOperationError(f"Could not create repo directory: {e}")
 
-        # 2. Copy (Non-destructive first)
-        if repo_dest.exists():
+        # 2. Copy + Verify into a staging path (resumable). Nothing in the repo is touched yet.
+        engine = CopyEngine(report)
+        pipeline = ImportPipeline(engine, progress)
+        try:
+            staging = pipeline.stage(original_path, repo_dest)
+        except FileOperationError:
+            raise
+        except Exception as e:
+            raise FileOperationError(f"Failed to copy file to repo: {e}")
+
+        if repo_dest.exists() or repo_dest.is_symlink():
             # If it exists in repo, backup the repo version and overwrite with new source
             # This ensures we are actually "importing" the current state, not restoring old state.
-            FileService.backup_file(repo_dest)
-            if repo_dest.is_dir():
+            FileService.backup_file(repo_dest, consume=True, engine=engine)
+            if repo_dest.is_dir() and not repo_dest.is_symlink():
                 shutil.rmtree(repo_dest)
             else:
                 repo_dest.unlink()
-        
-        try:
-            if original_path.is_dir():
-                shutil.copytree(original_path, repo_dest)
-            else:
-                shutil.copy2(original_path, repo_dest)
-        except Exception as e:
-            raise FileOperationError(f"Failed to copy file to repo: {e}")
+        pipeline.commit(staging, repo_dest)
 
-        # 3. Create Symlink (this verifies the copy implicitly by needing the path)
+        # 3. Create Symlink (the copy was verified by hash in step 2)
         # Calculate portable target (e.g. ~/.zshrc)
         try:
             portable_target = Path("~") / original_path.relative_to(Path.home())
@@ -51,7 +73,7 @@ class FileService:
             # Fallback for system files not in home
             portable_target = original_path
 
-        dotfile = Dotfile(source=relative_repo_path, target=portable_target, profile=profile)
+        dotfile = Dotfile(source=relative_repo_path, target=portable_target, profile=profile, template=template, deploy=deploy)
         
         # 4. Enforce Link (replaces original)
         FileService.create_symlink(dotfile, force=True)
@@ -60,71 +82,207 @@ class FileService:
 
     @staticmethod
     def create_symlink(dotfile: Dotfile, force: bool = False) -> str:
-        """Creates the symlink. Returns status message."""
-        source_abs = context.get_absolute_source(dotfile.source)
+        """Creates the symlink (rendering the entry first if it is a template). Returns status message."""
+        if dotfile.template:
+            render = TemplateRenderer.load().render([dotfile])[0]
+            if render.error:
+                raise FileOperationError(f"Template failed: {render.error}")
+        step = FileService.apply_link_plan(FileService.plan_links([dotfile], force))[0]
+        if step.error:
+            raise FileOperationError(f"Symlink failed: {step.error}")
+        if step.action == LinkAction.BROKEN:
+            return f"[red]BROKEN[/red] {step.detail}"
+        if step.action == LinkAction.SKIP:
+            return "[green]OK[/green] Already linked"
+        if step.action == LinkAction.CONFLICT:
+            return f"[yellow]CONFLICT[/yellow] {step.detail}"
+        if step.copy is not None:
+            return "[green]COPIED[/green] Successfully"
+        return "[green]LINKED[/green] Successfully"
+
+    @staticmethod
+    @tracing.traced("link")
+    def plan_links(dotfiles: List[Dotfile], force: bool = False, workers: Optional[int] = None) -> List[LinkStep]:
+        """
+        Phase 1 of linking: stats every source and target (in parallel) and decides
+        what to do with each entry without modifying anything. Copy-mode entries
+        are compared against the deploy manifest.
+        """
+        Dotfile.resolve_all(dotfiles)
+        deployer = CopyDeployer(DeployManifest.load()) if any(df.deploy == "copy" for df in dotfiles) else None
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            plan = list(pool.map(lambda df: FileService._plan_one(df, force, deployer), dotfiles))
+
+        # Two entries pointing at the same target would race when applied concurrently
+        claimed = set()
+        for i, step in enumerate(plan):
+            if step.action in (LinkAction.CREATE, LinkAction.BACKUP, LinkAction.UPDATE):
+                if step.target in claimed:
+                    plan[i] = replace(step, action=LinkAction.CONFLICT, detail="Duplicate target in config")
+                claimed.add(step.target)
+        return plan
+
+    @staticmethod
+    def link_source(dotfile: Dotfile) -> Path:
+        """What the target links to: the repo file, or its rendering for templates."""
+        if dotfile.template:
+            return Path(os.path.normpath(context.build_dir / dotfile.source))
+        return context.get_absolute_source(dotfile.source)
+
+    @staticmethod
+    def _plan_one(dotfile: Dotfile, force: bool, deployer: Optional[CopyDeployer] = None) -> LinkStep:
+        source_abs = FileService.link_source(dotfile)
         target_abs = dotfile.expanded_target
 
-        if not source_abs.exists():
-             return f"[red]BROKEN[/red] Source missing: {source_abs}"
+        def step(action: LinkAction, detail: str = "") -> LinkStep:
+            return LinkStep(dotfile, action, source_abs, target_abs, detail)
 
-        if target_abs.is_symlink():
-            if target_abs.resolve() == source_abs:
-                return "[green]OK[/green] Already linked"
-            if not force:
-                return "[yellow]CONFLICT[/yellow] Wrong link target"
-        
-        if target_abs.exists():
-            if not force:
-                return "[yellow]CONFLICT[/yellow] File exists"
-            
-            # Backup before force overwrite
-            FileService.backup_file(target_abs)
-            
-            if target_abs.is_symlink() or target_abs.is_file():
-                target_abs.unlink()
-            elif target_abs.is_dir():
-                shutil.rmtree(target_abs)
+        # A template only needs to exist in the repo: its output is rendered before linking
+        repo_source = context.get_absolute_source(dotfile.source) if dotfile.template else source_abs
+        if not repo_source.exists():
+            return step(LinkAction.BROKEN, f"Source missing: {repo_source}")
+
+        if dotfile.deploy == "copy":
+            if dotfile.template and not source_abs.exists():
+                # Only possible in a dry run: nothing to compare the target with yet
+                return step(LinkAction.BROKEN, "Template not rendered yet")
+            try:
+                action, detail, copy_plan = deployer.plan(source_abs, target_abs, force)
+            except OSError as e:
+                return step(LinkAction.CONFLICT, f"Cannot compare copy: {e}")
+            return LinkStep(dotfile, action, source_abs, target_abs, detail, copy=copy_plan)
 
         try:
-            target_abs.parent.mkdir(parents=True, exist_ok=True)
-            target_abs.symlink_to(source_abs)
-            return "[green]LINKED[/green] Successfully"
-        except Exception as e:
-            raise FileOperationError(f"Symlink failed: {e}")
+            st = os.lstat(target_abs)
+        except FileNotFoundError:
+            return step(LinkAction.CREATE)
+        except OSError as e:
+            return step(LinkAction.CONFLICT, f"Cannot stat target: {e}")
+
+        if stat.S_ISLNK(st.st_mode):
+            if FileService._links_to(target_abs, source_abs):
+                return step(LinkAction.SKIP, "Already linked")
+            return step(LinkAction.BACKUP if force else LinkAction.CONFLICT, "Wrong link target")
+
+        return step(LinkAction.BACKUP if force else LinkAction.CONFLICT, "File exists")
 
     @staticmethod
-    def backup_file(path: Path):
-        """Creates a timestamped backup in .backups/"""
-        if not path.exists(): 
-            return
-            
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_name = f"{path.name}.{timestamp}.bak"
-        context.backup_dir.mkdir(exist_ok=True)
-        dest = context.backup_dir / backup_name
-        
+    def _links_to(link: Path, source_abs: Path) -> bool:
+        """True if the symlink points at source_abs. Only falls back to a full resolve when readlink is ambiguous."""
         try:
-            if path.is_dir():
-                shutil.copytree(path, dest)
-            else:
-                shutil.copy2(path, dest)
-        except Exception as e:
-            raise BackupError(f"Could not backup {path}: {e}")
+            raw = os.readlink(link)
+        except OSError:
+            return False
+        if os.path.normpath(os.path.join(link.parent, raw)) == str(source_abs):
+            return True
+        return os.path.realpath(link) == str(source_abs)
+
+    @staticmethod
+    @tracing.traced("link")
+    def apply_link_plan(plan: List[LinkStep], workers: Optional[int] = None, report: Optional[CopyReport] = None) -> List[LinkStep]:
+        """
+        Phase 2 of linking: executes CREATE, BACKUP and UPDATE steps with a worker pool.
+        Returns the plan with `error` set on the steps that failed.
+        """
+        engine = CopyEngine(report)
+        manifest = DeployManifest.load()
+        deployer = CopyDeployer(manifest, engine)
+        def run(step: LinkStep) -> LinkStep:
+            # A SKIP copy deploy whose manifest records (stats, hashes) are new is applied to record them
+            refresh = step.action == LinkAction.SKIP and step.copy is not None and step.copy.dirty
+            if step.action not in (LinkAction.CREATE, LinkAction.BACKUP, LinkAction.UPDATE) and not refresh:
+                return step
+            try:
+                if step.action == LinkAction.BACKUP:
+                    FileService.backup_file(step.target, consume=True, engine=engine)
+                    if step.target.is_symlink() or not step.target.is_dir():
+                        step.target.unlink()
+                    else:
+                        shutil.rmtree(step.target)
+                if step.copy is not None:
+                    deployer.apply(step.source, step.target, step.copy)
+                    return step
+                step.target.parent.mkdir(parents=True, exist_ok=True)
+                step.target.symlink_to(step.source)
+                # A target switched from copy to link mode is no longer a copy deploy
+                manifest.forget(step.target)
+                return step
+            except Exception as e:
+                return replace(step, error=str(e))
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run, plan))
+        manifest.save()
+        return results
+
+    @staticmethod
+    @tracing.traced("backup")
+    def backup_file(path: Path, consume: bool = False, engine: Optional[CopyEngine] = None):
+        """
+        Saves `path` into the content-addressed store in .backups/
+        Pass consume=True only when `path` is deleted right afterwards (allows hardlinked backups).
+        """
+        return BackupStore(context.backup_dir, engine).backup(path, consume)
+
+    @staticmethod
+    def check_status(dotfile: Dotfile) -> LinkStatus:
+        deployer = CopyDeployer(DeployManifest.load())
+        status = FileService._status_one(dotfile, deployer).status
+        deployer.manifest.save()
+        return status
+
+    @staticmethod
+    @tracing.traced("status")
+    def collect_status(dotfiles: List[Dotfile], workers: Optional[int] = None) -> List[StatusReport]:
+        """Status of many entries, computed over a thread pool. Order matches `dotfiles`."""
+        Dotfile.resolve_all(dotfiles)
+        deployer = CopyDeployer(DeployManifest.load())
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            reports = list(pool.map(lambda df: FileService._status_one(df, deployer), dotfiles))
+        # Stats verified by hashing are recorded, so the next status does not hash them again
+        deployer.manifest.save()
+        return reports
 
     @staticmethod
-    def check_status(dotfile: Dotfile) -> str:
-        source_abs = context.get_absolute_source(dotfile.source)
+    def _status_one(dotfile: Dotfile, deployer: CopyDeployer) -> StatusReport:
+        """
+        One stat of the source and one lstat (+ readlink for symlinks) of the target.
+        Copy deploys are checked against the deploy manifest instead.
+        """
+        base = context.build_dir if dotfile.template else context.repo_root
+        source_abs = Path(os.path.normpath(base / dotfile.source))
         target_abs = dotfile.expanded_target
-        
-        if not source_abs.exists():
-            return "[red]MISSING SOURCE[/red]"
-        
-        if not target_abs.exists():
-            return "[dim]NOT INSTALLED[/dim]"
-            
-        if target_abs.is_symlink():
-            if target_abs.resolve() == source_abs:
-                return "[green]ACTIVE[/green]"
-            return "[yellow]WRONG TARGET[/yellow]"
-            
-        return "[red]FILE EXISTS[/red]"
+
+        def report(status: LinkStatus) -> StatusReport:
+            return StatusReport(dotfile, status, source_abs, target_abs)
+
+        try:
+            os.stat(source_abs)
+        except OSError:
+            return report(LinkStatus.MISSING_SOURCE)
+
+        try:
+            st = os.lstat(target_abs)
+        except FileNotFoundError:
+            return report(LinkStatus.NOT_INSTALLED)
+        except OSError:
+            return report(LinkStatus.FILE_EXISTS)
+
+        if not stat.S_ISLNK(st.st_mode):
+            if dotfile.deploy == "copy" or str(target_abs) in deployer.manifest.entries:
+                try:
+                    return report(deployer.status(FileService.link_source(dotfile), target_abs))
+                except OSError:
+                    return report(LinkStatus.MISSING_SOURCE)
+            return report(LinkStatus.FILE_EXISTS)
+
+        try:
+            raw = os.readlink(target_abs)
+        except OSError:
+            return report(LinkStatus.WRONG_TARGET)
+        if os.path.normpath(os.path.join(target_abs.parent, raw)) == str(source_abs):
+            return report(LinkStatus.ACTIVE)
+        # Only links that do not match textually pay for a full resolution
+        if os.path.realpath(target_abs) == os.path.realpath(source_abs):
+            return report(LinkStatus.ACTIVE)
+        return report(LinkStatus.WRONG_TARGET)
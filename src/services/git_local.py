@@ -1,24 +1,59 @@
+import os
+import shutil
 import subprocess
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+from core.exceptions import GitError
 from core.paths import context
+from core import tracing
+from services.git_native import NativeGit, UnsupportedRepository
+
+
+@lru_cache(maxsize=None)
+def _git_available() -> bool:
+    return shutil.which("git") is not None
 
 class LocalGit:
     """
     Handles ONLY local git operations. 
     No remote interaction (push/pull) to ensure privacy and decoupling.
     """
-    
+
+    # Number of git processes started so far (see benchmarks/git_session.py)
+    spawns = 0
+
+    @staticmethod
+    def backend() -> str:
+        """
+        "subprocess" (the git binary) or "native" (services.git_native, no process
+        spawns). DOTFILE_GIT_BACKEND picks one; by default native is only used when
+        git is not installed.
+        """
+        choice = os.getenv("DOTFILE_GIT_BACKEND", "auto")
+        if choice in ("native", "subprocess"):
+            return choice
+        return "subprocess" if _git_available() else "native"
+
     @staticmethod
-    def _run(args: list) -> bool:
+    def _run(args: list, input: Optional[bytes] = None, check: bool = True) -> subprocess.CompletedProcess:
+        LocalGit.spawns += 1
         try:
-            subprocess.run(
-                ["git"] + args,
-                cwd=context.repo_root,
-                check=True,
-                capture_output=True
-            )
-            return True
-        except subprocess.CalledProcessError:
-            return False
+            with tracing.span(f"git {args[0]}", "subprocess", argv=args[:4]):
+                result = subprocess.run(
+                    ["git"] + args,
+                    cwd=context.repo_root,
+                    input=input,
+                    capture_output=True,
+                    # Untranslated messages, whatever the user's locale
+                    env={**os.environ, "LC_ALL": "C"},
+                )
+        except FileNotFoundError:
+            raise GitError("git is not installed")
+        if check and result.returncode != 0:
+            output = (result.stderr or result.stdout).decode(errors="replace").strip()
+            raise GitError(f"git {args[0]} failed: {output}")
+        return result
 
     @staticmethod
     def is_repo() -> bool:
@@ -27,19 +62,69 @@ class LocalGit:
     @staticmethod
     def init_repo():
         if not LocalGit.is_repo():
-            LocalGit._run(["init"])
+            if LocalGit.backend() == "native":
+                NativeGit(context.repo_root).init()
+            else:
+                LocalGit._run(["init"])
 
     @staticmethod
-    def commit_changes(message: str) -> bool:
+    def commit_changes(message: str, paths: Optional[List[Path]] = None) -> bool:
         """
-        Stages tracked files (updates) and commits. 
-        Does NOT stage untracked files automatically for safety.
+        Commits `paths` (new, modified or deleted), or every tracked file that
+        changed when no paths are given. Does NOT stage other untracked files.
+        Returns False if there was nothing to commit; raises GitError on failure.
         """
-        if not LocalGit.is_repo():
-            LocalGit.init_repo()
-            
-        # Add only modified tracked files
-        LocalGit._run(["add", "-u"])
-        
-        # Try to commit
-        return LocalGit._run(["commit", "-m", message])
+        session = GitSession()
+        session.stage(*(paths or []))
+        return session.commit(message)
+
+
+class GitSession:
+    """
+    Collects the paths touched by one logical operation (an import, a scan...)
+    and turns them into exactly one commit: a single `git add` fed the path list
+    on stdin, then a single `git commit`.
+    """
+
+    def __init__(self):
+        self.paths: List[str] = []
+
+    def stage(self, *paths: Path) -> None:
+        """Queues paths (absolute or relative to the repo) for the next commit."""
+        for path in paths:
+            path = Path(path)
+            if path.is_absolute():
+                path = Path(os.path.relpath(path, context.repo_root))
+            self.paths.append(str(path))
+
+    @tracing.traced("git")
+    def commit(self, message: str) -> bool:
+        """Stages the queued paths and commits. Returns False if nothing changed."""
+        LocalGit.init_repo()
+        paths, self.paths = self.paths, []
+        if LocalGit.backend() == "native":
+            try:
+                return NativeGit(context.repo_root).commit(paths, message)
+            except UnsupportedRepository:
+                if not _git_available():
+                    raise
+        return self._commit_subprocess(paths, message)
+
+    @staticmethod
+    def _commit_subprocess(paths: List[str], message: str) -> bool:
+        if paths:
+            # -A: the pathspecs also pick up deletions (e.g. a replaced import)
+            pathspecs = "\0".join(sorted(set(paths))).encode()
+            LocalGit._run(["add", "-A", "--pathspec-from-file=-", "--pathspec-file-nul"], input=pathspecs)
+        else:
+            # Add only modified tracked files
+            LocalGit._run(["add", "-u"])
+
+        result = LocalGit._run(["commit", "-q", "-m", message], check=False)
+        if result.returncode == 0:
+            return True
+        # Only on failure: was it because nothing is staged? (git's text may be localized)
+        if LocalGit._run(["diff", "--cached", "--quiet"], check=False).returncode == 0:
+            return False
+        output = (result.stderr or result.stdout).decode(errors="replace").strip()
+        raise GitError(f"git commit failed: {output}")
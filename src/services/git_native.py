@@ -0,0 +1,449 @@
+import getpass
+import hashlib
+import os
+import socket
+import stat
+import struct
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from core.exceptions import GitError
+from core import tracing
+
+# Index entry up to (not including) the path: 10 x uint32 stat fields, sha1, flags
+_ENTRY = struct.Struct(">10I20sH")
+_EXTENDED = 0x4000
+_NAME_MASK = 0xFFF
+_CHUNK = 1024 * 1024
+
+MODE_FILE, MODE_EXEC, MODE_LINK, MODE_TREE = 0o100644, 0o100755, 0o120000, 0o40000
+
+
+class UnsupportedRepository(GitError):
+    """The repository uses a feature the in-process writer does not handle (use the git binary)."""
+    pass
+
+
+class IndexEntry(NamedTuple):
+    ctime_s: int
+    ctime_ns: int
+    mtime_s: int
+    mtime_ns: int
+    dev: int
+    ino: int
+    mode: int
+    uid: int
+    gid: int
+    size: int
+    sha: bytes
+
+
+class NativeGit:
+    """
+    In-process writer for the subset of git the tool needs: loose blobs, trees and
+    commits in .git/objects, a version 2 index, and branch refs. Repositories it
+    cannot update safely (packed objects behind HEAD, index v4 or split index,
+    unmerged entries, non-SHA-1 object formats) raise UnsupportedRepository so the
+    caller can fall back to the git binary. .gitignore rules are not evaluated:
+    only paths the tool explicitly stages are added.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.git_dir = self.root / ".git"
+
+    # --- Repository --------------------------------------------------------
+
+    def is_repo(self) -> bool:
+        return self.git_dir.is_dir()
+
+    def init(self, branch: str = "master") -> None:
+        if self.is_repo():
+            return
+        for sub in ("objects/info", "objects/pack", "refs/heads", "refs/tags"):
+            (self.git_dir / sub).mkdir(parents=True, exist_ok=True)
+        (self.git_dir / "HEAD").write_text(f"ref: refs/heads/{branch}\n")
+        (self.git_dir / "config").write_text(
+            "[core]\n"
+            "\trepositoryformatversion = 0\n"
+            "\tfilemode = true\n"
+            "\tbare = false\n"
+            "\tlogallrefupdates = true\n"
+        )
+
+    def _check_supported(self) -> None:
+        if self.root.joinpath(".git").is_file():
+            raise UnsupportedRepository("worktrees and submodules (.git file) are not supported")
+        if self._config_value(self.git_dir / "config", "core", "repositoryformatversion") not in (None, "0"):
+            raise UnsupportedRepository("repository format extensions are not supported")
+
+    # --- Objects -----------------------------------------------------------
+
+    def _object_path(self, hex_sha: str) -> Path:
+        return self.git_dir / "objects" / hex_sha[:2] / hex_sha[2:]
+
+    def _write_object(self, kind: str, data: bytes) -> bytes:
+        header = f"{kind} {len(data)}\0".encode()
+        sha = hashlib.sha1(header + data).digest()
+        path = self._object_path(sha.hex())
+        if not path.exists():
+            self._store(path, [header, data])
+        return sha
+
+    def _write_blob_file(self, full: Path, st: os.stat_result) -> bytes:
+        """Hashes a file or symlink as a blob, streaming; only compresses it when the object is new."""
+        if stat.S_ISLNK(st.st_mode):
+            return self._write_object("blob", os.fsencode(os.readlink(full)))
+
+        header = f"blob {st.st_size}\0".encode()
+        digest = hashlib.sha1(header)
+        for chunk in self._chunks(full):
+            digest.update(chunk)
+        sha = digest.digest()
+        path = self._object_path(sha.hex())
+        if not path.exists():
+            self._store(path, self._iter_with(header, full))
+        return sha
+
+    @staticmethod
+    def _chunks(path: Path) -> Iterator[bytes]:
+        with open(path, "rb") as f:
+            yield from iter(lambda: f.read(_CHUNK), b"")
+
+    def _iter_with(self, header: bytes, path: Path) -> Iterator[bytes]:
+        yield header
+        yield from self._chunks(path)
+
+    @staticmethod
+    def _store(path: Path, chunks) -> None:
+        # Same protocol as git: compress into a temporary file, then rename into place
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.parent / f"tmp_obj_{uuid.uuid4().hex}"
+        compressor = zlib.compressobj()
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    f.write(compressor.compress(chunk))
+                f.write(compressor.flush())
+            os.chmod(tmp, 0o444)
+            os.replace(tmp, path)
+        except BaseException:
+            if tmp.exists():
+                tmp.unlink()
+            raise
+
+    def _read_object(self, hex_sha: str) -> Tuple[str, bytes]:
+        path = self._object_path(hex_sha)
+        try:
+            raw = zlib.decompress(path.read_bytes())
+        except FileNotFoundError:
+            raise UnsupportedRepository(f"object {hex_sha} is packed")
+        header, _, data = raw.partition(b"\0")
+        return header.split(b" ")[0].decode(), data
+
+    # --- Refs --------------------------------------------------------------
+
+    def _head(self) -> Tuple[Optional[str], Optional[str]]:
+        """(ref HEAD points to or None if detached, commit id or None if unborn)."""
+        head = (self.git_dir / "HEAD").read_text().strip()
+        if not head.startswith("ref: "):
+            return None, head
+        ref = head[5:]
+        return ref, self._resolve_ref(ref)
+
+    def _resolve_ref(self, ref: str) -> Optional[str]:
+        try:
+            return (self.git_dir / ref).read_text().strip()
+        except FileNotFoundError:
+            pass
+        try:
+            with open(self.git_dir / "packed-refs", encoding="utf-8") as f:
+                for line in f:
+                    if line[:1] not in ("#", "^") and line.rstrip("\n").endswith(" " + ref):
+                        return line.split(" ", 1)[0]
+        except FileNotFoundError:
+            pass
+        return None
+
+    def _update_ref(self, ref: Optional[str], hex_sha: str) -> None:
+        path = self.git_dir / (ref or "HEAD")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._locked_write(path, f"{hex_sha}\n".encode())
+
+    @staticmethod
+    def _locked_write(path: Path, data: bytes) -> None:
+        """git's lock protocol: write <path>.lock (created exclusively), then rename over <path>."""
+        lock = path.with_name(path.name + ".lock")
+        try:
+            fd = os.open(lock, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            raise GitError(f"{lock} exists: another git process seems to be running")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(lock, path)
+        except BaseException:
+            if lock.exists():
+                lock.unlink()
+            raise
+
+    # --- Index -------------------------------------------------------------
+
+    def _read_index(self) -> Dict[bytes, IndexEntry]:
+        try:
+            data = (self.git_dir / "index").read_bytes()
+        except FileNotFoundError:
+            return {}
+        if len(data) < 32 or data[:4] != b"DIRC" or hashlib.sha1(data[:-20]).digest() != data[-20:]:
+            raise GitError("the git index is corrupt")
+        version, count = struct.unpack(">II", data[4:12])
+        if version not in (2, 3):
+            raise UnsupportedRepository(f"index version {version} is not supported")
+
+        entries: Dict[bytes, IndexEntry] = {}
+        offset = 12
+        for _ in range(count):
+            fields = _ENTRY.unpack_from(data, offset)
+            flags = fields[-1]
+            if flags & 0x3000:
+                raise UnsupportedRepository("the index has unmerged entries")
+            if flags & _EXTENDED:
+                raise UnsupportedRepository("the index uses extended flags")
+            start = offset + _ENTRY.size
+            end = data.index(b"\0", start)
+            entries[data[start:end]] = IndexEntry(*fields[:-1])
+            offset += (_ENTRY.size + end - start + 8) // 8 * 8
+
+        # Extensions: optional ones (uppercase signature, e.g. the TREE cache) are dropped on rewrite
+        while offset < len(data) - 20:
+            signature = data[offset:offset + 4]
+            size = struct.unpack(">I", data[offset + 4:offset + 8])[0]
+            if not b"A" <= signature[:1] <= b"Z":
+                raise UnsupportedRepository(f"index extension {signature!r} is not supported")
+            offset += 8 + size
+        return entries
+
+    @staticmethod
+    def _serialize_index(entries: Dict[bytes, IndexEntry]) -> bytes:
+        parts = [b"DIRC", struct.pack(">II", 2, len(entries))]
+        for path in sorted(entries):
+            entry = entries[path]
+            flags = min(len(path), _NAME_MASK)
+            record = _ENTRY.pack(*entry, flags) + path
+            parts.append(record + b"\0" * (8 - len(record) % 8))
+        body = b"".join(parts)
+        return body + hashlib.sha1(body).digest()
+
+    def _entry(self, full: Path, st: os.stat_result, old: Optional[IndexEntry], racy_before: int) -> IndexEntry:
+        if stat.S_ISLNK(st.st_mode):
+            mode, size = MODE_LINK, len(os.fsencode(os.readlink(full)))
+        else:
+            mode, size = (MODE_EXEC if st.st_mode & stat.S_IXUSR else MODE_FILE), st.st_size
+        mtime_s, mtime_ns = int(st.st_mtime), st.st_mtime_ns % 1_000_000_000
+        if (
+            old is not None and old.mode == mode and old.size == size & 0xFFFFFFFF
+            and (old.mtime_s, old.mtime_ns, old.ino) == (mtime_s, mtime_ns, st.st_ino & 0xFFFFFFFF)
+            and mtime_s < racy_before
+        ):
+            sha = old.sha  # Stat data unchanged (and not racy): no need to read the file
+        else:
+            sha = self._write_blob_file(full, st)
+        return IndexEntry(
+            int(st.st_ctime) & 0xFFFFFFFF, st.st_ctime_ns % 1_000_000_000,
+            mtime_s & 0xFFFFFFFF, mtime_ns,
+            st.st_dev & 0xFFFFFFFF, st.st_ino & 0xFFFFFFFF, mode,
+            st.st_uid & 0xFFFFFFFF, st.st_gid & 0xFFFFFFFF, size & 0xFFFFFFFF, sha,
+        )
+
+    def _walk(self, full: Path, rel: bytes) -> Iterator[Tuple[bytes, Path, os.stat_result]]:
+        """Files and symlinks below a directory (symlinks are not followed, .git dirs are skipped)."""
+        with os.scandir(full) as it:
+            entries = list(it)
+        for entry in entries:
+            child = rel + b"/" + os.fsencode(entry.name)
+            st = entry.stat(follow_symlinks=False)
+            if stat.S_ISDIR(st.st_mode):
+                if entry.name != ".git":
+                    yield from self._walk(Path(entry.path), child)
+            elif stat.S_ISREG(st.st_mode) or stat.S_ISLNK(st.st_mode):
+                yield child, Path(entry.path), st
+
+    def _stage_path(self, entries: Dict[bytes, IndexEntry], pathspec: str, racy_before: int) -> None:
+        """`git add -A <pathspec>`: adds, updates and removes index entries at or below it."""
+        rel = os.path.normpath(pathspec)
+        if rel == ".." or rel.startswith("../") or os.path.isabs(rel):
+            raise GitError(f"git add failed: '{pathspec}' is outside repository")
+        key = b"" if rel == "." else os.fsencode(rel)
+        full = self.root / rel
+        below = (lambda p: True) if not key else (lambda p: p == key or p.startswith(key + b"/"))
+        previous = [p for p in entries if below(p)]
+
+        seen = set()
+        try:
+            st = os.lstat(full)
+        except FileNotFoundError:
+            st = None
+        if st is not None and stat.S_ISDIR(st.st_mode):
+            for child, child_full, child_st in self._walk(full, key) if key else self._walk_root():
+                seen.add(child)
+                self._put(entries, child, self._entry(child_full, child_st, entries.get(child), racy_before))
+        elif st is not None:
+            seen.add(key)
+            self._put(entries, key, self._entry(full, st, entries.get(key), racy_before))
+        elif not previous:
+            raise GitError(f"git add failed: pathspec '{pathspec}' did not match any files")
+
+        for path in previous:
+            if path not in seen:
+                entries.pop(path, None)
+
+    def _walk_root(self) -> Iterator[Tuple[bytes, Path, os.stat_result]]:
+        for child, full, st in self._walk(self.root, b""):
+            yield child[1:], full, st
+
+    @staticmethod
+    def _put(entries: Dict[bytes, IndexEntry], path: bytes, entry: IndexEntry) -> None:
+        # A file replacing a directory (or the other way round) drops the old entries
+        parts = path.split(b"/")
+        for i in range(1, len(parts)):
+            entries.pop(b"/".join(parts[:i]), None)
+        prefix = path + b"/"
+        for stale in [p for p in entries if p.startswith(prefix)]:
+            del entries[stale]
+        entries[path] = entry
+
+    def _refresh_tracked(self, entries: Dict[bytes, IndexEntry], racy_before: int) -> None:
+        """`git add -u`: updates tracked files that changed and drops the deleted ones."""
+        for path, old in list(entries.items()):
+            full = self.root / os.fsdecode(path)
+            try:
+                st = os.lstat(full)
+            except FileNotFoundError:
+                del entries[path]
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                del entries[path]
+            else:
+                entries[path] = self._entry(full, st, old, racy_before)
+
+    # --- Trees + commits ---------------------------------------------------
+
+    def _write_tree(self, items: List[Tuple[bytes, int, bytes]]) -> bytes:
+        """Writes the tree for sorted (path, mode, sha) items and returns its id."""
+        tree = []
+        i = 0
+        while i < len(items):
+            path, mode, sha = items[i]
+            head, sep, _ = path.partition(b"/")
+            if not sep:
+                tree.append((head, mode, sha))
+                i += 1
+                continue
+            prefix = head + b"/"
+            j = i
+            while j < len(items) and items[j][0].startswith(prefix):
+                j += 1
+            sub = [(p[len(prefix):], m, s) for p, m, s in items[i:j]]
+            tree.append((head, MODE_TREE, self._write_tree(sub)))
+            i = j
+        # git orders tree entries as if directory names ended with "/"
+        tree.sort(key=lambda t: t[0] + b"/" if t[1] == MODE_TREE else t[0])
+        return self._write_object("tree", b"".join(b"%o %s\0%s" % (mode, name, sha) for name, mode, sha in tree))
+
+    def _parent_tree(self, parent: Optional[str]) -> Optional[bytes]:
+        if parent is None:
+            return None
+        kind, data = self._read_object(parent)
+        if kind != "commit" or not data.startswith(b"tree "):
+            raise GitError(f"HEAD does not point to a commit ({parent})")
+        return bytes.fromhex(data[5:45].decode())
+
+    @classmethod
+    def _config_value(cls, path: Path, section: str, key: str) -> Optional[str]:
+        """Minimal git-config lookup (plain `[section]` headers, `key = value` lines)."""
+        try:
+            lines = path.read_text(encoding="utf-8").splitlines()
+        except (FileNotFoundError, UnicodeDecodeError):
+            return None
+        current = None
+        value = None
+        for line in lines:
+            line = line.strip()
+            if line.startswith("["):
+                current = line.strip("[]").strip().lower()
+            elif current == section and "=" in line:
+                name, _, raw = line.partition("=")
+                if name.strip().lower() == key:
+                    value = raw.strip().strip('"')
+        return value
+
+    def _identity(self, role: str) -> str:
+        name = os.getenv(f"GIT_{role}_NAME")
+        email = os.getenv(f"GIT_{role}_EMAIL")
+        xdg = Path(os.getenv("XDG_CONFIG_HOME") or Path.home() / ".config") / "git" / "config"
+        for config in (self.git_dir / "config", Path.home() / ".gitconfig", xdg):
+            name = name or self._config_value(config, "user", "name")
+            email = email or self._config_value(config, "user", "email")
+        user = getpass.getuser()
+        name = name or user
+        email = email or f"{user}@{socket.gethostname()}"
+
+        now = time.time()
+        offset = time.localtime(now).tm_gmtoff // 60
+        sign = "-" if offset < 0 else "+"
+        return f"{name} <{email}> {int(now)} {sign}{abs(offset) // 60:02d}{abs(offset) % 60:02d}"
+
+    @tracing.traced("git")
+    def commit(self, paths: Optional[List[str]], message: str) -> bool:
+        """
+        Stages `paths` like `git add -A` (or all tracked files like `git add -u`)
+        and commits. Returns False if the resulting tree equals HEAD's.
+        """
+        self._check_supported()
+        index_path = self.git_dir / "index"
+        lock = index_path.with_name("index.lock")
+        try:
+            fd = os.open(lock, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            raise GitError(f"{lock} exists: another git process seems to be running")
+
+        try:
+            entries = self._read_index()
+            ref, parent = self._head()
+            parent_tree = self._parent_tree(parent)
+
+            # Files modified within the index's own second are "racy": always rehash them
+            try:
+                racy_before = int(os.stat(index_path).st_mtime)
+            except FileNotFoundError:
+                racy_before = 0
+            if paths:
+                for pathspec in paths:
+                    self._stage_path(entries, pathspec, racy_before)
+            else:
+                self._refresh_tracked(entries, racy_before)
+
+            with os.fdopen(fd, "wb") as f:
+                fd = None
+                f.write(self._serialize_index(entries))
+            os.replace(lock, index_path)
+
+            tree = self._write_tree([(p, e.mode, e.sha) for p, e in sorted(entries.items())])
+            if tree == parent_tree or (parent is None and not entries):
+                return False
+
+            body = f"tree {tree.hex()}\n"
+            if parent:
+                body += f"parent {parent}\n"
+            body += f"author {self._identity('AUTHOR')}\ncommitter {self._identity('COMMITTER')}\n\n"
+            body += message if message.endswith("\n") else message + "\n"
+            commit = self._write_object("commit", body.encode("utf-8"))
+            self._update_ref(ref, commit.hex())
+            return True
+        finally:
+            if fd is not None:
+                os.close(fd)
+            if lock.exists():
+                lock.unlink()
@@ -0,0 +1,66 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+from core.hashing import hash_file, is_racy, stat_key
+from core import cache_file, tracing
+
+HASH_INDEX_VERSION = 1
+
+
+class HashIndex:
+    """
+    On-disk index of file content hashes keyed on (inode, size, mtime).
+    A file whose metadata is unchanged is not read again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._previous: Dict[str, list] = {}
+        self._current: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    @tracing.traced("diff")
+    def load(self) -> "HashIndex":
+        """Reads the index. Missing, corrupt or outdated indexes start empty."""
+        data = cache_file.load(self.path, HASH_INDEX_VERSION)
+        if data is not None:
+            self._previous = data.get("files", {})
+        return self
+
+    def digest(self, path: Path, st: Optional[os.stat_result] = None) -> str:
+        """SHA-256 of a file, served from the index when its metadata is unchanged."""
+        st = st or os.stat(path)
+        key = stat_key(st)
+        name = str(path)
+        cached = self._previous.get(name)
+        if cached is not None and cached[:3] == key:
+            with self._lock:
+                self.hits += 1
+                self._current[name] = cached
+            return cached[3]
+
+        digest = hash_file(path)
+        with self._lock:
+            self.misses += 1
+            # Recently modified files are hashed but not indexed
+            if not is_racy(st.st_mtime_ns):
+                self._current[name] = key + [digest]
+                self._dirty = True
+        return digest
+
+    @tracing.traced("diff")
+    def save(self, prune: bool = False) -> None:
+        """
+        Atomically writes the index if anything was hashed. With `prune`, only
+        the files looked up in this run are kept (use it after a full check).
+        """
+        with self._lock:
+            if not self._dirty and not (prune and len(self._current) != len(self._previous)):
+                return
+            files = dict(self._current) if prune else {**self._previous, **self._current}
+            self._dirty = False
+        cache_file.save(self.path, HASH_INDEX_VERSION, {"files": files})
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import shutil
+import stat
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Tuple
+from core.exceptions import FileOperationError
+from core.hashing import CHUNK_SIZE
+from core import tracing
+from services.copy_engine import CopyEngine
+
+JOURNAL_VERSION = 1
+
+
+@dataclass
+class ImportProgress:
+    files_done: int
+    files_total: int
+    bytes_done: int
+    bytes_total: int
+    current: str
+
+
+class ImportPipeline:
+    """
+    Streams a file or directory into the repo, verifying every file before the
+    import is allowed to continue to the link step:
+
+    1. Each file is copied in fixed-size chunks while the source is hashed on
+       the fly (or reflinked, then hashed); the copy is then read back once and
+       its hash compared. No file is read twice on the same side.
+    2. Everything is written to a hidden staging path next to the destination
+       and only renamed into place once the whole tree has been verified.
+    3. Verified files are journaled, so an interrupted import resumes where it
+       stopped. Entries are walked in sorted order and the journal is consumed
+       in lockstep, which keeps memory bounded regardless of the tree size.
+    """
+
+    def __init__(self, engine: Optional[CopyEngine] = None, progress: Optional[Callable[[ImportProgress], None]] = None):
+        self.engine = engine or CopyEngine()
+        self.progress = progress
+
+    @staticmethod
+    def staging_path(dest: Path) -> Path:
+        return dest.parent / f".{dest.name}.importing"
+
+    @staticmethod
+    def journal_path(dest: Path) -> Path:
+        return dest.parent / f".{dest.name}.import-journal"
+
+    @tracing.traced("import")
+    def stage(self, src: Path, dest: Path) -> Path:
+        """Copies and verifies `src` into the staging path of `dest`. Returns the staging path."""
+        staging = self.staging_path(dest)
+        journal_path = self.journal_path(dest)
+        header = {"version": JOURNAL_VERSION, "source": str(src)}
+
+        resume = self._open_journal(journal_path, header)
+        if resume is None and (staging.exists() or staging.is_symlink()):
+            # Leftovers from an import of something else: start over
+            self._remove(staging)
+
+        files_total, bytes_total = self._totals(src)
+        done = ImportProgress(0, files_total, 0, bytes_total, "")
+
+        try:
+            with open(journal_path, "a" if resume else "w", encoding="utf-8") as journal:
+                if resume is None:
+                    journal.write(json.dumps(header) + "\n")
+                for kind, rel, src_path in self._walk(src):
+                    target = staging / rel if rel else staging
+                    if kind == "dir":
+                        target.mkdir(exist_ok=True)
+                    elif kind == "dir_done":
+                        shutil.copystat(src_path, target)
+                    elif kind == "link":
+                        if target.is_symlink() or target.exists():
+                            target.unlink()
+                        os.symlink(os.readlink(src_path), target)
+                    else:
+                        st = os.stat(src_path)
+                        done.current = rel or src.name
+                        position = resume.tell() if resume is not None else None
+                        if resume is not None and self._already_done(resume, rel, st, target):
+                            done.bytes_done += st.st_size
+                        else:
+                            if resume is not None:
+                                # Journal diverged: drop its tail, everything from here is copied again
+                                resume.close()
+                                resume = None
+                                journal.flush()
+                                os.ftruncate(journal.fileno(), position)
+                            digest = self._copy_verified(src_path, target, done)
+                            journal.write(json.dumps({"rel": rel, "size": st.st_size, "mtime": st.st_mtime_ns, "sha256": digest}) + "\n")
+                            journal.flush()
+                        done.files_done += 1
+                        self._report(done)
+        finally:
+            if resume is not None:
+                resume.close()
+        return staging
+
+    @tracing.traced("import")
+    def commit(self, staging: Path, dest: Path) -> None:
+        """Moves a verified staging copy into place and drops the journal."""
+        try:
+            os.replace(staging, dest)
+        except OSError as e:
+            raise FileOperationError(f"Could not move verified import into place: {e}")
+        self.journal_path(dest).unlink(missing_ok=True)
+
+    # --- Walk --------------------------------------------------------------
+
+    def _walk(self, src: Path) -> Iterator[Tuple[str, str, str]]:
+        """Yields ("file" | "link" | "dir" | "dir_done", relpath, source path) in sorted order."""
+        st = os.lstat(src)
+        if stat.S_ISLNK(st.st_mode):
+            yield "link", "", str(src)
+        elif stat.S_ISDIR(st.st_mode):
+            yield from self._walk_dir(str(src), "")
+        else:
+            yield "file", "", str(src)
+
+    def _walk_dir(self, path: str, rel: str) -> Iterator[Tuple[str, str, str]]:
+        yield "dir", rel, path
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        for entry in entries:
+            child = os.path.join(rel, entry.name) if rel else entry.name
+            if entry.is_symlink():
+                yield "link", child, entry.path
+            elif entry.is_dir():
+                yield from self._walk_dir(entry.path, child)
+            elif entry.is_file():
+                yield "file", child, entry.path
+        yield "dir_done", rel, path
+
+    def _totals(self, src: Path) -> Tuple[int, int]:
+        files = size = 0
+        for kind, _, path in self._walk(src):
+            if kind == "file":
+                files += 1
+                size += os.stat(path).st_size
+        return files, size
+
+    # --- Copy + verify -----------------------------------------------------
+
+    def _copy_verified(self, src: str, dst: Path, done: ImportProgress) -> str:
+        """Copies one file and checks the copy's hash against the source's. Returns the hash."""
+        if self.engine.clone(src, dst):
+            # Copy-on-write clone: no data flowed through us, hash both sides once
+            src_digest = self._hash(src)
+            done.bytes_done += os.stat(src).st_size
+        else:
+            src_digest = self._stream_copy(src, dst, done)
+
+        if self._hash(dst, drop_cache=True) != src_digest:
+            raise FileOperationError(f"Verification failed for {src}: copy does not match the original")
+        shutil.copystat(src, dst)
+        return src_digest
+
+    def _stream_copy(self, src: str, dst: Path, done: ImportProgress) -> str:
+        digest = hashlib.sha256()
+        copied = 0
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            for chunk in iter(lambda: fsrc.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                fdst.write(chunk)
+                copied += len(chunk)
+                done.bytes_done += len(chunk)
+                self._report(done)
+            fdst.flush()
+            os.fsync(fdst.fileno())
+        self.engine.report.record("stream", copied, copied)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _hash(path, drop_cache: bool = False) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            if drop_cache and hasattr(os, "posix_fadvise"):
+                # Read the copy back from disk rather than from the page cache we just filled
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    # --- Journal -----------------------------------------------------------
+
+    @staticmethod
+    def _open_journal(path: Path, header: dict):
+        """Opens an existing journal for the same source, positioned after its header."""
+        try:
+            f = open(path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        try:
+            if json.loads(f.readline() or "null") == header:
+                return f
+        except ValueError:
+            pass
+        f.close()
+        return None
+
+    @staticmethod
+    def _already_done(journal, rel: str, st: os.stat_result, target: Path) -> bool:
+        line = journal.readline()
+        try:
+            entry = json.loads(line) if line else None
+        except ValueError:
+            return False
+        return (
+            entry is not None
+            and entry["rel"] == rel
+            and entry["size"] == st.st_size
+            and entry["mtime"] == st.st_mtime_ns
+            and target.is_file()
+            and target.stat().st_size == st.st_size
+        )
+
+    def _report(self, done: ImportProgress) -> None:
+        if self.progress:
+            self.progress(done)
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        if path.is_symlink() or not path.is_dir():
+            path.unlink()
+        else:
+            shutil.rmtree(path)
@@ -0,0 +1,157 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote
+from core.models import Dotfile
+from core.exceptions import ConfigError
+
+# (source, target, options) as stored in a profile log
+Entry = Tuple[str, str, dict]
+
+# A profile file is rewritten once its log holds this many more lines than live entries
+COMPACT_SLACK = 64
+
+
+class ProfileStore:
+    """
+    Config backend that keeps one JSON-lines log per profile
+    (<repo>/.dotfile-pro/profiles/<profile>.jsonl).
+
+    Each line is a compact record: ["+", source, target] adds an entry and
+    ["-", source, target] removes it. Adds of entries with options carry them
+    as a fourth element: ["+", source, target, {"template": true, "deploy": "copy"}]. Reading a profile only touches its own
+    file, and changes are appended instead of rewriting the whole config.
+    """
+
+    SUFFIX = ".jsonl"
+
+    def __init__(self, root: Path):
+        self.root = root
+        # profile -> (log lines, live entries) as seen by the last load/append
+        self._stats: Dict[str, Tuple[int, int]] = {}
+
+    def exists(self) -> bool:
+        return self.root.is_dir()
+
+    def _file(self, profile: str) -> Path:
+        return self.root / f"{quote(profile, safe='')}{self.SUFFIX}"
+
+    def profiles(self) -> List[str]:
+        if not self.exists():
+            return []
+        return sorted(unquote(p.name[:-len(self.SUFFIX)]) for p in self.root.iterdir() if p.name.endswith(self.SUFFIX))
+
+    def load(self, profile: Optional[str] = None) -> List[Dotfile]:
+        """Entries of one profile, or of every profile when `profile` is None."""
+        names = self.profiles() if profile is None else [profile]
+        dotfiles: List[Dotfile] = []
+        for name in names:
+            dotfiles.extend(
+                Dotfile(
+                    source=Path(source), target=Path(target), profile=name,
+                    template=bool(options.get("template")), deploy=options.get("deploy", "link"),
+                )
+                for source, target, options in self._replay(name)
+            )
+        return dotfiles
+
+    @staticmethod
+    def _options(dotfile: Dotfile) -> dict:
+        options = {}
+        if dotfile.template:
+            options["template"] = True
+        if dotfile.deploy != "link":
+            options["deploy"] = dotfile.deploy
+        return options
+
+    @staticmethod
+    def _record(op: str, source: str, target: str, options: dict) -> str:
+        fields = [op, source, target, options] if options else [op, source, target]
+        return json.dumps(fields, separators=(",", ":")) + "\n"
+
+    def _replay(self, profile: str) -> List[Entry]:
+        path = self._file(profile)
+        live: Dict[Tuple[str, str], dict] = {}
+        lines = 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        op, source, target, *options = json.loads(line)
+                    except ValueError:
+                        # A torn trailing line from an interrupted append
+                        continue
+                    if op == "+":
+                        # Re-adding an entry replaces its options
+                        live[(source, target)] = options[0] if options else {}
+                    elif op == "-":
+                        live.pop((source, target), None)
+        except FileNotFoundError:
+            return []
+        except OSError as e:
+            raise ConfigError(f"Failed to load profile '{profile}': {e}")
+        self._stats[profile] = (lines, len(live))
+        return [(source, target, options) for (source, target), options in live.items()]
+
+    def append(self, changes: Iterable[Tuple[str, Dotfile]]) -> None:
+        """Appends ("+" | "-", dotfile) records to the logs of the affected profiles."""
+        grouped: Dict[str, List[str]] = {}
+        for op, df in changes:
+            grouped.setdefault(df.profile, []).append(
+                self._record(op, str(df.source), str(df.target), self._options(df) if op == "+" else {})
+            )
+
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            for profile, records in grouped.items():
+                with open(self._file(profile), "a", encoding="utf-8") as f:
+                    f.write("".join(records))
+                    f.flush()
+                    os.fsync(f.fileno())
+        except OSError as e:
+            raise ConfigError(f"Failed to append to profile store: {e}")
+
+        for profile, records in grouped.items():
+            # Each removal leaves two dead lines (the add and the tombstone)
+            stats = self._stats.pop(profile, None)
+            removals = sum(1 for record in records if record.startswith('["-"'))
+            if stats and (stats[0] - stats[1]) + 2 * removals > COMPACT_SLACK:
+                self.compact(profile)
+
+    def compact(self, profile: str) -> None:
+        """Rewrites a profile log with only its live entries, if it holds too many dead lines."""
+        entries = self._replay(profile)
+        lines, live = self._stats.get(profile, (0, 0))
+        if lines - live > COMPACT_SLACK:
+            self._write(profile, entries)
+
+    def save(self, dotfiles: List[Dotfile]) -> None:
+        """Full rewrite: one compacted log per profile; profiles no longer present are removed."""
+        grouped: Dict[str, List[Entry]] = {}
+        for df in dotfiles:
+            grouped.setdefault(df.profile, []).append((str(df.source), str(df.target), self._options(df)))
+
+        for profile in set(self.profiles()) - set(grouped):
+            self._file(profile).unlink()
+            self._stats.pop(profile, None)
+        for profile, entries in grouped.items():
+            self._write(profile, entries)
+
+    def _write(self, profile: str, entries: List[Entry]) -> None:
+        # Atomic write: Write to temp file then rename
+        tmp_path = None
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", delete=False, dir=self.root, encoding="utf-8") as tmp:
+                for source, target, options in entries:
+                    tmp.write(self._record("+", source, target, options))
+                tmp_path = Path(tmp.name)
+            os.replace(tmp_path, self._file(profile))
+            self._stats[profile] = (len(entries), len(entries))
+        except Exception as e:
+            if tmp_path is not None and tmp_path.exists():
+                os.unlink(tmp_path)
+            raise ConfigError(f"Failed to save profile '{profile}' atomically: {e}")
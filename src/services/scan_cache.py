@@ -0,0 +1,134 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+from core import cache_file, tracing
+from core.hashing import is_racy
+
+SCAN_CACHE_VERSION = 1
+
+_IS_DIR, _IS_FILE, _IS_SYMLINK = 1, 2, 4
+
+
+class ScanEntry(NamedTuple):
+    name: str
+    path: str
+    is_dir: bool
+    is_file: bool
+    is_symlink: bool
+
+    @property
+    def flags(self) -> int:
+        return (_IS_DIR if self.is_dir else 0) | (_IS_FILE if self.is_file else 0) | (_IS_SYMLINK if self.is_symlink else 0)
+
+
+def read_dir(path: str) -> List[ScanEntry]:
+    """Lists a directory with os.scandir. Unreadable directories yield no entries."""
+    entries = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                try:
+                    is_file = entry.is_file()
+                except OSError:
+                    is_file = False
+                entries.append(ScanEntry(entry.name, entry.path, is_dir, is_file, entry.is_symlink()))
+    except OSError:
+        pass
+    return entries
+
+
+class ScanCache:
+    """
+    On-disk index of directory listings keyed on directory mtimes.
+    A directory whose mtime is unchanged is served from the index instead of
+    being listed again; only directories that changed are re-read.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._previous: Dict[str, dict] = {}
+        self._current: Dict[str, dict] = {}
+        self._config: Optional[dict] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @tracing.traced("scan")
+    def load(self) -> None:
+        """Reads the index. Missing, corrupt or outdated indexes start empty."""
+        self._previous, self._current, self._config = {}, {}, None
+        self.hits = self.misses = 0
+        data = cache_file.load(self.path, SCAN_CACHE_VERSION)
+        if data is None:
+            return
+        self._previous = data.get("dirs", {})
+        self._config = data.get("config")
+
+    def list_dir(self, path: str) -> List[ScanEntry]:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return []
+
+        cached = self._previous.get(path)
+        if cached is not None and cached["mtime"] == mtime:
+            with self._lock:
+                self.hits += 1
+                self._current[path] = cached
+            return [
+                ScanEntry(name, os.path.join(path, name), bool(flags & _IS_DIR), bool(flags & _IS_FILE), bool(flags & _IS_SYMLINK))
+                for name, flags in cached["entries"]
+            ]
+
+        entries = read_dir(path)
+        with self._lock:
+            self.misses += 1
+            # A directory modified this recently is listed but not cached
+            if not is_racy(mtime):
+                self._current[path] = {"mtime": mtime, "entries": [[e.name, e.flags] for e in entries]}
+        return entries
+
+    def config_targets(self, config_path: Path) -> Optional[List[str]]:
+        """Returns the cached target list if the config file is unchanged."""
+        fingerprint = self._fingerprint(config_path)
+        if self._config and fingerprint and self._config.get("fingerprint") == fingerprint:
+            return self._config["targets"]
+        return None
+
+    def store_config_targets(self, config_path: Path, targets: List[str]) -> None:
+        fingerprint = self._fingerprint(config_path)
+        self._config = {"fingerprint": fingerprint, "targets": targets} if fingerprint else None
+
+    @staticmethod
+    def _fingerprint(config_path: Path) -> Optional[List]:
+        try:
+            st = os.stat(config_path)
+        except OSError:
+            return None
+        return [str(config_path), st.st_mtime_ns, st.st_size]
+
+    @tracing.traced("scan")
+    def save(self, partial: bool = False) -> None:
+        """
+        Atomically writes the listings visited during this scan (stale ones are
+        dropped). After an interrupted scan (`partial`), listings it did not reach
+        are kept; they are still checked against the directory mtime on use.
+        """
+        with self._lock:
+            # Workers of an interrupted scan may still be adding listings
+            dirs = {**self._previous, **self._current} if partial else dict(self._current)
+        cache_file.save(self.path, SCAN_CACHE_VERSION, {"dirs": dirs, "config": self._config})
+
+    def clear(self) -> bool:
+        """Deletes the on-disk index. Returns True if one existed."""
+        self._previous, self._current, self._config = {}, {}, None
+        try:
+            self.path.unlink()
+            return True
+        except FileNotFoundError:
+            return False
@@ -0,0 +1,197 @@
+import fnmatch
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional
+try:
+    from importlib.resources import files
+except ImportError:
+    from importlib_resources import files # Backport for older python
+
+from core.exceptions import ConfigError
+from core.paths import context
+
+_GLOB_CHARS = set("*?[")
+
+
+def _glob(pattern: str) -> str:
+    """Regex for a glob, to be used with re.match (anchored at the start)."""
+    if pattern.endswith("*") and not pattern.endswith("[*"):
+        # "x*" only needs a prefix match: no ".*\Z" scan to the end of the name
+        return fnmatch.translate(pattern.rstrip("*"))[:-2] if pattern.rstrip("*") else ""
+    return fnmatch.translate(pattern)
+
+
+def _trie(words: Iterable[str]) -> str:
+    """Literal names as one prefix-factored regex: ["ab", "ac"] -> a(?:b\\Z|c\\Z)."""
+    tree: dict = {}
+    for word in words:
+        node = tree
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        branches = [re.escape(char) + emit(child) if char else r"\Z" for char, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return emit(tree) if tree else ""
+
+
+def _alternatives(patterns: Iterable[str]) -> List[str]:
+    """Globs translated one by one; plain names merged into a single trie."""
+    patterns = list(patterns)
+    literals = [p for p in patterns if not _GLOB_CHARS & set(p)]
+    regexes = [_glob(p) for p in patterns if _GLOB_CHARS & set(p)]
+    if literals:
+        regexes.append(_trie(literals))
+    return regexes
+
+
+# Names without a suffix (as Path.suffix computes it): no dot, only a leading
+# dot (".bashrc") or a trailing dot
+_NO_SUFFIX = r"\.?[^.]*\Z|(?s:.*\.)\Z"
+
+
+class NameMatcher:
+    """
+    A file rule: a name is accepted if it has one of `extensions` or matches
+    an `include` glob, and matches no `exclude` glob. All of it is compiled into
+    a single regex, so checking a name is one call into the regex engine.
+    """
+
+    def __init__(self, extensions: Iterable[str] = (), include: Iterable[str] = (), exclude: Iterable[str] = ()):
+        extensions, include, exclude = list(extensions), list(include), list(exclude)
+        named = sorted({e for e in extensions if e})
+        accept = _alternatives(include)
+        if named:
+            # One alternation for all suffixes instead of one branch per extension
+            accept.append("(?s:.+\\.(?:" + "|".join(re.escape(e[1:]) for e in named) + r"))\Z")
+        if "" in extensions:
+            accept.append(_NO_SUFFIX)
+        reject = "|".join(_alternatives(exclude))
+        pattern = ("(?!" + reject + ")" if reject else "") + "(?:" + ("|".join(accept) or "(?!)") + ")"
+        self.pattern = re.compile(pattern)
+        self.match = self.pattern.match
+
+    def __call__(self, name: str) -> bool:
+        return self.match(name) is not None
+
+    def filter(self, names: Iterable[str]) -> List[str]:
+        match = self.match
+        return [name for name in names if match(name)]
+
+
+@dataclass(frozen=True)
+class ScanRoot:
+    path: str  # Relative to the home directory
+    max_depth: int
+    label: str  # Prefix of the candidate names, e.g. "Config: nvim/init.lua"
+    files: Optional[NameMatcher] = None  # None: the global "files" rule
+
+
+class ScanRules:
+    """
+    Declarative scanner rules (see core/scan_rules.json), compiled once:
+    pruned directories, the file rule for scan roots and for the home
+    directory itself, and the roots to walk with their maximum depth.
+
+    A repo can override them in .dotfile-pro/scan_rules.json. Lists there
+    extend the defaults; an entry starting with "!" removes a default entry
+    instead. Roots are merged by path (max_depth 0 disables one), and
+    "inherit": false ignores the defaults altogether.
+    """
+
+    def __init__(self, data: dict):
+        try:
+            exclude_dirs = list(data.get("exclude_dirs", []))
+            # Plain names are a set lookup; globs and "a/b" paths go into a regex
+            self.exclude_names = frozenset(p for p in exclude_dirs if "/" not in p and not _GLOB_CHARS & set(p))
+            name_globs = [_glob(p) for p in exclude_dirs if "/" not in p and _GLOB_CHARS & set(p)]
+            path_globs = [fnmatch.translate(p.strip("/")) for p in exclude_dirs if "/" in p]
+            self._exclude_name = re.compile("|".join(name_globs)).match if name_globs else None
+            self._exclude_path = re.compile("|".join(path_globs)).match if path_globs else None
+
+            self.files = self._matcher(data.get("files", {}))
+            self.home = self._matcher(data.get("home", {}))
+            self.roots = [
+                ScanRoot(
+                    root["path"].strip("/"), int(root.get("max_depth", 1)), root.get("label") or root["path"],
+                    self._matcher(root["files"]) if "files" in root else None,
+                )
+                for root in data.get("roots", [])
+                if int(root.get("max_depth", 1)) > 0
+            ]
+        except (TypeError, KeyError, ValueError, AttributeError, re.error) as e:
+            raise ConfigError(f"Invalid scan rules: {e!r}")
+
+    @staticmethod
+    def _matcher(rule: dict) -> NameMatcher:
+        return NameMatcher(rule.get("extensions", ()), rule.get("include", ()), rule.get("exclude", ()))
+
+    def prune_dir(self, name: str, rel_path: str) -> bool:
+        """True if the directory `name` (at `rel_path` under home) must not be walked."""
+        if name in self.exclude_names:
+            return True
+        if self._exclude_name is not None and self._exclude_name(name):
+            return True
+        return self._exclude_path is not None and self._exclude_path(rel_path) is not None
+
+    @classmethod
+    def defaults(cls) -> dict:
+        """The packaged rules (loaded through importlib so it works from a ZipApp)."""
+        return json.loads(files("core").joinpath("scan_rules.json").read_text(encoding="utf-8"))
+
+    @classmethod
+    def override_path(cls) -> Path:
+        return context.repo_root / ".dotfile-pro" / "scan_rules.json"
+
+    @classmethod
+    def load(cls, override: Optional[Path] = None) -> "ScanRules":
+        """Packaged rules merged with the repo's override file, if it exists."""
+        path = override or cls.override_path()
+        data = cls.defaults()
+        try:
+            user = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return cls(data)
+        except (OSError, ValueError) as e:
+            raise ConfigError(f"Invalid scan rules in {path}: {e}")
+        if not isinstance(user, dict):
+            raise ConfigError(f"Invalid scan rules in {path}: expected an object")
+        try:
+            data = merge_rules(data, user)
+        except (TypeError, KeyError, AttributeError) as e:
+            raise ConfigError(f"Invalid scan rules in {path}: {e!r}")
+        return cls(data)
+
+
+def _merge_list(base: list, extra: list) -> list:
+    removed = {e[1:] for e in extra if isinstance(e, str) and e.startswith("!")}
+    merged = [e for e in base if e not in removed]
+    merged.extend(e for e in extra if e not in merged and not (isinstance(e, str) and e.startswith("!")))
+    return merged
+
+
+def merge_rules(base: dict, user: dict) -> dict:
+    """Applies a user override to the default rules (see ScanRules)."""
+    if user.get("inherit", True) is False:
+        return user
+    merged = dict(base)
+    for key, value in user.items():
+        if key == "roots":
+            roots = {root["path"]: dict(root) for root in base.get("roots", [])}
+            for root in value:
+                roots.setdefault(root["path"], {}).update(root)
+            merged["roots"] = list(roots.values())
+        elif isinstance(value, list):
+            merged[key] = _merge_list(base.get(key, []), value)
+        elif isinstance(value, dict):
+            rule = dict(base.get(key, {}))
+            for name, entries in value.items():
+                rule[name] = _merge_list(rule.get(name, []), entries) if isinstance(entries, list) else entries
+            merged[key] = rule
+        else:
+            merged[key] = value
+    return merged
@@ -1,33 +1,101 @@
 import json
 import os
+import queue
 import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from functools import partial
 from pathlib import Path
-from typing import List, Tuple, Dict, Set
+from typing import Callable, Iterable, Iterator, List, Tuple, Dict, Set, Optional, Union
 try:
     from importlib.resources import files
 except ImportError:
     from importlib_resources import files # Backport for older python
 
-from services.config_service import ConfigService
+from core import tracing
+from services.config_service import ConfigService, DotfileRegistry
+from services.scan_cache import ScanCache, ScanEntry, read_dir
+from services.scan_rules import ScanRoot, ScanRules
+
+# (nombre amigable, ruta, ruta canónica); la canónica como str, que ocupa mucho menos que un Path
+Candidate = Tuple[str, Path, str]
+
+# Marca de fin de una unidad de trabajo en su cola
+_DONE = object()
+
+
+class _Deadline(Exception):
+    pass
+
+
+class _Workers:
+    """
+    Pool de hilos daemon para las unidades del escaneo. A diferencia de
+    ThreadPoolExecutor, cuyos hilos se esperan al salir del intérprete, un
+    hilo bloqueado en un directorio colgado (NFS...) no retrasa la salida.
+    """
+
+    def __init__(self, count: int):
+        self.count = count
+        self._tasks: queue.SimpleQueue = queue.SimpleQueue()
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, fn: Callable, *args) -> None:
+        if len(self._threads) < self.count:
+            thread = threading.Thread(target=self._work, name="scan-worker", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._tasks.put((fn, args))
+
+    def _work(self) -> None:
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            fn, args = task
+            fn(*args)
+
+    def shutdown(self, wait: bool) -> None:
+        """Descarta las unidades pendientes y, con `wait`, espera a las que están en curso."""
+        while True:
+            try:
+                self._tasks.get_nowait()
+            except queue.Empty:
+                break
+        for _ in self._threads:
+            self._tasks.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
 
 class SystemScanner:
-    # Carpetas a ignorar completamente para evitar ruido y lentitud
-    EXCLUDE_DIRS = {
-        "node_modules", ".git", ".svn", "__pycache__", ".venv", "venv", "env",
-        ".cache", ".local", ".npm", ".cargo", ".gnupg", ".mozilla", ".chrome",
-        "Downloads", "Music", "Pictures", "Videos", "Documents", "Android",
-        ".gemini", ".termux/boot" # Ignorar boot scripts, solo configs
-    }
-
-    # Extensiones de configuración válidas para el escaneo heurístico
-    CONFIG_EXTENSIONS = {
-        ".conf", ".ini", ".toml", ".yaml", ".yml", ".json", ".lua", ".cfg", ".rc", ""
-    }
-
-    def __init__(self, config_service: ConfigService):
+    # Qué se escanea (carpetas ignoradas, filtros de archivos, raíces y profundidad)
+    # se define en core/scan_rules.json y se puede ajustar por repo (ver ScanRules).
+
+    # Candidatos que una unidad puede adelantar antes de bloquearse esperando al consumidor
+    QUEUE_SIZE = 256
+
+    def __init__(
+        self,
+        config_service: ConfigService,
+        max_workers: Optional[int] = None,
+        cache: Optional[ScanCache] = None,
+        registry: Optional[DotfileRegistry] = None,
+        rules: Optional[ScanRules] = None,
+    ):
         self.config_service = config_service
+        self.rules = rules or ScanRules.load()
+        self.registry = registry
+        self.max_workers = max_workers
+        self.cache = cache
         self.known_paths = self._load_known_apps()
         self.home = Path.home()
+        # True si el último iter_scan se cortó por límite, tiempo o cierre del consumidor
+        self.truncated = False
+        self._stop = threading.Event()
 
     def _load_known_apps(self) -> Dict[str, str]:
         """Carga rutas conocidas desde el JSON usando importlib para compatibilidad con ZipApps."""
@@ -40,129 +108,280 @@ class SystemScanner:
             return {}
 
     def scan(self) -> List[Tuple[str, Path]]:
+        """Escaneo completo, ordenado por nombre (ver iter_scan)."""
+        return sorted(self.iter_scan(), key=lambda x: x[0])
+
+    def iter_scan(self, limit: Optional[int] = None, timeout: Optional[float] = None) -> Iterator[Tuple[str, Path]]:
         """
-        Escaneo híbrido: Conocidos + Heurístico.
+        Escaneo híbrido (Conocidos + Heurístico) en streaming: cada candidato se
+        produce en cuanto se encuentra, sin esperar al recorrido completo.
+
+        Cada raíz se reparte en unidades de trabajo (archivos de primer nivel y un
+        subárbol por subcarpeta) que se recorren en paralelo con os.scandir. Cada
+        unidad entrega sus resultados por una cola acotada y se consumen en el orden
+        de prioridad original, por lo que la deduplicación da exactamente los mismos
+        candidatos que un recorrido secuencial. Solo hay unas pocas unidades en curso
+        por delante del consumidor, así que la memoria no crece con el tamaño del home.
+
+        `limit` corta tras ese número de candidatos y `timeout` (segundos) tras ese
+        tiempo; en ambos casos (o si el consumidor deja de iterar) `truncated` es True.
         """
-        candidates: List[Tuple[str, Path]] = []
-        seen_paths: Set[Path] = set()
+        self.truncated = False
+        # Evento propio de este escaneo: unidades rezagadas de uno anterior siguen viendo el suyo
+        self._stop = threading.Event()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        seen_paths: Set[str] = set()
+        count = 0
+        completed = False
+
+        if self.cache:
+            self.cache.load()
 
         # 1. Obtener archivos ya gestionados
-        managed_paths = set()
-        for df in self.config_service.load_config():
-            try:
-                managed_paths.add(df.expanded_target.resolve())
-            except OSError:
-                continue
+        managed_paths = self._managed_paths()
 
-        # 2. Escaneo de Apps Conocidas (Alta prioridad)
-        for app_name, rel_path in self.known_paths.items():
-            try:
-                full_path = self.home / rel_path
-                if not self._is_valid_candidate(full_path):
-                    continue
-                
-                resolved = full_path.resolve()
-                if resolved not in managed_paths and resolved not in seen_paths:
-                    candidates.append((app_name, full_path))
+        pool = _Workers(self.max_workers or min(32, (os.cpu_count() or 1) + 4))
+        try:
+            for unit in self._units(pool, deadline):
+                for name, path, resolved in unit:
+                    if resolved in managed_paths or resolved in seen_paths:
+                        continue
                     seen_paths.add(resolved)
-            except (OSError, PermissionError):
-                continue
+                    yield name, path
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return
+            completed = True
+        except _Deadline:
+            pass
+        finally:
+            self.truncated = not completed
+            # Las unidades en curso ven la señal y terminan; las pendientes no llegan a empezar.
+            # Si se cortó no se espera: un directorio colgado (NFS...) no debe retrasar la salida.
+            self._stop.set()
+            pool.shutdown(wait=completed)
+            if self.cache:
+                # Un escaneo interrumpido conserva del índice lo que no llegó a visitar
+                self.cache.save(partial=not completed)
 
-        # 3. Escaneo Heurístico en ~/.config (Profundidad 2)
-        # Busca ~/.config/app/config.toml
-        config_dir = self.home / ".config"
-        if config_dir.exists():
-            candidates.extend(
-                self._scan_directory(
-                    config_dir, 
-                    managed_paths, 
-                    seen_paths, 
-                    max_depth=2, 
-                    prefix="Config"
-                )
-            )
+    def _plan(self) -> Iterator[Union[Callable[[], Iterable[Candidate]], Future]]:
+        """
+        Unidades de trabajo en orden de prioridad, todas ejecutadas en el pool. Un
+        Future marca que las unidades siguientes dependen de un listado aún en curso.
+        """
+        # 2. Apps Conocidas (Alta prioridad)
+        yield self._scan_known
 
-        # 4. Escaneo Heurístico en ~/.termux (Específico Termux)
-        termux_dir = self.home / ".termux"
-        if termux_dir.exists():
-             candidates.extend(
-                self._scan_directory(
-                    termux_dir, 
-                    managed_paths, 
-                    seen_paths, 
-                    max_depth=1, 
-                    prefix="Termux"
-                )
-            )
+        # 3-4. Escaneo Heurístico en las raíces de las reglas (~/.config, ~/.termux...)
+        for root in self.rules.roots:
+            yield from self._tree_units(root)
 
         # 5. Escaneo Heurístico en ~ (Solo archivos ocultos, Profundidad 0)
-        # Busca .editorconfig, .mytorc, etc.
-        candidates.extend(self._scan_root(managed_paths, seen_paths))
+        yield self._scan_root
 
-        return sorted(candidates, key=lambda x: x[0])
+    def _units(self, pool: _Workers, deadline: Optional[float]) -> Iterator[Iterable[Candidate]]:
+        """Lanza las unidades con una ventana deslizante y las entrega en orden."""
+        window: deque = deque()
+        plan = self._plan()
+        waiting: Optional[Future] = None
+
+        def fill() -> None:
+            nonlocal waiting
+            while len(window) < 2 * pool.count:
+                if waiting is not None:
+                    if not waiting.done():
+                        if window:
+                            # Se reintenta tras la siguiente unidad: bloquear aquí con unidades
+                            # lanzadas y colas llenas podría dejar al listado sin hilo libre
+                            return
+                        try:
+                            waiting.result(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+                        except FutureTimeout:
+                            raise _Deadline()
+                    waiting = None
+                work = next(plan, None)
+                if work is None:
+                    return
+                if isinstance(work, Future):
+                    waiting = work
+                    continue
+                results: queue.Queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+                pool.submit(self._run_unit, work, results, self._stop)
+                window.append(self._drain(results, deadline))
+
+        fill()
+        while window:
+            unit = window.popleft()
+            fill()
+            yield unit
+
+    @classmethod
+    def _run_unit(cls, work: Callable[[], Iterable[Candidate]], results: queue.Queue, stop: threading.Event) -> None:
+        try:
+            with tracing.span("scan unit", "scan"):
+                for item in work():
+                    if not cls._put(results, item, stop):
+                        return
+        except Exception as e:
+            cls._put(results, e, stop)
+            return
+        cls._put(results, _DONE, stop)
+
+    @staticmethod
+    def _put(results: queue.Queue, item, stop: threading.Event) -> bool:
+        """Encola esperando al consumidor; devuelve False si el escaneo se detuvo."""
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _drain(results: queue.Queue, deadline: Optional[float]) -> Iterator[Candidate]:
+        while True:
+            try:
+                item = results.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise _Deadline()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+            if deadline is not None and time.monotonic() >= deadline:
+                raise _Deadline()
+
+    @tracing.traced("scan")
+    def _managed_paths(self) -> Set[str]:
+        """Rutas canónicas de los destinos gestionados (la lista de destinos se toma del índice si el config no cambió)."""
+        if self.registry is not None:
+            targets = [str(df.target) for df in self.registry]
+        else:
+            targets = self.cache.config_targets(self.config_service.config_path) if self._cache_config else None
+        if targets is None:
+            targets = [str(df.target) for df in self.config_service.load_config()]
+            if self._cache_config:
+                self.cache.store_config_targets(self.config_service.config_path, targets)
+
+        managed = set()
+        for target in targets:
+            try:
+                managed.add(str(Path(target).expanduser().resolve()))
+            except OSError:
+                continue
+        return managed
+
+    @property
+    def _cache_config(self) -> bool:
+        # The index fingerprints dotfiles.json; the append-only profile store is not covered
+        return self.cache is not None and not self.config_service.append_only
 
     def _is_valid_candidate(self, path: Path) -> bool:
         """Verifica si el archivo existe y no es un enlace roto."""
         return path.exists() or path.is_symlink()
 
-    def _scan_directory(self, root: Path, managed: Set[Path], seen: Set[Path], max_depth: int, prefix: str) -> List[Tuple[str, Path]]:
-        found = []
-        root_depth = len(root.parts)
-
-        for dirpath, dirnames, filenames in os.walk(root):
-            path_obj = Path(dirpath)
-            current_depth = len(path_obj.parts) - root_depth
-            
-            # Control de profundidad y exclusiones
-            if current_depth >= max_depth:
-                dirnames[:] = [] # Stop recursion
+    @staticmethod
+    def _resolve_entry(entry: ScanEntry, real_parent: str) -> str:
+        """Ruta canónica de una entrada; solo se llama a realpath si es un enlace simbólico."""
+        if entry.is_symlink:
+            return os.path.realpath(entry.path)
+        return os.path.join(real_parent, entry.name)
+
+    def _list_dir(self, path: str) -> List[ScanEntry]:
+        """Listado de una carpeta, servido desde el índice si su mtime no cambió."""
+        if self.cache:
+            return self.cache.list_dir(path)
+        return read_dir(path)
+
+    def _split_entries(self, entries: List[ScanEntry], rel_dir: str) -> Tuple[List[ScanEntry], List[ScanEntry]]:
+        """Separa carpetas recorribles y archivos con la misma semántica que os.walk (rel_dir: relativa a ~)."""
+        dirs, files = [], []
+        prune = self.rules.prune_dir
+        for entry in entries:
+            if not entry.is_dir:
+                files.append(entry)
+            elif not entry.is_symlink and not prune(entry.name, os.path.join(rel_dir, entry.name)):
+                dirs.append(entry)
+        return dirs, files
+
+    def _collect_files(self, files: List[ScanEntry], rel_dir: str, real_dir: str, root: ScanRoot) -> Iterator[Candidate]:
+        # Un solo regex precompilado filtra el listado completo
+        accept = (root.files or self.rules.files).match
+        for entry in files:
+            if not accept(entry.name):
                 continue
+            try:
+                resolved = self._resolve_entry(entry, real_dir)
+            except (OSError, PermissionError):
+                continue
+            # Nombre amigable: "Config: nvim/init.lua"
+            rel_name = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+            yield f"{root.label}: {rel_name}", Path(entry.path), resolved
 
-            # Eliminar carpetas ignoradas in-place
-            dirnames[:] = [d for d in dirnames if d not in self.EXCLUDE_DIRS]
+    def _tree_units(self, root: ScanRoot) -> Iterator[Union[Callable[[], Iterable[Candidate]], Future]]:
+        """
+        Una unidad lista el primer nivel de la raíz (en el pool, para que el plazo
+        la acote) y publica sus subcarpetas; cada una pasa a ser una unidad independiente.
+        """
+        if root.max_depth <= 0:
+            return
+        listing: Future = Future()
+        yield partial(self._root_files, root, listing)
+        yield listing
 
-            for file in filenames:
-                file_path = path_obj / file
-                
-                # Filtrar por extensión
-                if file_path.suffix not in self.CONFIG_EXTENSIONS and not file.startswith("."):
-                    continue
-                
-                # Ignorar archivos temporales comunes
-                if file.endswith("~") or file.endswith(".bak") or file.endswith(".swp"):
+        real_root, dirs = listing.result()
+        for entry in dirs:
+            yield partial(self._walk_tree, entry.path, entry.name, os.path.join(real_root, entry.name), 1, root, self._stop)
+
+    def _root_files(self, root: ScanRoot, listing: Future) -> Iterator[Candidate]:
+        """Archivos del primer nivel de una raíz; sus subcarpetas se publican en `listing`."""
+        real_root, dirs, files = "", [], []
+        try:
+            path = self.home / root.path
+            if path.exists():
+                real_root = os.path.realpath(path)
+                dirs, files = self._split_entries(self._list_dir(str(path)), root.path)
+        finally:
+            # Siempre se publica algo: el plan espera este listado para seguir
+            listing.set_result((real_root, dirs))
+        yield from self._collect_files(files, "", real_root, root)
+
+    def _walk_tree(self, path: str, rel_dir: str, real_dir: str, depth: int, root: ScanRoot, stop: threading.Event) -> Iterator[Candidate]:
+        """Recorrido descendente (top-down) equivalente a os.walk sobre un subárbol."""
+        # Control de profundidad (y parada si el consumidor ya no quiere más)
+        if depth >= root.max_depth or stop.is_set():
+            return
+
+        dirs, files = self._split_entries(self._list_dir(path), os.path.join(root.path, rel_dir))
+        yield from self._collect_files(files, rel_dir, real_dir, root)
+        for entry in dirs:
+            yield from self._walk_tree(
+                entry.path, os.path.join(rel_dir, entry.name),
+                os.path.join(real_dir, entry.name), depth + 1, root, stop
+            )
+
+    def _scan_known(self) -> Iterator[Candidate]:
+        for app_name, rel_path in self.known_paths.items():
+            try:
+                full_path = self.home / rel_path
+                if not self._is_valid_candidate(full_path):
                     continue
+                resolved = str(full_path.resolve())
+            except (OSError, PermissionError):
+                continue
+            yield app_name, full_path, resolved
 
+    def _scan_root(self) -> Iterator[Candidate]:
+        real_home = os.path.realpath(self.home)
+        accept = self.rules.home.match
+        for entry in self._list_dir(str(self.home)):
+            name = entry.name
+            # Solo archivos; la regla "home" filtra ocultos, extensiones y nombres conocidos
+            if entry.is_file and accept(name):
                 try:
-                    resolved = file_path.resolve()
-                    if resolved not in managed and resolved not in seen:
-                        # Nombre amigable: "Config: nvim/init.lua"
-                        rel_name = file_path.relative_to(root)
-                        name = f"{prefix}: {rel_name}"
-                        found.append((name, file_path))
-                        seen.add(resolved)
-                except (OSError, PermissionError):
+                    resolved = self._resolve_entry(entry, real_home)
+                except Exception:
                     continue
-        return found
-
-    def _scan_root(self, managed: Set[Path], seen: Set[Path]) -> List[Tuple[str, Path]]:
-        found = []
-        try:
-            for item in self.home.iterdir():
-                # Solo archivos, solo ocultos (dotfiles)
-                if item.is_file() and item.name.startswith("."):
-                    # Exclusiones específicas de raíz
-                    if item.name in [".bash_history", ".zsh_history", ".lesshst", ".viminfo", ".DS_Store"]:
-                        continue
-                        
-                    # Filtrar extensiones o nombres conocidos
-                    if item.suffix in self.CONFIG_EXTENSIONS or "rc" in item.name or "config" in item.name or "profile" in item.name:
-                        try:
-                            resolved = item.resolve()
-                            if resolved not in managed and resolved not in seen:
-                                found.append((f"Root: {item.name}", item))
-                                seen.add(resolved)
-                        except Exception:
-                            continue
-        except PermissionError:
-            pass
-        return found
\ No newline at end of file
+                yield f"Root: {name}", self.home / name, resolved
@@ -0,0 +1,86 @@
+import re
+from bisect import bisect_right
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Characters after which a match counts as starting a "word" (ranked higher)
+_WORD_BREAKS = " \t/._-:~"
+
+
+class SearchIndex:
+    """
+    Fuzzy (subsequence) search over a fixed list of entries. Every entry's
+    searchable text is lowercased and joined into one blob once, so a query is
+    a single regex scan in C over the blob instead of a Python loop per entry.
+    """
+
+    def __init__(self, haystacks: Sequence[str]):
+        lines = [h.lower().replace("\n", " ") for h in haystacks]
+        self._blob = "\n".join(lines)
+        self._starts: List[int] = []
+        offset = 0
+        for line in lines:
+            self._starts.append(offset)
+            offset += len(line) + 1
+        self._ends = [start + len(line) for start, line in zip(self._starts, lines)]
+        self._cache: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    @staticmethod
+    def _pattern(token: str) -> "re.Pattern":
+        # "nvi" -> ^[^n\n]*(n[^v\n]*v[^i\n]*i)[^\n]* : the leftmost "n", then the first
+        # "v" after it, and so on. Greedy runs over negated classes never backtrack into
+        # a different subsequence, and the trailing run consumes the rest of the entry,
+        # so each entry yields at most one match and non-matching ones stay in C.
+        def until(c: str) -> str:
+            return "[^" + re.escape(c) + "\\n]*"
+
+        fuzzy = re.escape(token[0]) + "".join(until(c) + re.escape(c) for c in token[1:])
+        return re.compile("^" + until(token[0]) + "(" + fuzzy + ")[^\\n]*", re.MULTILINE)
+
+    def _scan(self, token: str, candidates: Optional[List[int]] = None) -> Dict[int, Tuple[int, int]]:
+        """entry index -> (match span, 0 if the match starts a word else 1)."""
+        found: Dict[int, Tuple[int, int]] = {}
+        starts, blob = self._starts, self._blob
+        pattern = self._pattern(token)
+        if candidates is None:
+            matches = ((bisect_right(starts, m.start()) - 1, m) for m in pattern.finditer(blob))
+        else:
+            # Narrowed search: only re-check the entries the previous query matched
+            matches = ((i, pattern.match(blob, starts[i], self._ends[i])) for i in candidates)
+        for entry, m in matches:
+            if m is None:
+                continue
+            start, end = m.span(1)
+            found[entry] = (end - start, 0 if start == starts[entry] or blob[start - 1] in _WORD_BREAKS else 1)
+        return found
+
+    def search(self, query: str) -> List[int]:
+        """Indices of matching entries, best first. Every whitespace-separated token must match."""
+        key = " ".join(query.lower().split())
+        if not key:
+            return list(range(len(self._starts)))
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Typing extends the query, and a longer query can only match a subset of a shorter one
+        candidates = None
+        for previous in (key[:i] for i in range(len(key) - 1, 0, -1)):
+            if previous in self._cache:
+                candidates = self._cache[previous]
+                break
+
+        scores: Dict[int, Tuple[int, int]] = {}
+        for n, token in enumerate(key.split(" ")):
+            found = self._scan(token, candidates if n == 0 else list(scores))
+            if n == 0:
+                scores = found
+            else:
+                scores = {i: (s[0] + found[i][0], s[1] + found[i][1]) for i, s in scores.items() if i in found}
+        result = sorted(scores, key=lambda i: (scores[i], i))
+        if len(self._cache) > 256:
+            self._cache.clear()
+        self._cache[key] = result
+        return result
@@ -0,0 +1,195 @@
+import getpass
+import json
+import os
+import platform
+import re
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+from core.models import Dotfile
+from core.paths import context
+from core.exceptions import ConfigError, TemplateError
+from core.hashing import hash_bytes, stable_stat_key, stat_key
+from core import cache_file, tracing
+
+RENDER_CACHE_VERSION = 1
+
+# {{ name }} or {{ env.NAME }}
+_VARIABLE = re.compile(r"\{\{\s*([A-Za-z_][\w.]*)\s*\}\}")
+
+
+@dataclass
+class RenderStep:
+    """Outcome of rendering one template entry."""
+    dotfile: Dotfile
+    output: Path
+    rendered: bool = False  # False: the output was already up to date
+    error: Optional[str] = None
+
+
+class TemplateRenderer:
+    """
+    Renders template entries ({{ host }}, {{ env.TOKEN }}, variables from
+    .dotfile-pro/vars.json...) into the per-host build directory, which is
+    what their symlinks point at.
+
+    A render cache in the host cache directory keys every output on the
+    template hash plus the values of the variables it uses. Templates whose
+    key and output are unchanged are skipped without being read, so a run
+    where nothing changed writes nothing.
+    """
+
+    def __init__(self, variables: Dict[str, str], build_dir: Path, cache_path: Path):
+        self.variables = variables
+        self.build_dir = build_dir
+        self.cache_path = cache_path
+        self._entries: Dict[str, dict] = {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls) -> "TemplateRenderer":
+        renderer = cls(cls.host_variables(), context.build_dir, context.cache_dir / "render-cache.json")
+        renderer._load_cache()
+        return renderer
+
+    @staticmethod
+    def vars_path() -> Path:
+        return context.repo_root / ".dotfile-pro" / "vars.json"
+
+    @classmethod
+    def host_variables(cls) -> Dict[str, str]:
+        """
+        Built-in variables (host, user, home, os) overridden by vars.json:
+        its "*" section applies to every host, a section named after the
+        host only to that host.
+        """
+        host = platform.node() or "localhost"
+        variables = {"host": host, "user": getpass.getuser(), "home": str(Path.home()), "os": platform.system().lower()}
+        path = cls.vars_path()
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return variables
+        except (OSError, ValueError) as e:
+            raise ConfigError(f"Invalid template variables in {path}: {e}")
+        if not isinstance(data, dict):
+            raise ConfigError(f"Invalid template variables in {path}: expected an object")
+        for section in ("*", host):
+            variables.update({name: str(value) for name, value in data.get(section, {}).items()})
+        return variables
+
+    def output_path(self, dotfile: Dotfile) -> Path:
+        return self.build_dir / dotfile.source
+
+    def _lookup(self, name: str, dotfile: Dotfile) -> str:
+        if name.startswith("env."):
+            value = os.environ.get(name[4:])
+        elif name == "profile":
+            value = dotfile.profile
+        else:
+            value = self.variables.get(name)
+        if value is None:
+            raise TemplateError(f"Undefined variable '{name}' in {dotfile.source}")
+        return value
+
+    @tracing.traced("template")
+    def render(self, dotfiles: List[Dotfile], dry_run: bool = False) -> List[RenderStep]:
+        """
+        Brings the outputs of the template entries up to date. With `dry_run`
+        nothing is written; `rendered` tells which outputs would change.
+        """
+        steps = [self._render_one(df, dry_run) for df in dotfiles if df.template]
+        if self._dirty and not dry_run:
+            self._save_cache()
+        return steps
+
+    def _render_one(self, dotfile: Dotfile, dry_run: bool) -> RenderStep:
+        output = self.output_path(dotfile)
+        step = RenderStep(dotfile, output)
+        template = context.repo_root / dotfile.source
+        cached = self._entries.get(str(dotfile.source), {})
+        try:
+            st = os.stat(template)
+            data: Optional[bytes] = None
+            if cached.get("stat") == stat_key(st):
+                # Same inode, size and mtime: the template hash and its variables are known
+                digest, names = cached["hash"], cached["names"]
+            else:
+                with open(template, "rb") as f:
+                    data = f.read()
+                digest, names = hash_bytes(data), sorted(set(_VARIABLE.findall(data.decode("utf-8"))))
+            values = [(name, self._lookup(name, dotfile)) for name in names]
+            key = hash_bytes(json.dumps([digest, values]).encode("utf-8"))
+            if cached.get("key") == key and cached.get("output") is not None and cached["output"] == self._output_stat(output):
+                return step
+
+            if data is None:
+                with open(template, "rb") as f:
+                    data = f.read()
+            text = self.substitute(data.decode("utf-8"), dict(values))
+            rendered = text.encode("utf-8")
+            step.rendered = self._differs(output, rendered)
+            if dry_run:
+                return step
+            if step.rendered:
+                self._write(output, rendered, st.st_mode)
+        except (OSError, UnicodeDecodeError, TemplateError) as e:
+            step.error = str(e)
+            return step
+
+        entry = {"stat": stable_stat_key(st), "hash": digest, "names": names, "key": key, "output": self._output_stat(output)}
+        # Racy files keep their entry unchanged (stats of None): no cache write for them
+        if entry != cached:
+            self._entries[str(dotfile.source)] = entry
+            self._dirty = True
+        return step
+
+    @staticmethod
+    def substitute(text: str, values: Dict[str, str]) -> str:
+        return _VARIABLE.sub(lambda m: values[m.group(1)], text)
+
+    @staticmethod
+    def _output_stat(path: Path) -> Optional[List[int]]:
+        try:
+            return stable_stat_key(os.stat(path))
+        except OSError:
+            return None
+
+    @staticmethod
+    def _differs(path: Path, data: bytes) -> bool:
+        try:
+            with open(path, "rb") as f:
+                return f.read() != data
+        except OSError:
+            return True
+
+    def _write(self, path: Path, data: bytes, mode: int) -> None:
+        if not self.build_dir.is_dir():
+            self.build_dir.mkdir(parents=True)
+            # Rendered files can hold host secrets (env variables): never commit them
+            ignore = self.build_dir.parent / ".gitignore"
+            if not ignore.exists():
+                ignore.write_text("*\n", encoding="utf-8")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile("wb", delete=False, dir=path.parent) as tmp:
+                tmp.write(data)
+                tmp_path = Path(tmp.name)
+            os.chmod(tmp_path, mode & 0o777)
+            os.replace(tmp_path, path)
+        except OSError:
+            if tmp_path is not None and tmp_path.exists():
+                os.unlink(tmp_path)
+            raise
+
+    def _load_cache(self) -> None:
+        """Missing, corrupt, outdated or other-build-dir caches start empty."""
+        data = cache_file.load(self.cache_path, RENDER_CACHE_VERSION)
+        if data is not None and data.get("build_dir") == str(self.build_dir):
+            self._entries = data.get("entries", {})
+
+    def _save_cache(self) -> None:
+        cache_file.save(self.cache_path, RENDER_CACHE_VERSION, {"build_dir": str(self.build_dir), "entries": self._entries})
+        self._dirty = False
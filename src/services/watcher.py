@@ -0,0 +1,317 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from core.models import Dotfile, LinkAction, LinkStep
+from core.paths import context
+from core import tracing
+from services.config_service import ConfigService, DotfileRegistry
+from services.file_service import FileService
+from core.hashing import is_racy
+
+# (watched directory, entry name); name "" means "anything below the directory"
+Event = Tuple[Path, str]
+
+# <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_CLOSE_WRITE | IN_MODIFY
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class InotifyBackend:
+    """Directory watches through the kernel's inotify API (ctypes, no dependencies)."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, Path] = {}
+
+    @staticmethod
+    def available() -> bool:
+        try:
+            name = ctypes.util.find_library("c")
+            return name is not None and hasattr(ctypes.CDLL(name), "inotify_init1")
+        except OSError:
+            return False
+
+    def watch(self, directory: Path, contents: bool = False) -> None:
+        # Adding an existing watch again just returns its descriptor
+        wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd >= 0:
+            self._dirs[wd] = directory
+
+    def sync(self, directories: Iterable[Path]) -> None:
+        """Nothing to do: the kernel reports our own changes like any other."""
+
+    def wait(self, timeout: Optional[float]) -> List[Event]:
+        """Blocks (without polling) until events arrive or `timeout` seconds pass."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events: List[Event] = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: everything has to be rechecked
+                events.extend((d, "") for d in self._dirs.values())
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._dirs[wd]
+            events.append((directory, "" if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED) else name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """
+    Fallback for systems without inotify. Each round costs one stat per watched
+    directory; a directory is only listed again when its mtime changed or is too
+    recent to be trusted (or, with `contents`, re-stats its entries to catch
+    in-place writes such as log appends).
+    """
+
+    def __init__(self, interval: float = 2.0):
+        self.interval = interval
+        self._dirs: Dict[Path, Tuple[Optional[int], Dict[str, tuple], bool]] = {}
+
+    def watch(self, directory: Path, contents: bool = False) -> None:
+        if directory not in self._dirs:
+            self._dirs[directory] = (self._mtime(directory), self._listing(directory, contents), contents)
+
+    def sync(self, directories: Iterable[Path]) -> None:
+        """
+        Re-snapshots directories we just modified ourselves. Otherwise a later change
+        that undoes ours (e.g. the new link being deleted) nets out against the old
+        snapshot and is never reported.
+        """
+        for directory in directories:
+            if directory in self._dirs:
+                contents = self._dirs[directory][2]
+                self._dirs[directory] = (self._mtime(directory), self._listing(directory, contents), contents)
+
+    @staticmethod
+    def _mtime(directory: Path) -> Optional[int]:
+        try:
+            return os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+
+    @staticmethod
+    def _listing(directory: Path, contents: bool) -> Dict[str, tuple]:
+        try:
+            with os.scandir(directory) as it:
+                if not contents:
+                    # Type from d_type (no stat): a freed inode may be reused by the replacement
+                    return {e.name: (e.inode(), e.is_symlink(), e.is_dir(follow_symlinks=False)) for e in it}
+                listing = {}
+                for e in it:
+                    st = e.stat(follow_symlinks=False)
+                    listing[e.name] = (st.st_ino, st.st_size, st.st_mtime_ns)
+                return listing
+        except OSError:
+            return {}
+
+    def wait(self, timeout: Optional[float]) -> List[Event]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            events = self._poll()
+            if events:
+                return events
+            remaining = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            if remaining <= 0:
+                return []
+            time.sleep(remaining)
+
+    def _poll(self) -> List[Event]:
+        events: List[Event] = []
+        for directory, (mtime, listing, contents) in list(self._dirs.items()):
+            current = self._mtime(directory)
+            if current is None:
+                del self._dirs[directory]
+                events.append((directory, ""))
+                continue
+            if current == mtime and not contents and not is_racy(current):
+                continue
+            new_listing = self._listing(directory, contents)
+            changed = {n for n in listing.keys() | new_listing.keys() if listing.get(n) != new_listing.get(n)}
+            self._dirs[directory] = (current, new_listing, contents)
+            events.extend((directory, name) for name in sorted(changed))
+        return events
+
+    def close(self) -> None:
+        self._dirs.clear()
+
+
+class LinkWatcher:
+    """
+    Keeps the links of a profile in place. The config is loaded once and kept in
+    memory; the target and source directories are watched, and every debounced
+    batch of events re-plans and re-applies only the entries it touched (the same
+    plan/apply logic as create_symlink). Changes to the config itself reload it.
+    """
+
+    def __init__(
+        self,
+        config_service: ConfigService,
+        profile: str = "all",
+        force: bool = False,
+        debounce: float = 0.3,
+        backend=None,
+        on_repair: Optional[Callable[[List[LinkStep]], None]] = None,
+    ):
+        self.config_service = config_service
+        self.profile = profile
+        self.force = force
+        self.debounce = debounce
+        self.backend = backend or (InotifyBackend() if InotifyBackend.available() else PollingBackend())
+        self.on_repair = on_repair
+        self.dotfiles: List[Dotfile] = []
+        # Watched directory -> entries whose target or source lives below it
+        self._index: Dict[Path, List[Tuple[str, Dotfile]]] = {}
+        self._config_dirs: Set[Path] = set()
+
+    # --- Config + watches --------------------------------------------------
+
+    def reload(self) -> List[LinkStep]:
+        """(Re)loads the config, re-registers watches and repairs every entry."""
+        self.dotfiles = DotfileRegistry(self.config_service).load(self.profile).all()
+        self._config_dirs = {self.config_service.config_path.parent, self.config_service.store.root}
+        for directory in self._config_dirs:
+            if directory.is_dir():
+                self.backend.watch(directory, contents=True)
+        self._rewatch()
+        return self.repair(self.dotfiles)
+
+    def _rewatch(self) -> None:
+        """Indexes every entry under the closest existing directory of its target and source."""
+        Dotfile.refresh_all(self.dotfiles)
+        Dotfile.resolve_all(self.dotfiles)
+        self._index.clear()
+        for dotfile in self.dotfiles:
+            for path in (dotfile.expanded_target, self._source_path(dotfile)):
+                directory = self._nearest_dir(path.parent)
+                first = os.path.relpath(path, directory).split(os.sep, 1)[0]
+                self._index.setdefault(directory, []).append((first, dotfile))
+        for directory in self._index:
+            self.backend.watch(directory)
+
+    @staticmethod
+    def _source_path(dotfile: Dotfile) -> Path:
+        base = context.build_dir if dotfile.template else context.repo_root
+        return Path(os.path.normpath(base / dotfile.source))
+
+    @staticmethod
+    def _nearest_dir(path: Path) -> Path:
+        """The path itself if it is a directory, else its closest existing ancestor."""
+        while not path.is_dir() and path != path.parent:
+            path = path.parent
+        return path
+
+    def _is_config_event(self, directory: Path, name: str) -> bool:
+        store_root = self.config_service.store.root
+        if directory == store_root:
+            return True
+        if directory == self.config_service.config_path.parent:
+            # dotfiles.json itself, or the directory that holds the profile store
+            return name in ("", self.config_service.config_path.name, store_root.relative_to(directory).parts[0])
+        return False
+
+    # --- Events ------------------------------------------------------------
+
+    def affected(self, events: Iterable[Event]) -> List[Dotfile]:
+        """Entries touched by a batch of events, in config order."""
+        hit = self._hits(events)
+        return [df for df in self.dotfiles if id(df) in hit]
+
+    def _hits(self, events: Iterable[Event]) -> Set[int]:
+        hit: Set[int] = set()
+        for directory, name in events:
+            for first, dotfile in self._index.get(directory, ()):
+                if not name or first == name:
+                    hit.add(id(dotfile))
+        return hit
+
+    @tracing.traced("link")
+    def repair(self, dotfiles: List[Dotfile]) -> List[LinkStep]:
+        """Re-plans the given entries and applies the steps that change something."""
+        if not dotfiles:
+            return []
+        plan = FileService.plan_links(dotfiles, self.force)
+        results = FileService.apply_link_plan([s for s in plan if s.action != LinkAction.SKIP])
+        self.backend.sync({s.target.parent for s in results if s.action in (LinkAction.CREATE, LinkAction.BACKUP, LinkAction.UPDATE)})
+        if results and self.on_repair:
+            self.on_repair(results)
+        return results
+
+    def step(self, timeout: Optional[float] = None) -> List[LinkStep]:
+        """
+        Waits for one burst of events (up to `timeout`, forever if None), lets it
+        settle for `debounce` seconds, then handles it. Returns the applied steps.
+        """
+        events = self.backend.wait(timeout)
+        if not events:
+            return []
+        # A steady stream of events must not postpone the repair forever
+        settle_until = time.monotonic() + max(1.0, 10 * self.debounce)
+        while time.monotonic() < settle_until:
+            more = self.backend.wait(self.debounce)
+            if not more:
+                break
+            events.extend(more)
+
+        if any(self._is_config_event(d, n) for d, n in events):
+            return self.reload()
+        # New or vanished directories change which directory is the closest watchable one
+        if any(not name or not directory.is_dir() or (directory / name).is_dir() for directory, name in events):
+            hit = self._hits(events)
+            self._rewatch()
+            hit |= self._hits(events)
+            return self.repair([df for df in self.dotfiles if id(df) in hit])
+        return self.repair(self.affected(events))
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        """Repairs everything once, then handles events until `stop` is set."""
+        self.reload()
+        try:
+            while stop is None or not stop.is_set():
+                # With a stop event, wake up periodically to notice it; otherwise block
+                self.step(1.0 if stop is not None else None)
+        finally:
+            self.backend.close()
@@ -0,0 +1,16 @@
+import pytest
+from core.paths import context
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """Points the global context at an empty repo inside tmp_path."""
+    root = (tmp_path / "repo").resolve()
+    root.mkdir()
+    monkeypatch.setattr(context, "repo_root", root)
+    monkeypatch.setattr(context, "config_path", root / "dotfiles.json")
+    monkeypatch.setattr(context, "backup_dir", root / ".backups")
+    monkeypatch.setattr(context, "profiles_dir", root / ".dotfile-pro" / "profiles")
+    monkeypatch.setattr(context, "cache_dir", tmp_path / "cache")
+    monkeypatch.setattr(context, "build_dir", root / ".build" / "test-host")
+    return root
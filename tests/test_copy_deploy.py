@@ -0,0 +1,134 @@
+import os
+
+import pytest
+
+from core.models import Dotfile, LinkAction, LinkStatus
+from services import copy_deploy
+from services.copy_engine import CopyReport
+from services.file_service import FileService
+
+
+@pytest.fixture
+def entry(repo, tmp_path, monkeypatch):
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+    (repo / "app").mkdir()
+    for name in ("a.conf", "b.conf"):
+        (repo / "app" / name).write_text(name)
+    return Dotfile("app", "~/.config/app", deploy="copy")
+
+
+def deploy(dotfile, force=False):
+    report = CopyReport()
+    results = FileService.apply_link_plan(FileService.plan_links([dotfile], force), report=report)
+    return results[0], report
+
+
+def test_copy_deploy_only_transfers_changed_files(entry, repo, tmp_path):
+    target = tmp_path / "home" / ".config" / "app"
+    step, report = deploy(entry)
+    assert step.action == LinkAction.CREATE and report.files == 2
+    assert not target.is_symlink() and (target / "a.conf").read_text() == "a.conf"
+
+    step, report = deploy(entry)
+    assert step.action == LinkAction.SKIP and report.files == 0
+
+    (repo / "app" / "b.conf").write_text("new b")
+    step, report = deploy(entry)
+    assert step.action == LinkAction.UPDATE and report.files == 1
+    assert (target / "b.conf").read_text() == "new b"
+
+
+def test_copy_status_reports_drift_from_the_manifest(entry, repo, tmp_path, monkeypatch):
+    target = tmp_path / "home" / ".config" / "app"
+    deploy(entry)
+    assert copy_deploy.DeployManifest.load().files(target, repo / "app")["a.conf"]["target"] is None  # Racy: not trusted yet
+
+    # Back-date the files so they are outside the racy window; the next run records their stat
+    for base in (repo / "app", target):
+        for name in ("a.conf", "b.conf"):
+            os.utime(base / name, ns=(1_000_000_000, 1_000_000_000))
+    step, _ = deploy(entry)
+    assert step.action == LinkAction.SKIP and not step.error
+
+    # Unchanged files are not hashed again
+    def no_hashing(path):
+        raise AssertionError(f"{path} was hashed")
+
+    hash_file = copy_deploy.hash_file
+    monkeypatch.setattr(copy_deploy, "hash_file", no_hashing)
+    assert FileService.check_status(entry) == LinkStatus.COPIED
+    monkeypatch.setattr(copy_deploy, "hash_file", hash_file)
+
+    os.utime(target / "a.conf", ns=(2_000_000_000, 2_000_000_000))  # Touched, same content
+    assert FileService.check_status(entry) == LinkStatus.COPIED
+    (repo / "app" / "a.conf").write_text("repo edit")
+    assert FileService.check_status(entry) == LinkStatus.OUTDATED
+    (target / "b.conf").write_text("host edit")
+    assert FileService.check_status(entry) == LinkStatus.MODIFIED
+
+    step, _ = deploy(entry)
+    assert step.action == LinkAction.CONFLICT and "b.conf" in step.detail
+    step, _ = deploy(entry, force=True)
+    assert step.action == LinkAction.BACKUP and not step.error
+    assert (target / "b.conf").read_text() == "b.conf"
+    assert FileService.check_status(entry) == LinkStatus.COPIED
+
+
+def test_failed_manifest_refresh_is_reported_on_its_step(entry, tmp_path, monkeypatch):
+    deploy(entry)
+    os.utime(tmp_path / "home" / ".config" / "app" / "a.conf", ns=(1_000_000_000, 1_000_000_000))
+    (step,) = FileService.plan_links([entry])
+    assert step.action == LinkAction.SKIP and step.copy.dirty
+
+    def failing_apply(self, source, target, plan):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(copy_deploy.CopyDeployer, "apply", failing_apply)
+    (result,) = FileService.apply_link_plan([step])
+    assert result.error == "disk full"
+
+
+def test_link_copy_is_recorded_on_the_entries(entry, tmp_path):
+    from dataclasses import replace
+    from interface.cli import link
+    from services.config_service import ConfigService
+
+    service = ConfigService()
+    service.save_config([replace(entry, deploy="link")])
+    link(profile="all", force=False, dry_run=True, copy=True, workers=2)
+    assert [df.deploy for df in service.load_config()] == ["link"]
+
+    link(profile="all", force=False, dry_run=False, copy=True, workers=2)
+    assert [df.deploy for df in service.load_config()] == ["copy"]
+    assert not (tmp_path / "home" / ".config" / "app").is_symlink()
+
+    # A plain link keeps the copies instead of reporting them as conflicts
+    (step,) = FileService.plan_links(service.load_config())
+    assert step.action == LinkAction.SKIP
+
+
+def test_status_after_a_fresh_deploy_stops_hashing(entry, repo, tmp_path, monkeypatch):
+    import json
+    import time
+    from core import hashing
+
+    monkeypatch.setattr(hashing, "RACY_WINDOW_NS", 100_000_000)
+    deploy(entry)
+    time.sleep(0.2)  # Past the racy window
+
+    # The deploy could not trust the stats of the files it had just written: the
+    # first status verifies them by hashing and records them
+    assert FileService.check_status(entry) == LinkStatus.COPIED
+    manifest = json.loads((copy_deploy.context.cache_dir / "deploy-manifest.json").read_text())
+    files = next(iter(manifest["entries"].values()))["files"]
+    assert all(record["source"] and record["target"] for record in files.values())
+
+    def no_hashing(path):
+        raise AssertionError(f"{path} was hashed")
+
+    monkeypatch.setattr(copy_deploy, "hash_file", no_hashing)
+    for _ in range(3):
+        assert FileService.check_status(entry) == LinkStatus.COPIED
+        assert FileService.collect_status([entry])[0].status == LinkStatus.COPIED
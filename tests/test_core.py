@@ -1,3 +1,4 @@
+import os
 import pytest
 from pathlib import Path
 from core.models import Dotfile
@@ -26,3 +27,255 @@ def test_atomic_config_save(tmp_path):
     loaded = service.load_config()
     assert len(loaded) == 1
     assert str(loaded[0].source) == "a"
+
+def test_link_plan_and_apply(repo, tmp_path):
+    from core.models import LinkAction
+
+    (repo / "zsh").mkdir()
+    (repo / "zsh" / ".zshrc").write_text("repo")
+    (repo / "git").mkdir()
+    (repo / "git" / ".gitconfig").write_text("repo")
+    home = tmp_path / "home"
+    home.mkdir()
+    (home / ".gitconfig").write_text("local")
+
+    dots = [
+        Dotfile("zsh/.zshrc", home / ".zshrc"),
+        Dotfile("git/.gitconfig", home / ".gitconfig"),
+        Dotfile("missing", home / ".missing"),
+    ]
+    plan = FileService.plan_links(dots)
+    assert [s.action for s in plan] == [LinkAction.CREATE, LinkAction.CONFLICT, LinkAction.BROKEN]
+    assert not (home / ".zshrc").exists()  # planning never touches the disk
+
+    FileService.apply_link_plan(FileService.plan_links(dots, force=True))
+    assert (home / ".zshrc").resolve() == repo / "zsh" / ".zshrc"
+    assert (home / ".gitconfig").resolve() == repo / "git" / ".gitconfig"
+    from services.backup_store import BackupStore
+    assert [r.path for r in BackupStore(repo / ".backups").records()] == [home / ".gitconfig"]
+
+    # Re-running with --force on linked targets must not touch the repo sources
+    plan = FileService.plan_links(dots, force=True)
+    assert [s.action for s in plan[:2]] == [LinkAction.SKIP, LinkAction.SKIP]
+    FileService.apply_link_plan(plan)
+    assert (repo / "zsh" / ".zshrc").read_text() == "repo"
+
+def test_registry_batches_changes(tmp_path):
+    from services.config_service import DotfileRegistry
+
+    service = ConfigService()
+    service.config_path = tmp_path / "dotfiles.json"
+    registry = DotfileRegistry(service).load()
+
+    assert registry.add(Dotfile("a", "~/.a"))
+    assert registry.add(Dotfile("b", "~/.b", profile="work"))
+    assert not registry.add(Dotfile("a", "~/.a"))  # duplicate (source, target)
+    assert not service.config_path.exists()  # nothing written before commit
+
+    assert registry.commit()
+    assert not registry.commit()  # clean registry does not rewrite the file
+
+    reloaded = DotfileRegistry(service).load()
+    assert len(reloaded) == 2
+    assert [d.source for d in reloaded.select("work")] == [Path("b")]
+    assert reloaded.find_by_target(Path("~/.a")) == [Dotfile("a", "~/.a")]
+
+    assert reloaded.update(Dotfile("a", "~/.a", deploy="copy"))
+    assert not reloaded.update(Dotfile("c", "~/.c", deploy="copy"))  # not registered
+    assert reloaded.find_by_target(Path("~/.a")) == [Dotfile("a", "~/.a", deploy="copy")]
+
+    assert reloaded.remove(Dotfile("b", "~/.b", profile="work"))
+    assert reloaded.select("work") == [] and reloaded.profiles() == ["default"]
+    assert reloaded.commit()
+    assert DotfileRegistry(service).load().all() == [Dotfile("a", "~/.a", deploy="copy")]
+
+def test_profile_store_appends_and_loads_lazily(repo):
+    from services.config_service import DotfileRegistry
+
+    service = ConfigService()
+    service.save_json(service.config_path, [Dotfile("a", "~/.a"), Dotfile("w", "~/.w", profile="work")])
+    assert service.import_json(service.config_path) == 2
+    assert service.append_only
+    # The ignored dotfiles.json is moved aside
+    assert not service.config_path.exists() and service.retired_path.exists()
+    assert service.store.profiles() == ["default", "work"]
+
+    work = DotfileRegistry(service).load("work")
+    assert [d.source for d in work] == [Path("w")]
+    work.add(Dotfile("w2", "~/.w2", profile="work"))
+    work.remove(Dotfile("w", "~/.w", profile="work"))
+    work.commit()
+
+    # Changes are appended to the profile log; other profiles are untouched
+    log = (repo / ".dotfile-pro" / "profiles" / "work.jsonl").read_text().splitlines()
+    assert log[-2:] == ['["+","w2","~/.w2"]', '["-","w","~/.w"]']
+    assert [str(d.source) for d in service.load_config()] == ["a", "w2"]
+
+    out = repo / "export.json"
+    assert service.export_json(out) == 2
+    assert [d.profile for d in service.load_json(out)] == ["default", "work"]
+
+def test_dotfile_is_slotted_and_resolves_targets_once(tmp_path, monkeypatch):
+    import dataclasses
+    from core import models
+
+    calls = []
+    real_resolve = models._resolve
+    monkeypatch.setattr(models, "_resolve", lambda p: calls.append(p) or real_resolve(p))
+
+    dots = [Dotfile(f"s{i}", tmp_path / ("a" if i % 2 else "b") / f"t{i}") for i in range(100)]
+    assert not hasattr(dots[0], "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        dots[0].profile = "other"
+
+    Dotfile.resolve_all(dots)
+    assert len(calls) == 2  # one per distinct parent directory
+    assert dots[1].expanded_target == tmp_path.resolve() / "a" / "t1"
+    assert len(calls) == 2  # cached
+
+    dots[1].refresh()
+    dots[1].expanded_target
+    assert len(calls) == 3
+    assert dots[1] == Dotfile("s1", tmp_path / "a" / "t1")  # cache is not part of equality
+
+def test_collect_status_returns_enums(repo, tmp_path):
+    from core.models import LinkStatus
+
+    (repo / "a").write_text("a")
+    (repo / "b").write_text("b")
+    home = tmp_path / "home"
+    home.mkdir()
+    (home / ".a").symlink_to(repo / "a")
+    (home / ".b").write_text("local")
+    (home / ".wrong").symlink_to(home / ".b")
+
+    dots = [
+        Dotfile("a", home / ".a"),
+        Dotfile("b", home / ".b"),
+        Dotfile("b", home / ".wrong"),
+        Dotfile("b", home / ".absent"),
+        Dotfile("missing", home / ".a"),
+    ]
+    assert [r.status for r in FileService.collect_status(dots)] == [
+        LinkStatus.ACTIVE,
+        LinkStatus.FILE_EXISTS,
+        LinkStatus.WRONG_TARGET,
+        LinkStatus.NOT_INSTALLED,
+        LinkStatus.MISSING_SOURCE,
+    ]
+
+
+def test_backup_store_deduplicates_and_restores(tmp_path):
+    from services.backup_store import BackupStore
+
+    store = BackupStore(tmp_path / ".backups")
+    conf = tmp_path / "app.conf"
+    conf.write_text("same")
+    tree = tmp_path / "nvim"
+    (tree / "lua").mkdir(parents=True)
+    (tree / "init.lua").write_text("same")
+    (tree / "lua" / "plugins.lua").write_text("plugins")
+
+    first = store.backup(conf)
+    store.backup(conf)  # identical content: no new blob
+    store.backup(tree)
+    blobs = list((store.objects_dir).glob("*/*"))
+    assert len(blobs) == 3  # "same", "plugins" and the tree listing
+
+    conf.write_text("changed")
+    store.restore(first.id[:6], overwrite=True)
+    assert conf.read_text() == "same"
+    assert [r.path for r in store.records()].count(conf) == 3  # the overwritten copy was saved too
+
+    removed, _ = store.prune(keep_last=1)
+    assert removed == 2
+    assert len(store.records()) == 2
+    store.restore(store.records()[0].id, dest=tmp_path / "restored")
+    assert (tmp_path / "restored" / "lua" / "plugins.lua").read_text() == "plugins"
+
+def test_backup_blob_is_named_after_the_stored_content(tmp_path, monkeypatch):
+    from core.hashing import hash_bytes
+    from services.backup_store import BackupStore
+    from services.copy_engine import CopyEngine
+
+    store = BackupStore(tmp_path / ".backups")
+    conf = tmp_path / "app.conf"
+    conf.write_text("before")
+    copy_file = CopyEngine.copy_file
+
+    def racing_copy(self, src, dst, *args, **kwargs):
+        conf.write_text("after")  # Written between hashing and copying
+        return copy_file(self, src, dst, *args, **kwargs)
+
+    monkeypatch.setattr(CopyEngine, "copy_file", racing_copy)
+    record = store.backup(conf)
+    assert record.hash == hash_bytes(b"after")
+    assert store._blob_path(hash_bytes(b"after")).read_bytes() == b"after"
+    assert not store._blob_path(hash_bytes(b"before")).exists()
+
+def test_copy_engine_reports_strategies(tmp_path, monkeypatch):
+    from services.copy_engine import CopyEngine
+
+    src = tmp_path / "src.conf"
+    src.write_bytes(b"x" * 4096)
+    engine = CopyEngine()
+
+    strategy = engine.copy_file(src, tmp_path / "a.conf")
+    assert strategy in ("reflink", "copy_file_range", "copy")
+    assert (tmp_path / "a.conf").read_bytes() == src.read_bytes()
+
+    # Unsupported fast paths fall back to a plain copy
+    monkeypatch.setattr(CopyEngine, "_reflink", staticmethod(lambda s, d: False))
+    monkeypatch.setattr(CopyEngine, "_copy_range", staticmethod(lambda s, d, n: False))
+    assert CopyEngine(engine.report).copy_file(src, tmp_path / "b.conf") == "copy"
+
+    assert engine.link_or_copy(src, tmp_path / "c.conf") == "hardlink"
+    assert engine.report.files == 3 and engine.report.bytes_total == 3 * 4096
+    assert engine.report.strategies["hardlink"] == 1
+    assert engine.report.bytes_copied <= 2 * 4096
+
+def test_import_pipeline_verifies_and_resumes(tmp_path, monkeypatch):
+    from core.exceptions import FileOperationError
+    from services.import_pipeline import ImportPipeline
+
+    src = tmp_path / "nvim"
+    (src / "lua").mkdir(parents=True)
+    for i in range(5):
+        (src / "lua" / f"p{i}.lua").write_text(f"plugin {i}")
+    (src / "init.lua").symlink_to("lua/p0.lua")
+    dest = tmp_path / "repo" / "nvim"
+    dest.parent.mkdir()
+
+    # Interrupt after two files have been copied and verified
+    pipeline = ImportPipeline()
+    real_copy = ImportPipeline._copy_verified
+    copied, fail = [], [True]
+    class Interrupted(Exception):
+        pass
+    def flaky_copy(self, s, d, done):
+        if fail[0] and len(copied) == 2:
+            raise Interrupted
+        copied.append(s)
+        return real_copy(self, s, d, done)
+    monkeypatch.setattr(ImportPipeline, "_copy_verified", flaky_copy)
+    with pytest.raises(Interrupted):
+        pipeline.stage(src, dest)
+    assert not dest.exists()
+
+    # Resume copies only the remaining files
+    copied.clear()
+    fail[0] = False
+    seen = []
+    pipeline = ImportPipeline(progress=lambda p: seen.append(p.files_done))
+    staging = pipeline.stage(src, dest)
+    assert len(copied) == 3 and seen[-1] == 5
+    pipeline.commit(staging, dest)
+    assert (dest / "lua" / "p4.lua").read_text() == "plugin 4"
+    assert os.readlink(dest / "init.lua") == "lua/p0.lua"
+    assert not ImportPipeline.journal_path(dest).exists()
+
+    # A copy that does not match the source is rejected
+    monkeypatch.setattr(ImportPipeline, "_copy_verified", real_copy)
+    monkeypatch.setattr(ImportPipeline, "_hash", staticmethod(lambda p, drop_cache=False: "x" if drop_cache else "y"))
+    with pytest.raises(FileOperationError):
+        ImportPipeline().stage(src / "lua" / "p1.lua", tmp_path / "repo" / "p1.lua")
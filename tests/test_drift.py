@@ -0,0 +1,59 @@
+import os
+
+from core.models import Dotfile
+from core.paths import context
+from core import hashing
+from services.drift import DriftChecker
+from services.hash_index import HashIndex
+
+
+def make_index(monkeypatch):
+    # Files written by the test are "racy": index them anyway
+    monkeypatch.setattr(hashing, "RACY_WINDOW_NS", -10**18)
+    return HashIndex(context.cache_dir / "hash-index.json").load()
+
+
+def test_drift_reports_changed_missing_and_linked_entries(repo, tmp_path, monkeypatch):
+    home = tmp_path / "home"
+    (home / "app").mkdir(parents=True)
+    (repo / "rc").write_text("same\n")
+    (home / "rc").write_text("same\n")
+    (repo / "app").mkdir()
+    for name in ("a", "b", "c"):
+        (repo / "app" / name).write_text(f"{name}\n")
+    (home / "app" / "a").write_text("a\n")
+    (home / "app" / "b").write_text("b edited on host\n")
+    (home / "app" / "extra").write_text("x\n")
+    (repo / "linked").write_text("x\n")
+    (home / "linked").symlink_to(repo / "linked")
+
+    dotfiles = [Dotfile("rc", home / "rc"), Dotfile("app", home / "app"), Dotfile("linked", home / "linked"), Dotfile("gone", home / "gone")]
+    rc, app, linked, gone = DriftChecker(make_index(monkeypatch)).check(dotfiles)
+    assert not rc.drifted and linked.linked and not linked.drifted
+    assert (app.changed, app.only_source, app.only_target) == (["b"], ["c"], ["extra"])
+    assert gone.error == "Source missing"
+
+    diff = "".join(DriftChecker.unified_diff(app, "b"))
+    assert "--- repo/app/b" in diff and "-b\n" in diff and "+b edited on host\n" in diff
+
+
+def test_unchanged_files_are_served_from_the_index(repo, tmp_path, monkeypatch):
+    home = tmp_path / "home"
+    home.mkdir()
+    dotfiles = []
+    for i in range(20):
+        (repo / f"rc{i}").write_text(f"{i}\n")
+        (home / f"rc{i}").write_text(f"{i}\n")
+        dotfiles.append(Dotfile(f"rc{i}", home / f"rc{i}"))
+
+    index = make_index(monkeypatch)
+    DriftChecker(index, workers=4).check(dotfiles)
+    index.save(prune=True)
+    assert index.misses == 40
+
+    index = HashIndex(index.path).load()
+    (home / "rc3").write_text("x\n")  # Same size, new content
+    os.utime(home / "rc3", ns=(1, 1))
+    reports = DriftChecker(index, workers=4).check(dotfiles)
+    assert [r.dotfile.source.name for r in reports if r.drifted] == ["rc3"]
+    assert (index.hits, index.misses) == (39, 1)
@@ -0,0 +1,111 @@
+import os
+import shutil
+import subprocess
+import pytest
+from core.exceptions import GitError
+from services.git_local import GitSession, LocalGit
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+@pytest.fixture
+def git_env(monkeypatch):
+    for var in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{var}_NAME", "Test")
+        monkeypatch.setenv(f"GIT_{var}_EMAIL", "test@example.com")
+
+
+def git(repo, *args):
+    return subprocess.run(["git", *args], cwd=repo, capture_output=True, text=True, check=True).stdout
+
+
+def test_session_stages_new_files_in_one_add_and_one_commit(repo, git_env):
+    LocalGit.init_repo()
+    for i in range(20):
+        (repo / "misc").mkdir(exist_ok=True)
+        (repo / "misc" / f"rc{i}").write_text(str(i))
+    (repo / "dotfiles.json").write_text("[]")
+    (repo / "stray").write_text("not part of the operation")
+
+    session = GitSession()
+    session.stage(*[f"misc/rc{i}" for i in range(20)])
+    session.stage(repo / "dotfiles.json")
+    before = LocalGit.spawns
+    assert session.commit("Import") is True
+    assert LocalGit.spawns - before == 2  # one `git add`, one `git commit`
+
+    tracked = git(repo, "ls-files").split()
+    assert "misc/rc0" in tracked and "dotfiles.json" in tracked and "stray" not in tracked
+    assert git(repo, "rev-list", "--count", "HEAD").strip() == "1"
+
+    # Replacing an import stages the deletion too; an unchanged tree is "nothing to commit"
+    (repo / "misc" / "rc0").unlink()
+    assert LocalGit.commit_changes("Remove", [repo / "misc"]) is True
+    assert "misc/rc0" not in git(repo, "ls-files").split()
+    assert LocalGit.commit_changes("Again") is False
+
+
+def test_nothing_to_commit_does_not_depend_on_the_locale(repo, git_env, monkeypatch):
+    LocalGit.init_repo()
+    (repo / "rc").write_text("x")
+    assert LocalGit.commit_changes("Add", [repo / "rc"]) is True
+
+    # A localized git: "nothing to commit" in another language
+    run = LocalGit._run
+
+    def localized(args, input=None, check=True):
+        if args[0] == "commit":
+            return subprocess.CompletedProcess(args, 1, "En la rama master\nnada para hacer commit\n".encode(), b"")
+        return run(args, input, check)
+
+    monkeypatch.setenv("LANG", "es_ES.UTF-8")
+    monkeypatch.setattr(LocalGit, "_run", staticmethod(localized))
+    assert LocalGit.commit_changes("Again", [repo / "rc"]) is False
+
+    (repo / "rc").write_text("changed")
+    with pytest.raises(GitError, match="git commit failed"):
+        LocalGit.commit_changes("Changed", [repo / "rc"])
+
+
+def test_git_failures_are_reported(repo, git_env):
+    LocalGit.init_repo()
+    session = GitSession()
+    session.stage("does-not-exist")
+    with pytest.raises(GitError, match="git add failed"):
+        session.commit("Broken")
+
+
+def test_native_backend_writes_a_repository_git_accepts(repo, git_env, monkeypatch):
+    monkeypatch.setenv("DOTFILE_GIT_BACKEND", "native")
+    (repo / "nvim" / "lua").mkdir(parents=True)
+    (repo / "nvim" / "init.lua").write_text("require('x')\n")
+    (repo / "nvim" / "lua" / "x.lua").write_text("return {}\n")
+    (repo / "nvim-extra").write_text("sorts between nvim and nvim/\n")
+    (repo / "bin").mkdir()
+    (repo / "bin" / "tool").write_text("#!/bin/sh\n")
+    os.chmod(repo / "bin" / "tool", 0o755)
+    os.symlink("nvim/init.lua", repo / "link")
+    (repo / "dotfiles.json").write_text("[]")
+
+    spawns = LocalGit.spawns
+    assert LocalGit.commit_changes("Import", [repo / "nvim", repo / "nvim-extra", repo / "bin", repo / "link", repo / "dotfiles.json"])
+    (repo / "nvim" / "lua" / "x.lua").unlink()
+    (repo / "dotfiles.json").write_text('[{"source": "nvim"}]')
+    assert LocalGit.commit_changes("Update", [repo / "nvim", repo / "dotfiles.json"])
+    assert LocalGit.commit_changes("Nothing", [repo / "nvim"]) is False
+    assert LocalGit.spawns == spawns  # no git process was started
+
+    assert subprocess.run(["git", "fsck", "--strict"], cwd=repo, capture_output=True).returncode == 0
+    assert git(repo, "status", "--porcelain") == ""  # index stat data matches the work tree
+    assert git(repo, "ls-files", "-s", "bin/tool", "link").split()[::4] == ["100755", "120000"]
+    assert git(repo, "log", "--format=%s").split() == ["Update", "Import"]
+
+    # The git binary can continue the history, and the native writer can continue it again
+    (repo / "nvim-extra").write_text("changed\n")
+    monkeypatch.setenv("DOTFILE_GIT_BACKEND", "subprocess")
+    assert LocalGit.commit_changes("From git")
+    (repo / "nvim" / "init.lua").write_text("changed\n")
+    monkeypatch.setenv("DOTFILE_GIT_BACKEND", "native")
+    assert LocalGit.commit_changes("Tracked only")
+    assert git(repo, "status", "--porcelain") == ""
+    assert subprocess.run(["git", "fsck", "--strict"], cwd=repo, capture_output=True).returncode == 0
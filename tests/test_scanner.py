@@ -0,0 +1,164 @@
+import os
+from pathlib import Path
+from services.config_service import ConfigService
+from services.scanner import SystemScanner
+
+
+def make_scanner(tmp_path, home):
+    service = ConfigService()
+    service.config_path = tmp_path / "missing.json"
+    scanner = SystemScanner(service, max_workers=4)
+    scanner.home = home
+    scanner.known_paths = {"Git Config": ".gitconfig"}
+    return scanner
+
+
+def test_parallel_scan_matches_walk_semantics(tmp_path):
+    home = tmp_path / "home"
+    (home / ".config" / "nvim" / "lua").mkdir(parents=True)
+    (home / ".config" / "node_modules").mkdir()
+    (home / ".termux").mkdir()
+    (home / ".config" / "starship.toml").write_text("x")
+    (home / ".config" / "nvim" / "init.lua").write_text("x")
+    (home / ".config" / "nvim" / "lua" / "deep.lua").write_text("x")  # depth 2: ignored
+    (home / ".config" / "nvim" / "init.lua.bak").write_text("x")
+    (home / ".config" / "node_modules" / "pkg.json").write_text("x")
+    (home / ".config" / "script.py").write_text("x")
+    (home / ".termux" / "termux.properties").write_text("x")
+    (home / ".termux" / "colors.conf").symlink_to(home / ".config" / "starship.toml")
+    (home / ".gitconfig").write_text("x")
+    (home / ".bashrc").write_text("x")
+    (home / ".bash_history").write_text("x")
+
+    candidates = make_scanner(tmp_path, home).scan()
+
+    assert candidates == [
+        ("Config: nvim/init.lua", home / ".config" / "nvim" / "init.lua"),
+        ("Config: starship.toml", home / ".config" / "starship.toml"),
+        ("Git Config", home / ".gitconfig"),
+        ("Root: .bashrc", home / ".bashrc"),
+    ]
+
+
+def test_scan_cache_reuses_unchanged_directories(tmp_path):
+    from services.scan_cache import ScanCache, SCAN_CACHE_VERSION
+    import json, os
+
+    home = tmp_path / "home"
+    (home / ".config" / "kitty").mkdir(parents=True)
+    (home / ".config" / "kitty" / "kitty.conf").write_text("x")
+    # Back-date directories so they are outside the racy window
+    for d in (home, home / ".config", home / ".config" / "kitty"):
+        os.utime(d, ns=(1_000_000_000, 1_000_000_000))
+
+    cache = ScanCache(tmp_path / "cache" / "scan-index.json")
+    scanner = make_scanner(tmp_path, home)
+    scanner.cache = cache
+    first = scanner.scan()
+    assert cache.misses > 0 and cache.hits == 0
+    assert json.loads(cache.path.read_text())["version"] == SCAN_CACHE_VERSION
+
+    second = scanner.scan()
+    assert second == first
+    assert cache.misses == 0
+
+    # A new file changes the directory mtime and is picked up
+    (home / ".config" / "kitty" / "theme.conf").write_text("x")
+    third = scanner.scan()
+    assert ("Config: kitty/theme.conf", home / ".config" / "kitty" / "theme.conf") in third
+    assert cache.misses == 1
+    assert cache.clear() and not cache.path.exists()
+
+
+def test_repo_scan_rules_extend_and_override_the_defaults(tmp_path, repo):
+    import json
+    import pytest
+    from core.exceptions import ConfigError
+    from services.scan_rules import ScanRules
+
+    home = tmp_path / "home"
+    for d in (".config/kitty", ".config/private", ".config/node_modules", ".termux", "work/etc"):
+        (home / d).mkdir(parents=True)
+    (home / ".config" / "kitty" / "kitty.conf").write_text("x")
+    (home / ".config" / "kitty" / "state.json").write_text("x")
+    (home / ".config" / "private" / "token.conf").write_text("x")
+    (home / ".config" / "node_modules" / "pkg.conf").write_text("x")
+    (home / ".termux" / "colors.conf").write_text("x")
+    (home / "work" / "etc" / "app.env").write_text("x")
+    (home / "work" / "etc" / "notes.txt").write_text("x")
+
+    rules_path = repo / ".dotfile-pro" / "scan_rules.json"
+    rules_path.parent.mkdir()
+    rules_path.write_text(json.dumps({
+        "exclude_dirs": ["!node_modules", ".config/private"],
+        "files": {"exclude": ["*.json"]},
+        "roots": [
+            {"path": ".termux", "max_depth": 0},
+            {"path": "work/etc", "max_depth": 1, "label": "Work", "files": {"include": ["*.env"]}},
+        ],
+    }))
+
+    scanner = make_scanner(tmp_path, home)
+    assert [name for name, _ in scanner.scan()] == ["Config: kitty/kitty.conf", "Config: node_modules/pkg.conf", "Work: app.env"]
+
+    rules_path.write_text('{"roots": [{"max_depth": 1}]}')
+    with pytest.raises(ConfigError):
+        ScanRules.load()
+
+
+def test_iter_scan_streams_and_stops_on_limit_or_timeout(tmp_path):
+    import subprocess
+    import sys
+    import textwrap
+    import time
+
+    home = tmp_path / "home"
+    for app in ("alpha", "beta", "slow"):
+        (home / ".config" / app).mkdir(parents=True)
+        (home / ".config" / app / f"{app}.conf").write_text("x")
+    (home / ".gitconfig").write_text("x")
+    scanner = make_scanner(tmp_path, home)
+
+    assert sorted(scanner.iter_scan()) == sorted(scanner.scan()) and not scanner.truncated
+
+    assert list(scanner.iter_scan(limit=1)) == [("Git Config", home / ".gitconfig")]
+    assert scanner.truncated
+
+    # One subtree hangs for good (and so does the ~/.config listing, at a slower mount):
+    # known apps still stream out first, the timeout ends the scan and the hung
+    # workers do not keep the interpreter from exiting.
+    script = textwrap.dedent(f"""
+        import time
+        from pathlib import Path
+        from services.config_service import ConfigService
+        from services.scan_rules import ScanRoot, ScanRules
+        from services.scanner import SystemScanner
+
+        service = ConfigService()
+        service.config_path = Path({str(tmp_path / "missing.json")!r})
+        rules = ScanRules.load()
+        rules.roots = [*rules.roots, ScanRoot(path=".hung", max_depth=2, label="Hung")]
+        scanner = SystemScanner(service, max_workers=4, rules=rules)
+        scanner.home = Path({str(home)!r})
+        scanner.known_paths = {{"Git Config": ".gitconfig"}}
+        list_dir = scanner._list_dir
+
+        def slow_list_dir(path):
+            if path.endswith(("slow", ".hung")):
+                time.sleep(60)
+            return list_dir(path)
+
+        scanner._list_dir = slow_list_dir
+        print([name for name, _ in scanner.iter_scan(timeout=0.3)], scanner.truncated)
+    """)
+    (home / ".hung").mkdir()
+    start = time.monotonic()
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, timeout=30,
+        env={**os.environ, "PYTHONPATH": str(Path(__file__).parent.parent / "src")},
+    )
+    assert result.returncode == 0, result.stderr
+    assert time.monotonic() - start < 10
+    found, truncated = result.stdout.rsplit(" ", 1)
+    assert found.startswith("['Git Config'")
+    assert "slow.conf" not in found and truncated.strip() == "True"
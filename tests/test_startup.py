@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+pytest.importorskip("typer")
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+# Our own import cost on top of typer, in milliseconds (override on slow machines)
+BUDGET_MS = float(os.getenv("DOTFILE_PRO_IMPORT_BUDGET_MS", "30"))
+
+
+def run_python(*args):
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, env=env, check=True)
+
+
+def test_cli_import_defers_heavy_modules():
+    out = run_python("-c", (
+        "import sys, interface.cli\n"
+        "heavy = ('rich', 'textual', 'services', 'core')\n"
+        "print(sorted(m for m in sys.modules if m.split('.')[0] in heavy))"
+    )).stdout
+    assert out.strip() == "[]"
+
+
+def test_cli_import_time_budget():
+    # -X importtime: "import time: self | cumulative | name", cumulative in microseconds
+    stderr = run_python("-X", "importtime", "-c", "import interface.cli").stderr
+    cumulative = {}
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            cumulative[parts[2].strip()] = int(parts[1])
+    own_ms = (cumulative["interface.cli"] - cumulative.get("typer", 0)) / 1000
+    assert own_ms < BUDGET_MS, f"interface.cli adds {own_ms:.1f} ms on top of typer"
+
+
+def test_help_does_not_need_a_repo(tmp_path):
+    env = dict(os.environ, PYTHONPATH=str(SRC), HOME=str(tmp_path))
+    env.pop("DOTFILE_REPO", None)
+    result = subprocess.run(
+        [sys.executable, "-m", "interface.cli", "--help"],
+        capture_output=True, text=True, env=env, cwd=tmp_path,
+    )
+    assert result.returncode == 0
+    assert "scan" in result.stdout
@@ -0,0 +1,98 @@
+import os
+
+from core.models import Dotfile, LinkStatus
+from core.paths import context
+from services.config_service import ConfigService
+from services.file_service import FileService
+from services.template_renderer import TemplateRenderer
+
+
+def make_template(repo, text="email = {{ env.TEST_MAIL }} on {{ host }}\n"):
+    (repo / "git").mkdir()
+    (repo / "git" / "gitconfig").write_text(text)
+    return Dotfile("git/gitconfig", "~/.gitconfig", template=True)
+
+
+def test_render_cache_skips_unchanged_templates(repo, monkeypatch):
+    dotfile = make_template(repo)
+    monkeypatch.setenv("TEST_MAIL", "a@example.com")
+    output = context.build_dir / "git" / "gitconfig"
+
+    (step,) = TemplateRenderer.load().render([dotfile])
+    assert step.rendered and not step.error
+    host = TemplateRenderer.host_variables()["host"]
+    assert output.read_text() == f"email = a@example.com on {host}\n"
+    assert (context.build_dir.parent / ".gitignore").read_text() == "*\n"
+
+    # Re-run right away, with the files still racy: nothing is written, not even the cache
+    written = (os.stat(output).st_mtime_ns, os.stat(context.cache_dir / "render-cache.json").st_mtime_ns)
+    (step,) = TemplateRenderer.load().render([dotfile])
+    assert not step.rendered and not step.error
+    assert (os.stat(output).st_mtime_ns, os.stat(context.cache_dir / "render-cache.json").st_mtime_ns) == written
+
+    # Files modified within the racy window are not trusted: a same-size edit
+    # that keeps the mtime is still picked up
+    template = repo / "git" / "gitconfig"
+    st = os.stat(template)
+    template.write_text(template.read_text().replace("email", "EMAIL"))
+    os.utime(template, ns=(st.st_atime_ns, st.st_mtime_ns))
+    (step,) = TemplateRenderer.load().render([dotfile])
+    assert step.rendered and output.read_text().startswith("EMAIL")
+
+    # Back-date the files so they are outside the racy window; the next run records their stat
+    for path in (template, output):
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+    (step,) = TemplateRenderer.load().render([dotfile])
+    assert not step.rendered
+
+    # Nothing changed: the template is not even read and nothing is written
+    before = (os.stat(output).st_mtime_ns, os.stat(context.cache_dir / "render-cache.json").st_mtime_ns)
+    real_open = open
+
+    def guarded_open(path, *args, **kwargs):
+        assert "gitconfig" not in str(path), f"{path} was read"
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", guarded_open)
+    (step,) = TemplateRenderer.load().render([dotfile])
+    monkeypatch.setattr("builtins.open", real_open)
+    assert not step.rendered
+    assert (os.stat(output).st_mtime_ns, os.stat(context.cache_dir / "render-cache.json").st_mtime_ns) == before
+
+    # A changed input re-renders
+    monkeypatch.setenv("TEST_MAIL", "b@example.com")
+    (step,) = TemplateRenderer.load().render([dotfile])
+    assert step.rendered and output.read_text().startswith("EMAIL = b@example.com")
+
+    monkeypatch.delenv("TEST_MAIL")
+    (step,) = TemplateRenderer.load().render([dotfile])
+    assert "env.TEST_MAIL" in step.error
+
+
+def test_template_entries_link_to_their_rendering(repo, tmp_path, monkeypatch):
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+    (repo / ".dotfile-pro").mkdir()
+    (repo / ".dotfile-pro" / "vars.json").write_text('{"*": {"editor": "vim"}}')
+    dotfile = make_template(repo, "editor={{ editor }} profile={{ profile }}\n")
+
+    FileService.create_symlink(dotfile)
+    target = home / ".gitconfig"
+    assert target.resolve() == context.build_dir / "git" / "gitconfig"
+    assert target.read_text() == "editor=vim profile=default\n"
+    assert FileService.check_status(dotfile) == LinkStatus.ACTIVE
+
+
+def test_template_flag_round_trips_through_both_backends(repo):
+    service = ConfigService()
+    entries = [Dotfile("a", "~/.a"), Dotfile("t", "~/.t", template=True)]
+    service.save_config(entries)
+    assert service.load_config() == entries
+    assert '"template"' not in service.config_path.read_text().split('"t"')[0]
+
+    context.profiles_dir.mkdir(parents=True)
+    service = ConfigService()
+    service.save_config(entries)
+    service.apply_changes([("+", Dotfile("u", "~/.u", template=True))])
+    assert service.load_config() == entries + [Dotfile("u", "~/.u", template=True)]
@@ -0,0 +1,74 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from core import tracing
+
+
+@pytest.fixture
+def tracer():
+    tracer = tracing.start()
+    yield tracer
+    tracing.stop()
+
+
+def test_disabled_tracing_is_a_no_op():
+    stat = os.stat
+    assert not tracing.enabled()
+    assert tracing.span("x") is tracing.span("y")
+    tracing.add("bytes_copied", 10)
+
+    @tracing.traced("test")
+    def double(n):
+        return n * 2
+
+    assert double(2) == 4
+    assert os.stat is stat
+
+
+def test_spans_nest_and_count_syscalls(tracer, tmp_path):
+    @tracing.traced("test")
+    def work():
+        with tracing.span("inner", "io", path="x"):
+            os.stat(tmp_path)
+            tracing.add("bytes_copied", 100)
+
+    work()
+    inner, outer = tracer.events
+    assert (inner["name"], inner["cat"]) == ("inner", "io")
+    assert inner["args"] == {"path": "x", "sys.stat": 1, "bytes_copied": 100}
+    assert outer["name"].endswith("work") and outer["dur"] >= inner["dur"]
+    assert outer["self_us"] <= outer["dur"] - inner["dur"] + 1
+
+    phases = {p["phase"]: p for p in tracer.summary()}
+    assert phases["io"]["syscalls"] == 1 and phases["io"]["bytes"] == 100
+    assert phases["test"]["spans"] == 1
+
+
+def test_trace_file_and_uninstall(tmp_path):
+    stat = os.stat
+    tracer = tracing.start()
+    with tracing.span("git status", "subprocess"):
+        os.stat(tmp_path)
+    assert tracing.stop() is tracer
+    assert os.stat is stat and not tracing.enabled()
+
+    tracer.write(tmp_path / "trace.json")
+    data = json.loads((tmp_path / "trace.json").read_text())
+    (event,) = data["traceEvents"]
+    assert event["ph"] == "X" and event["name"] == "git status"
+    assert data["otherData"]["counters"]["sys.stat"] >= 1
+    assert data["otherData"]["summary"][0]["phase"] == "subprocess"
+
+
+def test_trace_env_values():
+    from interface.cli import _trace_path
+
+    assert _trace_path(False, "") is None
+    for off in ("0", "false", "No", "off"):
+        assert _trace_path(False, off) is None
+    assert _trace_path(True, "0") == Path("dotfile-pro-trace.json")
+    assert _trace_path(False, "TRUE") == Path("dotfile-pro-trace.json")
+    assert _trace_path(False, "out/trace.json") == Path("out/trace.json")
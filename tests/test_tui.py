@@ -0,0 +1,188 @@
+import asyncio
+import os
+import shutil
+import subprocess
+import time
+import pytest
+from core.exceptions import ConflictError
+from core.models import Dotfile
+from services.buffer_cache import BufferCache
+from services.config_service import ConfigService, DotfileRegistry
+from services.search_index import SearchIndex
+
+pytest.importorskip("textual")
+
+
+def test_buffer_cache_reuses_until_the_file_changes(tmp_path):
+    path = tmp_path / "rc"
+    path.write_text("one\n")
+    cache = BufferCache(max_entries=2)
+    first = cache.get(path)
+    assert cache.get(path) is first and cache.hits == 1
+
+    path.write_text("two, longer\n")
+    assert cache.get(path).text == "two, longer\n"
+
+    for name in ("a", "b"):
+        (tmp_path / name).write_text(name)
+        cache.get(tmp_path / name)
+    assert cache.get(path).text == "two, longer\n" and cache.misses == 5  # evicted (LRU of 2)
+
+
+def test_buffer_cache_previews_large_files_in_chunks(tmp_path):
+    path = tmp_path / "big"
+    path.write_text("é" * 1000)  # 2000 bytes, chunk boundaries fall inside characters
+    cache = BufferCache(preview_threshold=100, chunk_size=101)
+    buffer = cache.get(path)
+    assert buffer.read_only and buffer.partial and buffer.loaded == 100
+
+    text = buffer.text
+    while buffer.partial:
+        buffer, chunk = cache.more(buffer)
+        text += chunk
+    assert text == "é" * 1000 and buffer.text == text
+
+    # Edited on disk mid-preview: the next chunk starts over instead of mixing contents
+    buffer = cache.get(path)
+    path.write_text("ü" * 1000)
+    os.utime(path, ns=(1, 1))  # Same size: make sure the mtime differs
+    buffer, chunk = cache.more(buffer)
+    assert chunk is None and buffer.loaded == 100 and buffer.text == "ü" * 50
+
+
+def test_buffer_cache_save_skips_unchanged_and_detects_external_edits(tmp_path):
+    path = tmp_path / "rc"
+    path.write_text("one\n")
+    path.chmod(0o640)
+    cache = BufferCache()
+    buffer = cache.get(path)
+    assert cache.save(buffer, "one\n") is None
+
+    buffer = cache.save(buffer, "two\n")
+    assert path.read_text() == "two\n" and path.stat().st_mode & 0o777 == 0o640
+    assert cache.get(path) is buffer
+
+    os.utime(path, ns=(0, 0))  # touched, same contents: not a conflict
+    buffer = cache.save(buffer, "three\n")
+
+    # Already written elsewhere: nothing to write, and later saves are not conflicts
+    path.write_text("four\n")
+    os.utime(path, ns=(1, 1))
+    buffer = cache.save(buffer, "four\n")
+    assert buffer.mtime_ns == 1 and cache.get(path) is buffer
+    buffer = cache.save(buffer, "three\n")
+
+    path.write_text("edited elsewhere\n")
+    with pytest.raises(ConflictError):
+        cache.save(buffer, "four\n")
+    assert path.read_text() == "edited elsewhere\n"
+    cache.save(buffer, "four\n", force=True)
+    assert path.read_text() == "four\n"
+
+
+def test_search_index_matches_fuzzy_tokens_best_first():
+    index = SearchIndex([
+        "Nvim: init.lua\tnvim/init.lua\t~/.config/nvim/init.lua\tdefault",
+        "Zsh: .zshrc\tzsh/.zshrc\t~/.zshrc\twork",
+        "Misc: invim.txt\tauto-scan/invim.txt\t~/invim.txt\tdefault",
+        "Kitty: kitty.conf\tkitty/kitty.conf\t~/.config/kitty/kitty.conf\tdefault",
+    ])
+    assert index.search("") == [0, 1, 2, 3]
+    assert index.search("nvim") == [0, 2]  # word start ranks first
+    assert index.search("NV  lua") == [0]  # case-insensitive, every token must match
+    assert index.search("zrc") == [1]  # subsequence
+    assert index.search("zrc work") == [1]  # profile is searchable
+    assert index.search("cfg") == [0, 3]
+    assert index.search("cfg k") == [3]  # narrowed from the cached "cfg"
+    assert index.search("qq") == []
+
+
+def test_search_index_keystrokes_stay_under_a_frame():
+    index = SearchIndex([f"App{i % 50}: rc{i}\tapp{i % 50}/rc{i}\t~/.config/app{i % 50}/rc{i}\tdefault" for i in range(5000)])
+    slowest = 0.0
+    for query in ("a", "ap", "app", "app1", "app1 ", "app1 r", "app1 rc", "app1 rc4", "q"):
+        start = time.perf_counter()
+        index.search(query)
+        slowest = max(slowest, time.perf_counter() - start)
+    assert slowest < 0.05  # ~16 ms budget per frame, generous for slow CI machines
+
+
+def test_tui_lists_thousands_of_entries_and_loads_in_background(repo):
+    from interface.tui import DotfileTUI
+
+    (repo / "misc").mkdir()
+    (repo / "misc" / "rc0").write_text("hello\n")
+    registry = DotfileRegistry(ConfigService()).load()
+    for i in range(5000):
+        registry.add(Dotfile(source=f"misc/rc{i}", target=f"~/.rc{i}"))
+    registry.commit()
+
+    async def run():
+        app = DotfileTUI()
+        async with app.run_test() as pilot:
+            assert len(app.file_list.rows) == 5000
+            app.file_list.focus()
+            await pilot.press("enter")
+            await app.workers.wait_for_complete()
+            await pilot.pause()
+            assert app.editor.text == "hello\n"
+            assert not app.editor.read_only
+
+            app.search.focus()
+            await pilot.press("r", "c", "4", "9", "9", "9")
+            assert app.dotfiles[app.file_list.highlighted].source.name == "rc4999"
+            narrowed = len(app.file_list.rows)
+            await pilot.press("backspace")
+            assert app.dotfiles[app.file_list.highlighted].source.name == "rc499"
+            assert len(app.file_list.rows) > narrowed
+
+    asyncio.run(run())
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+def test_tui_save_prompts_on_conflict_and_commits_saves_together(repo, monkeypatch):
+    from interface.tui import ConflictScreen, DotfileTUI
+
+    for var in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{var}_NAME", "Test")
+        monkeypatch.setenv(f"GIT_{var}_EMAIL", "test@example.com")
+    (repo / "misc").mkdir()
+    registry = DotfileRegistry(ConfigService()).load()
+    for name in ("a", "b"):
+        (repo / "misc" / name).write_text(f"{name}\n")
+        registry.add(Dotfile(source=f"misc/{name}", target=f"~/.{name}"))
+    registry.commit()
+
+    async def open_file(app, pilot, row):
+        app.file_list.focus()
+        app.file_list.action_jump(row)
+        await pilot.press("enter")
+        await app.workers.wait_for_complete()
+        await pilot.pause()
+
+    async def run():
+        app = DotfileTUI()
+        async with app.run_test() as pilot:
+            await open_file(app, pilot, 0)
+            app.save_current()
+            assert not app.git.paths  # unchanged: nothing written or staged
+
+            app.editor.text = "a edited\n"
+            (repo / "misc" / "a").write_text("changed underneath\n")
+            app.save_current()
+            await pilot.pause()
+            assert isinstance(app.screen, ConflictScreen)
+            assert "+a edited" in app.screen.diff.plain and "-changed underneath" in app.screen.diff.plain
+            await pilot.click("#overwrite")
+            await pilot.pause()
+            assert (repo / "misc" / "a").read_text() == "a edited\n"
+
+            await open_file(app, pilot, 1)
+            app.editor.text = "b edited\n"
+            app.save_current()
+            await pilot.press("c")
+            await pilot.pause()
+
+    asyncio.run(run())
+    log = subprocess.run(["git", "log", "--format=%s", "--name-only"], cwd=repo, capture_output=True, text=True).stdout
+    assert log.split() == ["Edit", "2", "files", "misc/a", "misc/b"]
@@ -0,0 +1,71 @@
+import os
+import time
+import pytest
+from core.models import Dotfile, LinkAction
+from services.config_service import ConfigService, DotfileRegistry
+from services.watcher import InotifyBackend, LinkWatcher, PollingBackend
+
+
+def make_repo(repo, tmp_path, count=3):
+    home = tmp_path / "home"
+    (home / ".config").mkdir(parents=True)
+    registry = DotfileRegistry(ConfigService()).load()
+    for i in range(count):
+        (repo / "misc").mkdir(exist_ok=True)
+        (repo / "misc" / f"rc{i}").write_text(str(i))
+        registry.add(Dotfile(source=f"misc/rc{i}", target=str(home / ".config" / f"rc{i}")))
+    registry.commit()
+    return home
+
+
+def next_repair(watcher, timeout=5):
+    """Steps until a batch actually changes something (our own symlinks come back as no-op batches)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        steps = watcher.step(timeout=0.5)
+        if steps:
+            return steps
+    return []
+
+
+@pytest.mark.parametrize("backend_factory", [
+    pytest.param(InotifyBackend, marks=pytest.mark.skipif(not InotifyBackend.available(), reason="no inotify")),
+    lambda: PollingBackend(interval=0.05),
+])
+def test_watcher_repairs_only_affected_links(repo, tmp_path, backend_factory):
+    home = make_repo(repo, tmp_path)
+    watcher = LinkWatcher(ConfigService(), debounce=0.05, backend=backend_factory())
+    try:
+        created = watcher.reload()
+        assert [s.action for s in created] == [LinkAction.CREATE] * 3
+
+        (home / ".config" / "rc1").unlink()
+        repaired = next_repair(watcher)
+        assert [(s.action, s.target.name) for s in repaired] == [(LinkAction.CREATE, "rc1")]
+        assert os.readlink(home / ".config" / "rc1") == str(repo / "misc" / "rc1")
+
+        # A file in place of the link is a conflict, not something to overwrite
+        (home / ".config" / "rc2").unlink()
+        (home / ".config" / "rc2").write_text("local")
+        conflicts = next_repair(watcher)
+        assert [s.action for s in conflicts] == [LinkAction.CONFLICT]
+        assert (home / ".config" / "rc2").read_text() == "local"
+    finally:
+        watcher.backend.close()
+
+
+def test_watcher_reloads_config_and_follows_new_directories(repo, tmp_path):
+    home = make_repo(repo, tmp_path, count=1)
+    watcher = LinkWatcher(ConfigService(), debounce=0.05, backend=PollingBackend(interval=0.05))
+    watcher.reload()
+
+    # Target directory does not exist yet: the closest existing ancestor is watched
+    (repo / "nvim").mkdir()
+    (repo / "nvim" / "init.lua").write_text("x")
+    registry = DotfileRegistry(ConfigService()).load()
+    registry.add(Dotfile(source="nvim/init.lua", target=str(home / ".config" / "nvim" / "init.lua")))
+    registry.commit()
+
+    steps = next_repair(watcher)
+    assert [(s.action, s.target.name) for s in steps] == [(LinkAction.CREATE, "init.lua")]
+    assert (home / ".config" / "nvim" / "init.lua").is_symlink()